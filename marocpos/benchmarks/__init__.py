@@ -0,0 +1,4 @@
+"""Performance benchmarks. Run from the marocpos directory, e.g.
+
+    python -m benchmarks.sale_commit_concurrency
+"""
@@ -0,0 +1,107 @@
+"""SalesAnalytics (NumPy bincount over streamed chunks) against SQL GROUP BY.
+
+Times per-product margins and the weekday x hour heatmap both ways on the
+same synthetic history, and checks the two give the same figures.
+
+    python -m benchmarks.analytics_vs_sql [--lines 1000000] [--products 5000] [--chunk 100000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from database import DatabaseManager, initialize_database
+from models.analytics import SalesAnalytics
+
+START, END = "2024-01-01", "2025-01-01"
+
+MARGINS_SQL = """
+    SELECT si.product_id, SUM(si.quantity), SUM(si.subtotal_cents),
+           SUM(si.quantity * COALESCE(p.purchase_price_cents, 0))
+    FROM Sales s
+    JOIN SaleItems si ON si.sale_id = s.id
+    LEFT JOIN Products p ON p.id = si.product_id
+    WHERE s.created_at >= ? AND s.created_at < ?
+    GROUP BY si.product_id
+"""
+
+HEATMAP_SQL = """
+    SELECT CAST(strftime('%w', s.created_at) AS INTEGER), CAST(strftime('%H', s.created_at) AS INTEGER),
+           SUM(si.subtotal_cents)
+    FROM Sales s
+    JOIN SaleItems si ON si.sale_id = s.id
+    WHERE s.created_at >= ? AND s.created_at < ?
+    GROUP BY 1, 2
+"""
+
+
+def seed(lines, products, lines_per_sale=5):
+    with DatabaseManager.session() as conn:
+        conn.executemany(
+            "INSERT INTO Products (name, unit_price, purchase_price, stock) VALUES (?, ?, ?, ?)",
+            [(f"Produit {i}", 10 + i % 90, 6 + i % 50, 100) for i in range(products)]
+        )
+        sales = lines // lines_per_sale
+        conn.executemany(
+            "INSERT INTO Sales (id, created_at, user_id, total_amount, final_total) VALUES (?, ?, 1, 0, 0)",
+            [(sale_id, f"2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d} "
+                       f"{random.randint(8, 21):02d}:{random.randint(0, 59):02d}:00")
+             for sale_id in range(1, sales + 1)]
+        )
+        conn.executemany(
+            "INSERT INTO SaleItems (sale_id, product_id, quantity, unit_price, subtotal) VALUES (?, ?, ?, ?, ?)",
+            [(1 + i // lines_per_sale, product_id, quantity, 10 + product_id % 90, quantity * (10 + product_id % 90))
+             for i, product_id, quantity in (
+                 (i, random.randint(1, products), random.randint(1, 4)) for i in range(sales * lines_per_sale)
+             )]
+        )
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def sql(query):
+    with DatabaseManager.session() as conn:
+        return conn.execute(query, (START, END)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1000000, help="sale lines in the history")
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--chunk", type=int, default=100000, help="rows per fetchmany() chunk")
+    args = parser.parse_args()
+
+    DatabaseManager.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="pos_bench_"), "bench.db")
+    initialize_database()
+    seed(args.lines, args.products)
+    print(f"{args.lines} sale lines, {args.products} products")
+
+    margins, numpy_ms = timed(SalesAnalytics.margins, START, END, args.chunk)
+    rows, sql_ms = timed(sql, MARGINS_SQL)
+    expected = {product_id: (revenue, round(cost)) for product_id, _, revenue, cost in rows}
+    same = expected == {m['product_id']: (m['revenue_cents'], m['cost_cents']) for m in margins}
+    print(f"margins  numpy={numpy_ms:8.1f}ms  sql={sql_ms:8.1f}ms  same={same}")
+
+    heatmap, numpy_ms = timed(SalesAnalytics.hourly_heatmap, START, END, args.chunk)
+    rows, sql_ms = timed(sql, HEATMAP_SQL)
+    expected = np.zeros((7, 24))
+    for weekday, hour, revenue in rows:
+        expected[weekday, hour] = revenue
+    print(f"heatmap  numpy={numpy_ms:8.1f}ms  sql={sql_ms:8.1f}ms  same={np.array_equal(expected, heatmap)}")
+
+    _, numpy_ms = timed(SalesAnalytics.abc_analysis, START, END, 0.8, 0.95, args.chunk)
+    print(f"abc      numpy={numpy_ms:8.1f}ms")
+    _, numpy_ms = timed(SalesAnalytics.basket_percentiles, START, END, (50, 90, 99), args.chunk)
+    print(f"baskets  numpy={numpy_ms:8.1f}ms")
+    DatabaseManager.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Barcode scan latency through BarcodeIndex.resolve().
+
+Builds a catalogue of products and variants, then resolves random barcodes
+the way the checkout's scan input does and checks the p99 against a target.
+
+    python -m benchmarks.barcode_lookup [--skus 100000] [--scans 20000] [--target-ms 2]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from database import DatabaseManager, initialize_database
+from models.barcode import BarcodeIndex
+
+
+def seed(skus, variant_share):
+    """Create skus barcodes, variant_share of them on variants of 4 per product."""
+    variants = int(skus * variant_share) // 4 * 4
+    products = skus - variants + variants // 4
+    with DatabaseManager.session() as conn:
+        conn.executemany(
+            "INSERT INTO Products (name, barcode, unit_price, stock, has_variants) VALUES (?, ?, ?, ?, ?)",
+            [(f"Produit {i}", f"611{i:010d}", 10 + i % 90, 100, 0) for i in range(products - variants // 4)]
+        )
+        parent_start = products - variants // 4
+        conn.executemany(
+            "INSERT INTO Products (name, unit_price, stock, has_variants) VALUES (?, ?, ?, 1)",
+            [(f"Produit {i}", 10 + i % 90, 0) for i in range(parent_start, products)]
+        )
+        conn.executemany(
+            "INSERT INTO ProductVariants (product_id, name, barcode, stock) VALUES (?, ?, ?, 10)",
+            [(parent_start + 1 + i // 4, f"Taille {i % 4}", f"622{i:010d}") for i in range(variants)]
+        )
+        return [row[0] for row in conn.execute(
+            "SELECT barcode FROM Products WHERE barcode IS NOT NULL "
+            "UNION ALL SELECT barcode FROM ProductVariants"
+        )]
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skus", type=int, default=100000, help="barcodes in the catalogue")
+    parser.add_argument("--variant-share", type=float, default=0.4, help="share of barcodes on variants")
+    parser.add_argument("--scans", type=int, default=20000)
+    parser.add_argument("--target-ms", type=float, default=2.0, help="p99 budget per scan")
+    args = parser.parse_args()
+
+    DatabaseManager.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="pos_bench_"), "bench.db")
+    initialize_database()
+    barcodes = seed(args.skus, args.variant_share)
+    print(f"{len(barcodes)} barcodes")
+
+    started = time.perf_counter()
+    BarcodeIndex.invalidate()
+    BarcodeIndex.lookup(barcodes[0])
+    print(f"index build: {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    # One in twenty scans is a code the till doesn't know
+    scans = [random.choice(barcodes) if i % 20 else f"999{i:010d}" for i in range(args.scans)]
+    latencies = []
+    misses = 0
+    for barcode in scans:
+        started = time.perf_counter()
+        if BarcodeIndex.resolve(barcode + "\r\n") is None:
+            misses += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    p99 = percentile(latencies, 0.99)
+    print(f"scans={len(latencies)} unknown={misses}  p50={percentile(latencies, 0.50):.3f}ms "
+          f"p95={percentile(latencies, 0.95):.3f}ms p99={p99:.3f}ms max={latencies[-1]:.3f}ms")
+    DatabaseManager.close_pool()
+
+    if p99 > args.target_ms:
+        print(f"❌ p99 above the {args.target_ms}ms target")
+        return 1
+    print(f"✅ p99 within the {args.target_ms}ms target")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
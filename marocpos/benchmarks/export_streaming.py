@@ -0,0 +1,96 @@
+"""DataExport of a year of sale lines: rows per second and peak memory.
+
+Seeds a synthetic history, then exports the sale lines with fetchmany()
+chunks and samples the process's anonymous memory (RssAnon, Linux) after
+every chunk: it should grow by about one chunk, not with the size of the
+history. Total RSS is not the measure, since the database is memory
+mapped (mmap_size) and its pages count in RSS as they are read. Parquet
+is timed too when pyarrow is installed.
+
+    python -m benchmarks.export_streaming [--lines 2000000] [--products 5000] [--chunk 50000]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import tempfile
+import time
+
+from database import DatabaseManager, initialize_database
+from models.data_export import DataExport
+
+START, END = "2024-01-01", "2024-12-31"
+
+
+def seed(lines, products, lines_per_sale=5):
+    with DatabaseManager.session() as conn:
+        conn.executemany(
+            "INSERT INTO Products (name, barcode, unit_price, purchase_price, stock) VALUES (?, ?, ?, ?, ?)",
+            [(f"Produit {i}", f"BC{i:08d}", 10 + i % 90, 6 + i % 50, 100) for i in range(products)]
+        )
+        sales = lines // lines_per_sale
+        conn.executemany(
+            "INSERT INTO Sales (id, created_at, user_id, total_amount, final_total, payment_method) "
+            "VALUES (?, ?, 1, 0, 0, 'CASH')",
+            ((sale_id, f"2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d} "
+                       f"{random.randint(8, 21):02d}:{random.randint(0, 59):02d}:00")
+             for sale_id in range(1, sales + 1))
+        )
+        conn.executemany(
+            "INSERT INTO SaleItems (sale_id, product_id, quantity, unit_price, subtotal) VALUES (?, ?, ?, ?, ?)",
+            ((1 + i // lines_per_sale, product_id, 2, 10 + product_id % 90, 2 * (10 + product_id % 90))
+             for i, product_id in ((i, random.randint(1, products)) for i in range(sales * lines_per_sale)))
+        )
+
+
+def anonymous_rss_mb():
+    """Heap and other private memory of the process, 0 where /proc is missing"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0
+
+
+def timed_export(path, chunk):
+    before = anonymous_rss_mb()
+    peak = [before]
+
+    def sample(rows):
+        peak[0] = max(peak[0], anonymous_rss_mb())
+
+    started = time.perf_counter()
+    rows = DataExport.run('sale_items', path, START, END, chunk, progress=sample)
+    seconds = time.perf_counter() - started
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"{os.path.basename(path):<18} {rows} lignes en {seconds:6.1f} s "
+          f"({rows / seconds:,.0f} lignes/s), {size_mb:.0f} Mo, "
+          f"mémoire anonyme max +{peak[0] - before:.0f} Mo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=2000000, help="sale lines in the history")
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--chunk", type=int, default=50000, help="rows per fetchmany() chunk")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="pos_export_")
+    DatabaseManager.DB_PATH = os.path.join(directory, "bench.db")
+    initialize_database()
+    seed(args.lines, args.products)
+    print(f"{args.lines} sale lines, {args.products} products")
+
+    timed_export(os.path.join(directory, "lines.csv"), args.chunk)
+    if importlib.util.find_spec("pyarrow") is None:
+        print("Parquet: pyarrow non installé, ignoré")
+    else:
+        timed_export(os.path.join(directory, "lines.parquet"), args.chunk)
+    DatabaseManager.close_pool()
+
+
+if __name__ == "__main__":
+    main()
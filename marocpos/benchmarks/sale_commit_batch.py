@@ -0,0 +1,87 @@
+"""Sale commit latency by basket size: per-line statements vs SaleCommitService.
+
+The per-line path is what process_sale() used to do: one INSERT into
+SaleItems and one stock UPDATE for every line.
+
+    python -m benchmarks.sale_commit_batch [--baskets 200] [--sizes 1 50 500]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from database import DatabaseManager, initialize_database
+from models.sale_commit import SaleCommitService
+
+
+def seed(products):
+    with DatabaseManager.session() as conn:
+        conn.executemany(
+            "INSERT INTO Products (name, barcode, unit_price, stock) VALUES (?, ?, ?, ?)",
+            [(f"Produit {i}", f"BC{i:08d}", 10 + i % 90, 1000000) for i in range(products)]
+        )
+
+
+def basket(size, products):
+    return [{
+        'product_id': product_id,
+        'variant_id': None,
+        'quantity': random.randint(1, 3),
+        'unit_price': 9.99,
+    } for product_id in random.sample(range(1, products + 1), size)]
+
+
+def commit_per_line(items):
+    started = time.perf_counter()
+    with DatabaseManager.session() as conn:
+        cursor = conn.execute("""
+            INSERT INTO Sales (created_at, user_id, total_amount, discount, tax_amount, final_total, payment_method)
+            VALUES (CURRENT_TIMESTAMP, 1, 0, 0, 0, 0, 'CASH')
+        """)
+        sale_id = cursor.lastrowid
+        for item in items:
+            conn.execute("""
+                INSERT INTO SaleItems (sale_id, product_id, variant_id, quantity, unit_price, subtotal)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (sale_id, item['product_id'], None, item['quantity'], item['unit_price'],
+                  item['quantity'] * item['unit_price']))
+            conn.execute("UPDATE Products SET stock = stock - ? WHERE id = ?",
+                         (item['quantity'], item['product_id']))
+    return (time.perf_counter() - started) * 1000
+
+
+def commit_batched(items):
+    sale_id, metrics = SaleCommitService.commit(1, items)
+    if sale_id is None:
+        raise RuntimeError(metrics['error'])
+    return metrics['total_ms']
+
+
+def summarize(label, size, latencies):
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<9} lines={size:>4}  p50={statistics.median(latencies):8.3f}ms "
+          f"p95={p95:8.3f}ms max={latencies[-1]:8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baskets", type=int, default=200, help="baskets per size and method")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 50, 500])
+    parser.add_argument("--products", type=int, default=5000)
+    args = parser.parse_args()
+
+    DatabaseManager.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="pos_bench_"), "bench.db")
+    initialize_database()
+    seed(args.products)
+
+    for size in args.sizes:
+        for label, commit in [("per-line", commit_per_line), ("batched", commit_batched)]:
+            summarize(label, size, [commit(basket(size, args.products)) for _ in range(args.baskets)])
+    DatabaseManager.close_pool()
+
+
+if __name__ == "__main__":
+    main()
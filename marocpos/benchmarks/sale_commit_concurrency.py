@@ -0,0 +1,129 @@
+"""Sale-commit latency while a back-office report reads the database.
+
+Compares SQLite defaults (rollback journal, synchronous=FULL) with
+DatabaseManager.PERFORMANCE_PROFILE (WAL, synchronous=NORMAL, ...).
+
+    python -m benchmarks.sale_commit_concurrency [--sales 2000] [--products 2000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from database import DatabaseManager, initialize_database
+
+SQLITE_DEFAULTS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'cache_size': -2000,
+    'mmap_size': 0,
+    'temp_store': 'DEFAULT',
+    'wal_autocheckpoint': None,
+}
+
+
+def seed(products, history):
+    """Create a catalogue and some sales history for the report to chew on."""
+    with DatabaseManager.session() as conn:
+        conn.executemany(
+            "INSERT INTO Products (name, barcode, unit_price, purchase_price, stock) VALUES (?, ?, ?, ?, ?)",
+            [(f"Produit {i}", f"BC{i:08d}", 10 + i % 90, 5 + i % 40, 1000000) for i in range(products)]
+        )
+        for sale_index in range(history):
+            cursor = conn.execute("""
+                INSERT INTO Sales (user_id, total_amount, final_total, created_at)
+                VALUES (1, 0, 0, CURRENT_TIMESTAMP)
+            """)
+            sale_id = cursor.lastrowid
+            conn.executemany("""
+                INSERT INTO SaleItems (sale_id, product_id, quantity, unit_price, subtotal)
+                VALUES (?, ?, 1, 10, 10)
+            """, [(sale_id, random.randint(1, products)) for _ in range(5)])
+
+
+def commit_sale(products, lines):
+    """Write one basket the way the checkout does and return its latency in ms."""
+    started = time.perf_counter()
+    with DatabaseManager.session() as conn:
+        cursor = conn.execute("""
+            INSERT INTO Sales (user_id, total_amount, final_total, created_at)
+            VALUES (1, 0, 0, CURRENT_TIMESTAMP)
+        """)
+        sale_id = cursor.lastrowid
+        for _ in range(lines):
+            product_id = random.randint(1, products)
+            conn.execute("""
+                INSERT INTO SaleItems (sale_id, product_id, quantity, unit_price, subtotal)
+                VALUES (?, ?, 1, 10, 10)
+            """, (sale_id, product_id))
+            conn.execute("UPDATE Products SET stock = stock - 1 WHERE id = ?", (product_id,))
+    return (time.perf_counter() - started) * 1000
+
+
+def report_reader(stop, counter):
+    """Loop a day-end style aggregate until told to stop."""
+    while not stop.is_set():
+        with DatabaseManager.session() as conn:
+            conn.execute("""
+                SELECT p.category_id, SUM(si.subtotal), COUNT(*)
+                FROM SaleItems si
+                JOIN Products p ON p.id = si.product_id
+                JOIN Sales s ON s.id = si.sale_id
+                GROUP BY p.category_id
+            """).fetchall()
+        counter[0] += 1
+
+
+def run(label, overrides, args):
+    path = os.path.join(tempfile.mkdtemp(prefix="pos_bench_"), "bench.db")
+    DatabaseManager.DB_PATH = path
+    DatabaseManager.configure_performance(**overrides)
+    initialize_database()
+    seed(args.products, args.history)
+
+    stop = threading.Event()
+    reads = [0]
+    reader = threading.Thread(target=report_reader, args=(stop, reads), daemon=True)
+    reader.start()
+
+    latencies = []
+    failures = 0
+    for _ in range(args.sales):
+        try:
+            latencies.append(commit_sale(args.products, args.lines))
+        except sqlite3.OperationalError:
+            failures += 1
+
+    stop.set()
+    reader.join()
+    DatabaseManager.close_pool()
+
+    latencies.sort()
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else float('nan')
+    print(f"{label:<10} commits={len(latencies):>5} failed={failures:>3} reports={reads[0]:>5}  "
+          f"p50={pct(0.50):7.2f}ms p95={pct(0.95):7.2f}ms p99={pct(0.99):7.2f}ms "
+          f"max={(latencies[-1] if latencies else float('nan')):7.2f}ms "
+          f"mean={(statistics.mean(latencies) if latencies else float('nan')):7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=2000, help="sales to commit per profile")
+    parser.add_argument("--lines", type=int, default=5, help="lines per sale")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=20000, help="pre-existing sales")
+    args = parser.parse_args()
+
+    tuned = dict(DatabaseManager.PERFORMANCE_PROFILE)
+    run("defaults", SQLITE_DEFAULTS, args)
+    DatabaseManager.PERFORMANCE_PROFILE = tuned
+    run("tuned", {}, args)
+
+
+if __name__ == "__main__":
+    main()
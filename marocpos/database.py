@@ -1,21 +1,228 @@
 import sqlite3
 import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from datetime import datetime, UTC
 
+class _ThreadSlot:
+    """Thread-local handle on a pooled connection entry.
+
+    Only the owning thread's threading.local refers to it, so it is collected
+    when that thread ends (or switches database), which releases the entry.
+    """
+    __slots__ = ('entry', '__weakref__')
+
+    def __init__(self, entry):
+        self.entry = entry
+
 class DatabaseManager:
     DB_PATH = "pos7.db"
 
+    # Pragmas applied to every new connection. WAL lets back-office reads run
+    # alongside sale commits; NORMAL sync is durable across app crashes in WAL mode.
+    PERFORMANCE_PROFILE = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,        # negative value = KiB, i.e. ~16 MB page cache
+        'mmap_size': 268435456,      # 256 MB memory-mapped I/O
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,        # ms to wait on a locked database before failing
+        'wal_autocheckpoint': 1000,  # pages
+    }
+    # Seconds between passive WAL checkpoints triggered after a commit (0 disables)
+    CHECKPOINT_INTERVAL = 300
+    _last_checkpoint = time.monotonic()
+
+    # Connection pool: one persistent connection per (thread, database path)
+    _local = threading.local()
+    # Reentrant: a thread-exit finalizer may release an entry while the lock is held
+    _pool_lock = threading.RLock()
+    _pool = []
+    _stats = {
+        'connections_opened': 0,
+        'connections_reused': 0,
+        'connections_closed': 0,
+        'sessions': 0,
+        'commits': 0,
+        'rollbacks': 0,
+        'checkpoints': 0,
+    }
+
+    @classmethod
+    def configure_performance(cls, **overrides):
+        """Override pragmas of the performance profile (None removes one).
+
+        Pooled connections are closed so the new profile applies on next use.
+        """
+        profile = dict(cls.PERFORMANCE_PROFILE)
+        for pragma, value in overrides.items():
+            if value is None:
+                profile.pop(pragma, None)
+            else:
+                profile[pragma] = value
+        cls.PERFORMANCE_PROFILE = profile
+        cls.close_pool()
+        return profile
+
+    @classmethod
+    def _apply_performance_profile(cls, conn):
+        """Apply PERFORMANCE_PROFILE pragmas to a freshly opened connection."""
+        for pragma, value in cls.PERFORMANCE_PROFILE.items():
+            try:
+                conn.execute(f"PRAGMA {pragma} = {value}")
+            except sqlite3.Error as e:
+                print(f"Error applying PRAGMA {pragma}: {e}")
+
+    @classmethod
+    def checkpoint(cls, mode="PASSIVE"):
+        """Run a WAL checkpoint on the calling thread's connection."""
+        conn = cls.pooled_connection()
+        busy, log_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        with cls._pool_lock:
+            cls._stats['checkpoints'] += 1
+            cls._last_checkpoint = time.monotonic()
+        return {'busy': busy, 'log_frames': log_frames, 'checkpointed': checkpointed}
+
+    @classmethod
+    def _maybe_checkpoint(cls):
+        """Checkpoint the WAL when CHECKPOINT_INTERVAL has elapsed since the last one."""
+        if not cls.CHECKPOINT_INTERVAL:
+            return
+        if time.monotonic() - cls._last_checkpoint < cls.CHECKPOINT_INTERVAL:
+            return
+        try:
+            cls.checkpoint()
+        except sqlite3.Error as e:
+            print(f"Error running WAL checkpoint: {e}")
+
     @classmethod
     def get_connection(cls):
         """Create and return a connection to the SQLite database."""
         try:
             conn = sqlite3.connect(cls.DB_PATH)
             conn.row_factory = sqlite3.Row
+            cls._apply_performance_profile(conn)
             return conn
         except sqlite3.Error as e:
             print(f"Error connecting to database: {e}")
             return None
 
+    @classmethod
+    def _create_pooled_connection(cls):
+        """Open a connection that stays alive for the owning thread."""
+        # Transactions are managed explicitly by session(), hence autocommit mode.
+        # check_same_thread is off only so close_pool() can run from any thread;
+        # each connection is still used exclusively by the thread that opened it.
+        conn = sqlite3.connect(cls.DB_PATH, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        cls._apply_performance_profile(conn)
+        return conn
+
+    @classmethod
+    def pooled_connection(cls):
+        """Return the calling thread's persistent connection, opening it on first use."""
+        slot = getattr(cls._local, 'slot', None)
+        if slot is not None and slot.entry['path'] == cls.DB_PATH and not slot.entry['closed']:
+            with cls._pool_lock:
+                cls._stats['connections_reused'] += 1
+            return slot.entry['conn']
+
+        conn = cls._create_pooled_connection()
+        entry = {'conn': conn, 'path': cls.DB_PATH, 'depth': 0, 'closed': False}
+        slot = _ThreadSlot(entry)
+        # Threads are not told when a pool worker expires, but their locals are
+        # dropped: close the connection then instead of leaking it in _pool
+        weakref.finalize(slot, cls._release_entry, entry)
+        cls._local.slot = slot
+        with cls._pool_lock:
+            cls._pool.append(entry)
+            cls._stats['connections_opened'] += 1
+        return conn
+
+    @classmethod
+    def _close_entry(cls, entry):
+        """Close a pool entry's connection once; the caller holds _pool_lock."""
+        if entry['closed']:
+            return
+        try:
+            entry['conn'].close()
+        except sqlite3.Error as e:
+            print(f"Error closing pooled connection: {e}")
+        entry['closed'] = True
+        cls._stats['connections_closed'] += 1
+
+    @classmethod
+    def _release_entry(cls, entry):
+        """Close the connection of a thread that went away and prune it from the pool."""
+        with cls._pool_lock:
+            cls._close_entry(entry)
+            cls._pool = [other for other in cls._pool if other is not entry]
+
+    @classmethod
+    @contextmanager
+    def session(cls, immediate=False):
+        """Yield the thread's pooled connection inside a transaction.
+
+        The outermost session commits on success and rolls back on error;
+        nested sessions join the enclosing transaction. immediate=True takes
+        the write lock up front (BEGIN IMMEDIATE), so a writer waits for it
+        at the start instead of failing to upgrade a read half way through.
+        """
+        conn = cls.pooled_connection()
+        entry = cls._local.slot.entry
+        outermost = entry['depth'] == 0
+        if outermost:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        entry['depth'] += 1
+        try:
+            yield conn
+        except BaseException:
+            entry['depth'] -= 1
+            if outermost and conn.in_transaction:
+                conn.execute("ROLLBACK")
+                with cls._pool_lock:
+                    cls._stats['rollbacks'] += 1
+            raise
+        else:
+            entry['depth'] -= 1
+            if outermost:
+                if conn.in_transaction:
+                    try:
+                        conn.execute("COMMIT")
+                    except BaseException:
+                        # A failed COMMIT (e.g. SQLITE_BUSY) can leave the
+                        # transaction open; don't let the next session join it
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                        with cls._pool_lock:
+                            cls._stats['rollbacks'] += 1
+                        raise
+                with cls._pool_lock:
+                    cls._stats['commits'] += 1
+                cls._maybe_checkpoint()
+        finally:
+            if outermost:
+                with cls._pool_lock:
+                    cls._stats['sessions'] += 1
+
+    @classmethod
+    def pool_stats(cls):
+        """Return a snapshot of the connection pool metrics."""
+        with cls._pool_lock:
+            stats = dict(cls._stats)
+            stats['open_connections'] = sum(1 for entry in cls._pool if not entry['closed'])
+        return stats
+
+    @classmethod
+    def close_pool(cls):
+        """Close every pooled connection (e.g. before deleting the database file)."""
+        with cls._pool_lock:
+            for entry in list(cls._pool):
+                cls._close_entry(entry)
+            cls._pool = []
+
     @classmethod
     def get_current_datetime(cls):
         """Get current UTC datetime in YYYY-MM-DD HH:MM:SS format."""
@@ -26,258 +233,66 @@ def get_connection():
     return DatabaseManager.get_connection()
 
 def initialize_database():
-    """Initialize the database by creating required tables if they don't exist."""
-    connection = get_connection()
-    if not connection:
-        print("Failed to connect to the database. Initialization aborted.")
-        return False
-
-    cursor = connection.cursor()
-
-    schema = """
-    CREATE TABLE IF NOT EXISTS Stores (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        address TEXT,
-        phone TEXT,
-        email TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-
-    CREATE TABLE IF NOT EXISTS Categories (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL UNIQUE,
-        description TEXT,
-        parent_id INTEGER,
-        image_path TEXT,
-        tax_rate REAL DEFAULT 0,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (parent_id) REFERENCES Categories(id) ON DELETE SET NULL
-    );
-
-    CREATE TABLE IF NOT EXISTS Products (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL UNIQUE,
-        description TEXT,
-        barcode TEXT UNIQUE,
-        unit_price REAL NOT NULL,
-        purchase_price REAL DEFAULT 0,
-        profit_margin REAL,
-        stock INTEGER NOT NULL DEFAULT 0,
-        min_stock INTEGER DEFAULT 0,
-        reorder_point INTEGER DEFAULT 0,
-        category_id INTEGER,
-        image_path TEXT,
-        unit TEXT DEFAULT 'piece',
-        weight REAL,
-        volume REAL,
-        status TEXT DEFAULT 'available',
-        product_type TEXT DEFAULT 'stockable',
-        valuation_method TEXT DEFAULT 'FIFO',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (category_id) REFERENCES Categories(id) ON DELETE SET NULL
-    );
-
-    CREATE TABLE IF NOT EXISTS ProductAttributes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL UNIQUE,
-        description TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    
-    CREATE TABLE IF NOT EXISTS ProductAttributeValues (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        attribute_id INTEGER NOT NULL,
-        value TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (attribute_id) REFERENCES ProductAttributes(id) ON DELETE CASCADE,
-        UNIQUE(attribute_id, value)
-    );
-    
-    CREATE TABLE IF NOT EXISTS ProductVariants (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        product_id INTEGER NOT NULL,
-        name TEXT NOT NULL,
-        barcode TEXT UNIQUE,
-        unit_price REAL,
-        purchase_price REAL,
-        stock INTEGER DEFAULT 0,
-        attributes TEXT,
-        sku TEXT,
-        image_path TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (product_id) REFERENCES Products(id) ON DELETE CASCADE
-    );
-
-    CREATE TABLE IF NOT EXISTS StockMovements (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        product_id INTEGER,
-        variant_id INTEGER,
-        movement_type TEXT CHECK(movement_type IN ('in', 'out', 'adjustment')),
-        quantity INTEGER NOT NULL,
-        unit_price REAL,
-        reference TEXT,
-        notes TEXT,
-        user_id INTEGER,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (product_id) REFERENCES Products(id) ON DELETE CASCADE,
-        FOREIGN KEY (variant_id) REFERENCES ProductVariants(id) ON DELETE CASCADE,
-        FOREIGN KEY (user_id) REFERENCES Users(id)
-    );
-
-    CREATE TABLE IF NOT EXISTS Users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL UNIQUE,
-        password TEXT NOT NULL,
-        role TEXT NOT NULL CHECK(role IN ('admin', 'cashier', 'manager')),
-        full_name TEXT,
-        email TEXT,
-        phone TEXT,
-        active INTEGER DEFAULT 1,
-        last_login TIMESTAMP,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-
-    CREATE TABLE IF NOT EXISTS Sales (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        total_amount REAL NOT NULL,
-        discount REAL DEFAULT 0,
-        tax_amount REAL DEFAULT 0,
-        final_total REAL NOT NULL,
-        payment_method TEXT DEFAULT 'CASH',
-        payment_status TEXT DEFAULT 'COMPLETED',
-        notes TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES Users(id)
-    );
-
-    CREATE TABLE IF NOT EXISTS SaleItems (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        sale_id INTEGER NOT NULL,
-        product_id INTEGER NOT NULL,
-        variant_id INTEGER,
-        quantity INTEGER NOT NULL,
-        unit_price REAL NOT NULL,
-        subtotal REAL NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (sale_id) REFERENCES Sales(id),
-        FOREIGN KEY (product_id) REFERENCES Products(id),
-        FOREIGN KEY (variant_id) REFERENCES ProductVariants(id)
-    );
-
-    CREATE TABLE IF NOT EXISTS Cart (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        product_id INTEGER NOT NULL,
-        variant_id INTEGER,
-        quantity INTEGER NOT NULL DEFAULT 1,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES Users(id),
-        FOREIGN KEY (product_id) REFERENCES Products(id),
-        FOREIGN KEY (variant_id) REFERENCES ProductVariants(id)
-    );
-
-    CREATE TABLE IF NOT EXISTS Settings (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        key TEXT NOT NULL UNIQUE,
-        value TEXT,
-        description TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-
-    CREATE TABLE IF NOT EXISTS Expenses (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        description TEXT NOT NULL,
-        amount REAL NOT NULL,
-        date DATE NOT NULL,
-        category TEXT,
-        user_id INTEGER,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES Users(id)
-    );
-
-    CREATE TABLE IF NOT EXISTS Suppliers (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        contact_person TEXT,
-        phone TEXT,
-        email TEXT,
-        address TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-
-    CREATE TABLE IF NOT EXISTS ProductSuppliers (
-        product_id INTEGER,
-        supplier_id INTEGER,
-        price REAL,
-        lead_time INTEGER,
-        minimum_order INTEGER,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        PRIMARY KEY (product_id, supplier_id),
-        FOREIGN KEY (product_id) REFERENCES Products(id),
-        FOREIGN KEY (supplier_id) REFERENCES Suppliers(id)
-    );
-    """
+    """Initialize the database by applying pending schema migrations and seeding defaults."""
+    # Imported here because migrations builds on DatabaseManager
+    from migrations import apply_migrations
 
     try:
-        # Create tables
-        cursor.executescript(schema)
-
-        # Check if admin user exists, if not create it
-        cursor.execute("SELECT COUNT(*) FROM Users WHERE username = ?", ('MAFPOS',))
-        if cursor.fetchone()[0] == 0:
-            current_time = DatabaseManager.get_current_datetime()
-            cursor.execute("""
-                INSERT INTO Users (
-                    username, password, role, full_name, active, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, ('MAFPOS', 'admin123', 'admin', 'Administrator', 1, current_time))
-
-        # Initialize default settings
-        default_settings = [
-            ('store_name', 'My Store', 'Store name'),
-            ('store_address', '', 'Store address'),
-            ('store_phone', '', 'Store phone number'),
-            ('store_email', '', 'Store email'),
-            ('tax_rate', '0', 'Default tax rate'),
-            ('currency', 'MAD', 'Store currency'),
-            ('receipt_footer', 'Thank you for your purchase!', 'Receipt footer message'),
-            ('default_product_type', 'stockable', 'Default product type'),
-            ('default_valuation_method', 'FIFO', 'Default stock valuation method'),
-            ('low_stock_alert', 'true', 'Enable low stock alerts'),
-            ('auto_reorder', 'false', 'Enable automatic reordering'),
-            ('default_unit', 'piece', 'Default unit of measure'),
-            ('receipt_printer_type', 'thermal', 'Receipt printer type (thermal/A4)'),
-            ('receipt_logo_path', '', 'Path to receipt logo image')
-        ]
-
-        for key, value, description in default_settings:
-            cursor.execute("""
+        version = apply_migrations()
+
+        with DatabaseManager.session() as connection:
+            cursor = connection.cursor()
+
+            # Check if admin user exists, if not create it
+            cursor.execute("SELECT COUNT(*) FROM Users WHERE username = ?", ('MAFPOS',))
+            if cursor.fetchone()[0] == 0:
+                current_time = DatabaseManager.get_current_datetime()
+                cursor.execute("""
+                    INSERT INTO Users (
+                        username, password, role, full_name, active, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                """, ('MAFPOS', 'admin123', 'admin', 'Administrator', 1, current_time))
+
+            # Initialize default settings
+            default_settings = [
+                ('store_name', 'My Store', 'Store name'),
+                ('store_address', '', 'Store address'),
+                ('store_phone', '', 'Store phone number'),
+                ('store_email', '', 'Store email'),
+                ('tax_rate', '0', 'Default tax rate'),
+                ('currency', 'MAD', 'Store currency'),
+                ('receipt_footer', 'Thank you for your purchase!', 'Receipt footer message'),
+                ('default_product_type', 'stockable', 'Default product type'),
+                ('default_valuation_method', 'FIFO', 'Default stock valuation method'),
+                ('low_stock_alert', 'true', 'Enable low stock alerts'),
+                ('auto_reorder', 'false', 'Enable automatic reordering'),
+                ('default_unit', 'piece', 'Default unit of measure'),
+                ('receipt_printer_type', 'thermal', 'Receipt printer type (thermal/A4)'),
+                ('receipt_logo_path', '', 'Path to receipt logo image')
+            ]
+
+            cursor.executemany("""
                 INSERT OR IGNORE INTO Settings (key, value, description)
                 VALUES (?, ?, ?)
-            """, (key, value, description))
+            """, default_settings)
 
-        connection.commit()
-        print("✅ Base de données initialisée avec succès.\n")
+        print(f"✅ Base de données initialisée avec succès (schéma v{version}).\n")
 
-        # Print database info
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
-        print("📦 Tables existantes:")
-        for table in tables:
-            print(f"- {table[0]}")
+        with DatabaseManager.session() as connection:
+            cursor = connection.cursor()
 
-        cursor.execute("SELECT name FROM Categories")
-        categories = cursor.fetchall()
-        print("\n📁 Catégories existantes:")
-        for category in categories:
-            print(f"- {category[0]}")
+            # Print database info
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = cursor.fetchall()
+            print("📦 Tables existantes:")
+            for table in tables:
+                print(f"- {table[0]}")
+
+            cursor.execute("SELECT name FROM Categories")
+            categories = cursor.fetchall()
+            print("\n📁 Catégories existantes:")
+            for category in categories:
+                print(f"- {category[0]}")
 
         print("\n✅ Tables créées ou vérifiées.")
         print("✅ Utilisateur admin par défaut existant.")
@@ -287,13 +302,10 @@ def initialize_database():
         print(f"❌ Erreur lors de l'initialisation de la base de données : {e}")
         return False
 
-    finally:
-        if connection:
-            connection.close()
-
 def reset_database():
     """Reset the database by deleting and recreating it."""
     try:
+        DatabaseManager.close_pool()
         if os.path.exists(DatabaseManager.DB_PATH):
             os.remove(DatabaseManager.DB_PATH)
             print("🗑️ Ancienne base de données supprimée.")
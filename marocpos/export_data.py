@@ -0,0 +1,45 @@
+"""Export sales, sale lines, stock movements or the catalogue to CSV or Parquet.
+
+    python export_data.py sale_items lignes_2024.csv --from 2024-01-01 --to 2024-12-31
+    python export_data.py stock_movements mouvements.parquet [--chunk 50000] [--delimiter ';'] [--db pos7.db]
+
+Parquet (a .parquet file name) needs pyarrow. The catalogue (products) is
+exported as it is now, without a period.
+"""
+import argparse
+import sys
+
+from database import DatabaseManager
+from migrations import apply_migrations
+from models.data_export import DataExport, DATASETS, CHUNK_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export des ventes, du stock et du catalogue (CSV ou Parquet)")
+    parser.add_argument("dataset", choices=list(DATASETS))
+    parser.add_argument("path", help="fichier .csv ou .parquet")
+    parser.add_argument("--from", dest="date_from", help="premier jour inclus (AAAA-MM-JJ)")
+    parser.add_argument("--to", dest="date_to", help="dernier jour inclus (AAAA-MM-JJ)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="lignes lues à la fois")
+    parser.add_argument("--delimiter", default=",", help="séparateur CSV (défaut : ,)")
+    parser.add_argument("--db", default=DatabaseManager.DB_PATH)
+    args = parser.parse_args()
+
+    DatabaseManager.DB_PATH = args.db
+    apply_migrations()
+
+    def progress(rows):
+        print(f"\r{rows} lignes", end="", flush=True)
+
+    try:
+        rows = DataExport.run(args.dataset, args.path, args.date_from, args.date_to,
+                              args.chunk, args.delimiter, progress)
+    except (OSError, ImportError, ValueError) as e:
+        print(f"\n❌ {e}")
+        return 1
+    print(f"\r✅ {rows} lignes exportées dans {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
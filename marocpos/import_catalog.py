@@ -0,0 +1,54 @@
+"""Import a product catalogue from a CSV or XLSX file.
+
+    python import_catalog.py produits.csv [--batch 2000] [--user 1] [--db pos7.db]
+
+Columns (French or English headers): nom, code_barres, description,
+categorie, prix_vente, prix_achat, stock, stock_min, unite, sku, attributs.
+Existing products are updated, matched on their barcode (or their name
+when the row has none); rows with attributs ("Taille=M | Couleur=Rouge")
+are variants of the product named in nom.
+"""
+import argparse
+import sys
+
+from database import DatabaseManager
+from migrations import apply_migrations
+from models.catalog_import import CatalogImport, BATCH_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import du catalogue produits (CSV ou XLSX)")
+    parser.add_argument("path", help="fichier .csv ou .xlsx")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="lignes par transaction")
+    parser.add_argument("--user", type=int, help="utilisateur des mouvements de stock")
+    parser.add_argument("--db", default=DatabaseManager.DB_PATH)
+    args = parser.parse_args()
+
+    DatabaseManager.DB_PATH = args.db
+    apply_migrations()
+
+    def progress(rows, rate):
+        print(f"\r{rows} lignes — {rate:.0f} lignes/s", end="", flush=True)
+
+    try:
+        result = CatalogImport.run(args.path, args.batch, args.user, progress)
+    except (OSError, ImportError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    print()
+    print(f"Lignes lues        : {result['rows']}")
+    print(f"Produits écrits    : {result['products']}")
+    print(f"Variantes écrites  : {result['variants']}")
+    print(f"Mouvements de stock: {result['movements']}")
+    print(f"Durée              : {result['seconds']:.1f} s")
+    if result['error_count']:
+        print(f"\n{result['error_count']} lignes ignorées :")
+        for line, message in result['errors'][:50]:
+            print(f"  ligne {line}: {message}")
+        if result['error_count'] > 50:
+            print(f"  ... et {result['error_count'] - 50} autres")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
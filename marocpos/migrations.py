@@ -0,0 +1,1439 @@
+"""Versioned schema migrations.
+
+The schema version lives in ``PRAGMA user_version``. Each migration runs once,
+in order, inside its own transaction together with the version bump, so
+queries elsewhere can rely on the final schema instead of probing it.
+"""
+from database import DatabaseManager
+
+BASE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS Stores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        location TEXT,
+        address TEXT,
+        phone TEXT,
+        email TEXT,
+        active INTEGER NOT NULL DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        description TEXT,
+        parent_id INTEGER,
+        image_path TEXT,
+        tax_rate REAL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (parent_id) REFERENCES Categories(id) ON DELETE SET NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        description TEXT,
+        barcode TEXT UNIQUE,
+        unit_price REAL NOT NULL,
+        purchase_price REAL DEFAULT 0,
+        profit_margin REAL,
+        stock INTEGER NOT NULL DEFAULT 0,
+        min_stock INTEGER DEFAULT 0,
+        reorder_point INTEGER DEFAULT 0,
+        category_id INTEGER,
+        image_path TEXT,
+        unit TEXT DEFAULT 'piece',
+        weight REAL,
+        volume REAL,
+        status TEXT DEFAULT 'available',
+        product_type TEXT DEFAULT 'stockable',
+        valuation_method TEXT DEFAULT 'FIFO',
+        has_variants BOOLEAN DEFAULT 0,
+        variant_attributes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (category_id) REFERENCES Categories(id) ON DELETE SET NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ProductAttributes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ProductAttributeValues (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        attribute_id INTEGER NOT NULL,
+        value TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (attribute_id) REFERENCES ProductAttributes(id) ON DELETE CASCADE,
+        UNIQUE(attribute_id, value)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ProductVariants (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        name TEXT NOT NULL DEFAULT '',
+        barcode TEXT UNIQUE,
+        unit_price REAL,
+        purchase_price REAL,
+        price_adjustment REAL DEFAULT 0,
+        stock INTEGER DEFAULT 0,
+        attributes TEXT,
+        attribute_values TEXT,
+        sku TEXT,
+        image_path TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (product_id) REFERENCES Products(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS StockMovements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER,
+        variant_id INTEGER,
+        movement_type TEXT CHECK(movement_type IN ('in', 'out', 'adjustment')),
+        quantity INTEGER NOT NULL,
+        unit_price REAL,
+        reference TEXT,
+        notes TEXT,
+        user_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (product_id) REFERENCES Products(id) ON DELETE CASCADE,
+        FOREIGN KEY (variant_id) REFERENCES ProductVariants(id) ON DELETE CASCADE,
+        FOREIGN KEY (user_id) REFERENCES Users(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL,
+        role TEXT NOT NULL CHECK(role IN ('admin', 'cashier', 'manager')),
+        full_name TEXT,
+        email TEXT,
+        phone TEXT,
+        active INTEGER DEFAULT 1,
+        last_login TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        total_amount REAL NOT NULL,
+        discount REAL DEFAULT 0,
+        tax_amount REAL DEFAULT 0,
+        final_total REAL NOT NULL,
+        payment_method TEXT DEFAULT 'CASH',
+        payment_status TEXT DEFAULT 'COMPLETED',
+        notes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES Users(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS SaleItems (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sale_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        variant_id INTEGER,
+        quantity INTEGER NOT NULL,
+        unit_price REAL NOT NULL,
+        subtotal REAL NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (sale_id) REFERENCES Sales(id),
+        FOREIGN KEY (product_id) REFERENCES Products(id),
+        FOREIGN KEY (variant_id) REFERENCES ProductVariants(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Cart (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        variant_id INTEGER,
+        quantity INTEGER NOT NULL DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES Users(id),
+        FOREIGN KEY (product_id) REFERENCES Products(id),
+        FOREIGN KEY (variant_id) REFERENCES ProductVariants(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Settings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        key TEXT NOT NULL UNIQUE,
+        value TEXT,
+        description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        description TEXT NOT NULL,
+        amount REAL NOT NULL,
+        date DATE NOT NULL,
+        category TEXT,
+        user_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES Users(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Suppliers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        contact_person TEXT,
+        phone TEXT,
+        email TEXT,
+        address TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ProductSuppliers (
+        product_id INTEGER,
+        supplier_id INTEGER,
+        price REAL,
+        lead_time INTEGER,
+        minimum_order INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (product_id, supplier_id),
+        FOREIGN KEY (product_id) REFERENCES Products(id),
+        FOREIGN KEY (supplier_id) REFERENCES Suppliers(id)
+    )
+    """,
+]
+
+# Columns that older builds stored under another name, as (old, new) pairs.
+# A column is only renamed when the new name doesn't exist yet.
+LEGACY_RENAMED_COLUMNS = {
+    'Sales': [
+        ('date', 'created_at'),
+        ('total', 'total_amount'),
+        ('tax', 'tax_amount'),
+    ],
+    'SaleItems': [
+        ('price', 'unit_price'),
+    ],
+    'Products': [
+        ('price', 'unit_price'),
+    ],
+    'Users': [
+        ('password_hash', 'password'),
+    ],
+}
+
+# Columns that databases created by older builds (or by the per-model
+# create_tables() helpers) may be missing. SQLite cannot ADD COLUMN with a
+# non-constant default, hence plain TIMESTAMP for the date columns.
+LEGACY_COLUMNS = {
+    'Stores': [
+        ('location', 'TEXT'),
+        ('address', 'TEXT'),
+        ('phone', 'TEXT'),
+        ('email', 'TEXT'),
+        ('active', 'INTEGER NOT NULL DEFAULT 1'),
+    ],
+    'Categories': [
+        ('description', 'TEXT'),
+        ('parent_id', 'INTEGER'),
+        ('image_path', 'TEXT'),
+        ('tax_rate', 'REAL DEFAULT 0'),
+        ('created_at', 'TIMESTAMP'),
+        ('updated_at', 'TIMESTAMP'),
+    ],
+    'Products': [
+        ('description', 'TEXT'),
+        ('barcode', 'TEXT'),
+        ('unit_price', 'REAL NOT NULL DEFAULT 0'),
+        ('purchase_price', 'REAL DEFAULT 0'),
+        ('profit_margin', 'REAL'),
+        ('stock', 'INTEGER NOT NULL DEFAULT 0'),
+        ('min_stock', 'INTEGER DEFAULT 0'),
+        ('reorder_point', 'INTEGER DEFAULT 0'),
+        ('category_id', 'INTEGER'),
+        ('image_path', 'TEXT'),
+        ('unit', "TEXT DEFAULT 'piece'"),
+        ('weight', 'REAL'),
+        ('volume', 'REAL'),
+        ('status', "TEXT DEFAULT 'available'"),
+        ('product_type', "TEXT DEFAULT 'stockable'"),
+        ('valuation_method', "TEXT DEFAULT 'FIFO'"),
+        ('has_variants', 'BOOLEAN DEFAULT 0'),
+        ('variant_attributes', 'TEXT'),
+        ('created_at', 'TIMESTAMP'),
+        ('updated_at', 'TIMESTAMP'),
+    ],
+    'ProductVariants': [
+        ('name', "TEXT NOT NULL DEFAULT ''"),
+        ('unit_price', 'REAL'),
+        ('purchase_price', 'REAL'),
+        ('price_adjustment', 'REAL DEFAULT 0'),
+        ('attributes', 'TEXT'),
+        ('attribute_values', 'TEXT'),
+        ('sku', 'TEXT'),
+        ('image_path', 'TEXT'),
+        ('updated_at', 'TIMESTAMP'),
+    ],
+    'Users': [
+        ('password', 'TEXT'),
+        ('full_name', 'TEXT'),
+        ('email', 'TEXT'),
+        ('phone', 'TEXT'),
+        ('last_login', 'TIMESTAMP'),
+        ('created_at', 'TIMESTAMP'),
+        ('updated_at', 'TIMESTAMP'),
+    ],
+    'Sales': [
+        ('user_id', 'INTEGER'),
+        ('total_amount', 'REAL NOT NULL DEFAULT 0'),
+        ('tax_amount', 'REAL DEFAULT 0'),
+        ('payment_method', "TEXT DEFAULT 'CASH'"),
+        ('payment_status', "TEXT DEFAULT 'COMPLETED'"),
+        ('notes', 'TEXT'),
+    ],
+    'SaleItems': [
+        ('variant_id', 'INTEGER'),
+        ('unit_price', 'REAL'),
+        ('subtotal', 'REAL'),
+        ('created_at', 'TIMESTAMP'),
+    ],
+    'Cart': [
+        ('user_id', 'INTEGER'),
+        ('variant_id', 'INTEGER'),
+        ('created_at', 'TIMESTAMP'),
+    ],
+    'Settings': [
+        ('description', 'TEXT'),
+        ('updated_at', 'TIMESTAMP'),
+    ],
+}
+
+
+def table_columns(cursor, table):
+    """Return the set of column names of a table (empty if it doesn't exist)."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def migration_001_base_schema(cursor):
+    """Create every table of the application schema."""
+    for statement in BASE_SCHEMA:
+        cursor.execute(statement)
+
+
+def migration_002_legacy_columns(cursor):
+    """Bring tables created by older builds up to the base schema."""
+    # Very old builds stored e.g. the sale date in a 'date' column
+    for table, renames in LEGACY_RENAMED_COLUMNS.items():
+        for old, new in renames:
+            existing = table_columns(cursor, table)
+            if old in existing and new not in existing:
+                print(f"Migrating {table}.{old} to {table}.{new}...")
+                cursor.execute(f"ALTER TABLE {table} RENAME COLUMN {old} TO {new}")
+
+    for table, columns in LEGACY_COLUMNS.items():
+        existing = table_columns(cursor, table)
+        for name, definition in columns:
+            if name not in existing:
+                print(f"Adding '{name}' column to {table} table...")
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+    cursor.execute("""
+        UPDATE SaleItems
+        SET subtotal = quantity * unit_price
+        WHERE subtotal IS NULL
+    """)
+    cursor.execute("""
+        UPDATE Users
+        SET created_at = COALESCE(created_at, CURRENT_TIMESTAMP),
+            updated_at = COALESCE(updated_at, CURRENT_TIMESTAMP)
+        WHERE created_at IS NULL OR updated_at IS NULL
+    """)
+
+
+def index_exists_on(cursor, table, column):
+    """Return True if an index (including UNIQUE autoindexes) leads with column."""
+    cursor.execute(f"PRAGMA index_list({table})")
+    for index in cursor.fetchall():
+        cursor.execute(f"PRAGMA index_info({index[1]})")
+        info = cursor.fetchall()
+        if info and info[0][2] == column:
+            return True
+    return False
+
+
+def migration_003_hot_path_indexes(cursor):
+    """Index the foreign keys and dates used by receipts, stock history and reports."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_saleitems_sale ON SaleItems(sale_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_saleitems_product ON SaleItems(product_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_created_at ON Sales(created_at)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_stockmovements_product_created
+        ON StockMovements(product_id, created_at)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stockmovements_variant ON StockMovements(variant_id)")
+    # (category_id, name) serves both the category filter and its ORDER BY name
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_category_name ON Products(category_id, name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_productvariants_product ON ProductVariants(product_id)")
+
+    # Tables created by the old per-model helpers have no UNIQUE constraint on
+    # these columns, hence no automatic index to look them up by
+    for table, column in [('Products', 'barcode'), ('Products', 'name'), ('ProductVariants', 'barcode')]:
+        if not index_exists_on(cursor, table, column):
+            cursor.execute(f"CREATE INDEX idx_{table.lower()}_{column} ON {table}({column})")
+
+
+def fts5_available(cursor):
+    """True when this SQLite build ships the FTS5 extension."""
+    options = {row[0] for row in cursor.execute("PRAGMA compile_options")}
+    return "ENABLE_FTS5" in options
+
+
+# Builds ProductSearch rows: one per product, with every variant's name,
+# barcode, SKU and attribute values folded into the "variants" column
+PRODUCT_SEARCH_ROWS = """
+    INSERT INTO ProductSearch(rowid, name, barcode, description, variants)
+    SELECT p.id, p.name, p.barcode, p.description,
+           (SELECT group_concat(
+                COALESCE(v.name, '') || ' ' || COALESCE(v.barcode, '') || ' ' ||
+                COALESCE(v.sku, '') || ' ' || COALESCE(v.attribute_values, ''), ' ')
+            FROM ProductVariants v WHERE v.product_id = p.id)
+    FROM Products p
+"""
+
+
+def _product_search_refresh(product_id):
+    """Trigger body that rebuilds the ProductSearch row of one product."""
+    return f"""
+        DELETE FROM ProductSearch WHERE rowid = {product_id};
+        {PRODUCT_SEARCH_ROWS} WHERE p.id = {product_id};
+    """
+
+
+def refresh_product_search(cursor, product_id):
+    """Rebuild the ProductSearch row of one product, if the index exists"""
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'ProductSearch'").fetchone() is None:
+        return
+    cursor.execute("DELETE FROM ProductSearch WHERE rowid = ?", (product_id,))
+    cursor.execute(PRODUCT_SEARCH_ROWS + " WHERE p.id = ?", (product_id,))
+
+
+def migration_004_product_search(cursor):
+    """Full-text index over product and variant names, barcodes and SKUs.
+
+    The index is kept in sync by triggers, so none of the code that writes
+    Products or ProductVariants has to know about it.
+    """
+    if not fts5_available(cursor):
+        print("⚠️ FTS5 indisponible : la recherche de produits utilisera LIKE")
+        return
+
+    # remove_diacritics folds "é", "è", "ç"... so "cafe" finds "Café";
+    # the prefix indexes make "caf*" queries as cheap as full terms
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS ProductSearch USING fts5(
+            name, barcode, description, variants,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '1 2 3'
+        )
+    """)
+
+    # One execute() per trigger: executescript() would commit the migration's
+    # transaction half way through
+    triggers = [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_products_search_insert
+            AFTER INSERT ON Products BEGIN {_product_search_refresh('NEW.id')} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_products_search_update
+            AFTER UPDATE OF name, barcode, description ON Products
+            BEGIN {_product_search_refresh('NEW.id')} END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_products_search_delete
+            AFTER DELETE ON Products BEGIN
+                DELETE FROM ProductSearch WHERE rowid = OLD.id;
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_variants_search_insert
+            AFTER INSERT ON ProductVariants BEGIN {_product_search_refresh('NEW.product_id')} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_variants_search_update
+            AFTER UPDATE OF product_id, name, barcode, sku, attribute_values ON ProductVariants BEGIN
+                {_product_search_refresh('OLD.product_id')}
+                {_product_search_refresh('NEW.product_id')}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_variants_search_delete
+            AFTER DELETE ON ProductVariants BEGIN {_product_search_refresh('OLD.product_id')} END""",
+    ]
+    for trigger in triggers:
+        cursor.execute(trigger)
+
+    cursor.execute("DELETE FROM ProductSearch")
+    cursor.execute(PRODUCT_SEARCH_ROWS)
+
+
+def _bump_catalog_version(name):
+    return f"UPDATE CatalogVersions SET version = version + 1 WHERE name = '{name}';"
+
+
+def migration_005_barcode_version(cursor):
+    """Change counter that tells in-memory barcode indexes to reload.
+
+    Triggers bump it whenever a barcode appears, changes or disappears, from
+    whichever process or code path wrote it. Stock and price updates leave
+    it alone, so selling does not invalidate the index.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS CatalogVersions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO CatalogVersions (name, version) VALUES ('barcodes', 0)")
+
+    bump = _bump_catalog_version('barcodes')
+    triggers = [
+        ('trg_products_barcode_insert', 'AFTER INSERT ON Products'),
+        ('trg_products_barcode_update', 'AFTER UPDATE OF barcode ON Products'),
+        ('trg_products_barcode_delete', 'AFTER DELETE ON Products'),
+        ('trg_variants_barcode_insert', 'AFTER INSERT ON ProductVariants'),
+        ('trg_variants_barcode_update', 'AFTER UPDATE OF barcode, product_id ON ProductVariants'),
+        ('trg_variants_barcode_delete', 'AFTER DELETE ON ProductVariants'),
+    ]
+    for name, event in triggers:
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {bump} END")
+
+
+# Columns the catalogue cache holds; stock is tracked by its own counter so a
+# sale only refreshes stock levels instead of reloading the whole catalogue
+CATALOG_COLUMNS = {
+    'Products': [
+        'name', 'description', 'barcode', 'unit_price', 'purchase_price', 'profit_margin',
+        'min_stock', 'reorder_point', 'category_id', 'image_path', 'unit', 'weight', 'volume',
+        'status', 'product_type', 'valuation_method', 'has_variants', 'variant_attributes',
+    ],
+    'ProductVariants': [
+        'product_id', 'name', 'barcode', 'unit_price', 'purchase_price', 'price_adjustment',
+        'attributes', 'attribute_values', 'sku', 'image_path',
+    ],
+}
+
+
+def migration_006_catalog_versions(cursor):
+    """'catalog' and 'stock' change counters for the in-memory catalogue cache."""
+    cursor.execute("INSERT OR IGNORE INTO CatalogVersions (name, version) VALUES ('catalog', 0)")
+    cursor.execute("INSERT OR IGNORE INTO CatalogVersions (name, version) VALUES ('stock', 0)")
+
+    catalog = _bump_catalog_version('catalog')
+    stock = _bump_catalog_version('stock')
+    for table, prefix in [('Products', 'products'), ('ProductVariants', 'variants')]:
+        # Compare values rather than use UPDATE OF: update_product() lists
+        # every column in its SET clause even when only the stock moved
+        changed = " OR ".join(f"NEW.{column} IS NOT OLD.{column}" for column in CATALOG_COLUMNS[table])
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_{prefix}_catalog_insert
+            AFTER INSERT ON {table} BEGIN {catalog} END""")
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_{prefix}_catalog_update
+            AFTER UPDATE ON {table} WHEN {changed} BEGIN {catalog} END""")
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_{prefix}_catalog_delete
+            AFTER DELETE ON {table} BEGIN {catalog} END""")
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_{prefix}_stock_update
+            AFTER UPDATE OF stock ON {table} WHEN NEW.stock IS NOT OLD.stock BEGIN {stock} END""")
+
+    for event in ['INSERT', 'UPDATE', 'DELETE']:
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_categories_catalog_{event.lower()}
+            AFTER {event} ON Categories BEGIN {catalog} END""")
+
+
+def migration_007_sale_journal_id(cursor):
+    """Sales.journal_id, so a journalled basket is only ever written once."""
+    if 'journal_id' not in table_columns(cursor, 'Sales'):
+        cursor.execute("ALTER TABLE Sales ADD COLUMN journal_id TEXT")
+    # NULLs don't collide: sales recorded without the journal are unaffected
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sales_journal_id ON Sales(journal_id)")
+
+
+# (REAL column, integer cents column) per table. The REAL columns stay for
+# the code and reports that still read them; triggers keep both in step.
+MONEY_COLUMNS = {
+    'Products': [('unit_price', 'unit_price_cents'), ('purchase_price', 'purchase_price_cents')],
+    'ProductVariants': [
+        ('unit_price', 'unit_price_cents'),
+        ('purchase_price', 'purchase_price_cents'),
+        ('price_adjustment', 'price_adjustment_cents'),
+    ],
+    'Sales': [
+        ('total_amount', 'total_cents'),
+        ('discount', 'discount_cents'),
+        ('tax_amount', 'tax_cents'),
+        ('final_total', 'final_total_cents'),
+    ],
+    'SaleItems': [('unit_price', 'unit_price_cents'), ('subtotal', 'subtotal_cents')],
+}
+
+
+def _cents(expression):
+    return f"CAST(ROUND(({expression}) * 100) AS INTEGER)"
+
+
+def migration_008_money_cents(cursor):
+    """Integer cents columns next to every REAL money column.
+
+    Writers that only know the REAL columns keep working: an insert that
+    leaves the cents empty, or an update of a REAL amount, fills them in.
+    """
+    for table, columns in MONEY_COLUMNS.items():
+        existing = table_columns(cursor, table)
+        for real, cents in columns:
+            if cents not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {cents} INTEGER")
+
+        assignments = ", ".join(f"{cents} = {_cents(real)}" for real, cents in columns)
+        cursor.execute(f"UPDATE {table} SET {assignments}")
+
+        prefix = table.lower()
+        fill = ", ".join(f"{cents} = COALESCE(NEW.{cents}, {_cents('NEW.' + real)})" for real, cents in columns)
+        missing = " OR ".join(f"NEW.{cents} IS NULL" for real, cents in columns)
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_{prefix}_cents_insert
+            AFTER INSERT ON {table} WHEN {missing} BEGIN
+                UPDATE {table} SET {fill} WHERE rowid = NEW.rowid;
+            END""")
+
+        reals = ", ".join(real for real, cents in columns)
+        changed = " OR ".join(f"NEW.{real} IS NOT OLD.{real}" for real, cents in columns)
+        sync = ", ".join(f"{cents} = {_cents('NEW.' + real)}" for real, cents in columns)
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_{prefix}_cents_update
+            AFTER UPDATE OF {reals} ON {table} WHEN {changed} BEGIN
+                UPDATE {table} SET {sync} WHERE rowid = NEW.rowid;
+            END""")
+
+
+SUMMARY_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS SalesDailySummary (
+        day TEXT PRIMARY KEY,
+        sale_count INTEGER NOT NULL DEFAULT 0,
+        total_cents INTEGER NOT NULL DEFAULT 0,
+        discount_cents INTEGER NOT NULL DEFAULT 0,
+        tax_cents INTEGER NOT NULL DEFAULT 0,
+        final_total_cents INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS SalesHourlySummary (
+        day TEXT NOT NULL,
+        hour INTEGER NOT NULL,
+        sale_count INTEGER NOT NULL DEFAULT 0,
+        final_total_cents INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, hour)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS SalesCashierSummary (
+        day TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        sale_count INTEGER NOT NULL DEFAULT 0,
+        final_total_cents INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, user_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS SalesPaymentSummary (
+        day TEXT NOT NULL,
+        payment_method TEXT NOT NULL,
+        sale_count INTEGER NOT NULL DEFAULT 0,
+        final_total_cents INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, payment_method)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS SalesProductSummary (
+        day TEXT NOT NULL,
+        product_id INTEGER NOT NULL,
+        quantity REAL NOT NULL DEFAULT 0,
+        revenue_cents INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, product_id)
+    )
+    """,
+    # category_id 0 stands for "no category": NULL can't be part of the key
+    """
+    CREATE TABLE IF NOT EXISTS SalesCategorySummary (
+        day TEXT NOT NULL,
+        category_id INTEGER NOT NULL,
+        quantity REAL NOT NULL DEFAULT 0,
+        revenue_cents INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, category_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ZReports (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        day TEXT NOT NULL UNIQUE,
+        sale_count INTEGER NOT NULL,
+        final_total_cents INTEGER NOT NULL,
+        closed_by INTEGER,
+        closed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+
+def _sale_summary_upserts(sale):
+    """Statements adding one Sales row (NEW, or an alias) to the per-sale summaries"""
+    day = f"date({sale}.created_at)"
+    hour = f"CAST(strftime('%H', {sale}.created_at) AS INTEGER)"
+    final_total = f"COALESCE({sale}.final_total_cents, {_cents(sale + '.final_total')})"
+    return [
+        f"""INSERT INTO SalesDailySummary (day, sale_count, total_cents, discount_cents, tax_cents, final_total_cents)
+            VALUES ({day}, 1,
+                    COALESCE({sale}.total_cents, {_cents(sale + '.total_amount')}),
+                    COALESCE({sale}.discount_cents, {_cents(sale + '.discount')}, 0),
+                    COALESCE({sale}.tax_cents, {_cents(sale + '.tax_amount')}, 0),
+                    {final_total})
+            ON CONFLICT(day) DO UPDATE SET
+                sale_count = sale_count + 1,
+                total_cents = total_cents + excluded.total_cents,
+                discount_cents = discount_cents + excluded.discount_cents,
+                tax_cents = tax_cents + excluded.tax_cents,
+                final_total_cents = final_total_cents + excluded.final_total_cents;""",
+        f"""INSERT INTO SalesHourlySummary (day, hour, sale_count, final_total_cents)
+            VALUES ({day}, {hour}, 1, {final_total})
+            ON CONFLICT(day, hour) DO UPDATE SET
+                sale_count = sale_count + 1,
+                final_total_cents = final_total_cents + excluded.final_total_cents;""",
+        f"""INSERT INTO SalesCashierSummary (day, user_id, sale_count, final_total_cents)
+            VALUES ({day}, COALESCE({sale}.user_id, 0), 1, {final_total})
+            ON CONFLICT(day, user_id) DO UPDATE SET
+                sale_count = sale_count + 1,
+                final_total_cents = final_total_cents + excluded.final_total_cents;""",
+        f"""INSERT INTO SalesPaymentSummary (day, payment_method, sale_count, final_total_cents)
+            VALUES ({day}, COALESCE({sale}.payment_method, 'CASH'), 1, {final_total})
+            ON CONFLICT(day, payment_method) DO UPDATE SET
+                sale_count = sale_count + 1,
+                final_total_cents = final_total_cents + excluded.final_total_cents;""",
+    ]
+
+
+def _sale_item_summary_upserts(item):
+    """Statements adding one SaleItems row to the per-product and per-category summaries"""
+    day = f"(SELECT date(created_at) FROM Sales WHERE id = {item}.sale_id)"
+    category = f"COALESCE((SELECT category_id FROM Products WHERE id = {item}.product_id), 0)"
+    revenue = f"COALESCE({item}.subtotal_cents, {_cents(item + '.subtotal')}, 0)"
+    return [
+        f"""INSERT INTO SalesProductSummary (day, product_id, quantity, revenue_cents)
+            VALUES ({day}, {item}.product_id, {item}.quantity, {revenue})
+            ON CONFLICT(day, product_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity,
+                revenue_cents = revenue_cents + excluded.revenue_cents;""",
+        f"""INSERT INTO SalesCategorySummary (day, category_id, quantity, revenue_cents)
+            VALUES ({day}, {category}, {item}.quantity, {revenue})
+            ON CONFLICT(day, category_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity,
+                revenue_cents = revenue_cents + excluded.revenue_cents;""",
+    ]
+
+
+def _sale_date(sale):
+    return f"date({sale}.created_at)"
+
+
+def _report_day(sale):
+    """Day whose reports count a Sales row (an alias with id and created_at).
+
+    The day it was made, unless that day's Z was taken before it: then the
+    first day after it that has no such Z. ZReports.last_sale_id is the
+    last sale a Z covers, so the answer never changes once a sale is in.
+    """
+    def closed_before(day):
+        return f"EXISTS (SELECT 1 FROM ZReports z WHERE z.day = {day} AND z.last_sale_id < {sale}.id)"
+    return f"""(CASE WHEN NOT {closed_before(_sale_date(sale))} THEN {_sale_date(sale)} ELSE (
+        SELECT MIN(next_day.day) FROM (
+            SELECT date(zc.day, '+1 day') AS day FROM ZReports zc WHERE zc.day >= {_sale_date(sale)}
+        ) next_day WHERE NOT {closed_before('next_day.day')}) END)"""
+
+
+def _summary_rebuild_statements(day=_sale_date):
+    final_total = f"COALESCE(final_total_cents, {_cents('final_total')})"
+    revenue = f"COALESCE(si.subtotal_cents, {_cents('si.subtotal')}, 0)"
+    per_sale = f"""
+        INSERT INTO {{table}} ({{key}}, sale_count, final_total_cents)
+        SELECT {{expression}}, COUNT(*), SUM({final_total})
+        FROM Sales s GROUP BY 1, 2
+    """
+    items = """
+        FROM SaleItems si
+        JOIN Sales s ON s.id = si.sale_id
+        LEFT JOIN Products p ON p.id = si.product_id
+    """
+    return [
+        f"""
+        INSERT INTO SalesDailySummary (day, sale_count, total_cents, discount_cents, tax_cents, final_total_cents)
+        SELECT {day('s')}, COUNT(*),
+               SUM(COALESCE(total_cents, {_cents('total_amount')})),
+               SUM(COALESCE(discount_cents, {_cents('discount')}, 0)),
+               SUM(COALESCE(tax_cents, {_cents('tax_amount')}, 0)),
+               SUM({final_total})
+        FROM Sales s GROUP BY 1
+        """,
+        per_sale.format(table='SalesHourlySummary', key='day, hour',
+                        expression=f"{day('s')}, CAST(strftime('%H', created_at) AS INTEGER)"),
+        per_sale.format(table='SalesCashierSummary', key='day, user_id',
+                        expression=f"{day('s')}, COALESCE(user_id, 0)"),
+        per_sale.format(table='SalesPaymentSummary', key='day, payment_method',
+                        expression=f"{day('s')}, COALESCE(payment_method, 'CASH')"),
+        f"""
+        INSERT INTO SalesProductSummary (day, product_id, quantity, revenue_cents)
+        SELECT {day('s')}, si.product_id, SUM(si.quantity), SUM({revenue})
+        {items} GROUP BY 1, 2
+        """,
+        f"""
+        INSERT INTO SalesCategorySummary (day, category_id, quantity, revenue_cents)
+        SELECT {day('s')}, COALESCE(p.category_id, 0), SUM(si.quantity), SUM({revenue})
+        {items} GROUP BY 1, 2
+        """,
+    ]
+
+
+SUMMARY_TABLES = [
+    'SalesDailySummary', 'SalesHourlySummary', 'SalesCashierSummary',
+    'SalesPaymentSummary', 'SalesProductSummary', 'SalesCategorySummary',
+]
+
+# Recompute every summary from Sales/SaleItems (ZReports, a record of
+# closed days, is left alone). Migration 009 summarised by calendar day;
+# since migration 018 a sale made after its day's Z counts in the next day
+_SUMMARY_REBUILD_BY_DATE = [f"DELETE FROM {table}" for table in SUMMARY_TABLES] + _summary_rebuild_statements()
+SUMMARY_REBUILD = [f"DELETE FROM {table}" for table in SUMMARY_TABLES] + _summary_rebuild_statements(_report_day)
+
+
+def migration_009_sales_summaries(cursor):
+    """Per-day sales summaries, kept up to date by triggers as sales are inserted.
+
+    Day-end reports read a handful of summary rows instead of scanning
+    Sales and SaleItems. Existing history is summarised here; if a summary
+    is ever in doubt, SalesSummary.rebuild() recomputes them all the same way.
+    """
+    for statement in SUMMARY_SCHEMA:
+        cursor.execute(statement)
+
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_sales_summary_insert
+        AFTER INSERT ON Sales BEGIN {' '.join(_sale_summary_upserts('NEW'))} END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_saleitems_summary_insert
+        AFTER INSERT ON SaleItems BEGIN {' '.join(_sale_item_summary_upserts('NEW'))} END""")
+
+    for statement in _SUMMARY_REBUILD_BY_DATE:
+        cursor.execute(statement)
+
+
+def migration_010_sales_history_indexes(cursor):
+    """Indexes for the sales history filters, newest sale first.
+
+    Each ends in created_at (and, implicitly, the rowid), so a filtered page
+    is read in ORDER BY created_at DESC, id DESC order straight off the index.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_user_created ON Sales(user_id, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_payment_created ON Sales(payment_method, created_at)")
+
+
+VALUATION_SCHEMA = [
+    # Cost layers per stocked item as of ValuationCheckpoint.last_movement_id.
+    # variant_id 0 is the product itself: NULL can't be part of the key
+    """
+    CREATE TABLE IF NOT EXISTS StockValuation (
+        product_id INTEGER NOT NULL,
+        variant_id INTEGER NOT NULL DEFAULT 0,
+        method TEXT NOT NULL,
+        quantity REAL NOT NULL DEFAULT 0,
+        value_cents INTEGER NOT NULL DEFAULT 0,
+        layers TEXT NOT NULL DEFAULT '[]',
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (product_id, variant_id)
+    )
+    """,
+    # Cost of every outgoing movement; sale_item_id is set for sales
+    """
+    CREATE TABLE IF NOT EXISTS CostOfGoodsSold (
+        movement_id INTEGER PRIMARY KEY,
+        sale_item_id INTEGER,
+        product_id INTEGER NOT NULL,
+        variant_id INTEGER,
+        quantity REAL NOT NULL,
+        cost_cents INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ValuationCheckpoint (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_movement_id INTEGER NOT NULL DEFAULT 0,
+        dirty INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+]
+
+
+def migration_011_stock_valuation(cursor):
+    """Cost layers, COGS and the checkpoint of the stock valuation engine.
+
+    Sales now write an 'out' movement per line, linked by sale_item_id, so
+    their cost can be traced back to the line. Rewriting the past (deleting
+    or editing a movement already valued, changing a product's valuation
+    method) flags the checkpoint dirty, and the next update replays from
+    scratch instead of building on stale layers.
+    """
+    if 'sale_item_id' not in table_columns(cursor, 'StockMovements'):
+        cursor.execute("ALTER TABLE StockMovements ADD COLUMN sale_item_id INTEGER")
+    if 'valuation_method' not in table_columns(cursor, 'Products'):
+        cursor.execute("ALTER TABLE Products ADD COLUMN valuation_method TEXT DEFAULT 'FIFO'")
+    for statement in VALUATION_SCHEMA:
+        cursor.execute(statement)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cogs_sale_item ON CostOfGoodsSold(sale_item_id)")
+    cursor.execute("INSERT OR IGNORE INTO ValuationCheckpoint (id, last_movement_id, dirty) VALUES (1, 0, 0)")
+
+    dirty = "UPDATE ValuationCheckpoint SET dirty = 1;"
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_stockmovements_valuation_delete
+        AFTER DELETE ON StockMovements
+        WHEN OLD.id <= (SELECT last_movement_id FROM ValuationCheckpoint WHERE id = 1)
+        BEGIN {dirty} END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_stockmovements_valuation_update
+        AFTER UPDATE OF product_id, variant_id, quantity, unit_price ON StockMovements
+        WHEN OLD.id <= (SELECT last_movement_id FROM ValuationCheckpoint WHERE id = 1)
+        BEGIN {dirty} END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_products_valuation_method
+        AFTER UPDATE OF valuation_method ON Products
+        WHEN NEW.valuation_method IS NOT OLD.valuation_method
+        BEGIN {dirty} END""")
+
+
+LEDGER_SCHEMA = [
+    # Ledger balance per stocked item as of StockLedgerCheckpoint.last_movement_id;
+    # variant_id 0 is the product itself
+    """
+    CREATE TABLE IF NOT EXISTS StockSnapshots (
+        product_id INTEGER NOT NULL,
+        variant_id INTEGER NOT NULL DEFAULT 0,
+        stock REAL NOT NULL DEFAULT 0,
+        taken_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (product_id, variant_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS StockLedgerCheckpoint (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_movement_id INTEGER NOT NULL DEFAULT 0,
+        taken_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # Items whose stock counter moved since the last snapshot
+    """
+    CREATE TABLE IF NOT EXISTS StockChanges (
+        product_id INTEGER NOT NULL,
+        variant_id INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (product_id, variant_id)
+    )
+    """,
+]
+
+
+def migration_012_stock_ledger(cursor):
+    """Make StockMovements the only way stock changes, with balance snapshots.
+
+    Inserting a movement applies it to Products.stock or ProductVariants.stock,
+    so code records movements and never updates the counters itself. The
+    counters as they are now become the opening snapshot. Every change to a
+    counter is noted in StockChanges, so reconciling only looks at the items
+    that moved since the last snapshot.
+    """
+    for statement in LEDGER_SCHEMA:
+        cursor.execute(statement)
+    cursor.execute("""
+        INSERT OR IGNORE INTO StockLedgerCheckpoint (id, last_movement_id)
+        SELECT 1, COALESCE(MAX(id), 0) FROM StockMovements
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO StockSnapshots (product_id, variant_id, stock)
+        SELECT id, 0, COALESCE(stock, 0) FROM Products
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO StockSnapshots (product_id, variant_id, stock)
+        SELECT product_id, id, COALESCE(stock, 0) FROM ProductVariants WHERE product_id IS NOT NULL
+    """)
+
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_stockmovements_apply
+        AFTER INSERT ON StockMovements
+        BEGIN
+            UPDATE ProductVariants SET stock = COALESCE(stock, 0) + NEW.quantity, updated_at = CURRENT_TIMESTAMP
+            WHERE NEW.variant_id IS NOT NULL AND id = NEW.variant_id;
+            UPDATE Products SET stock = COALESCE(stock, 0) + NEW.quantity, updated_at = CURRENT_TIMESTAMP
+            WHERE NEW.variant_id IS NULL AND id = NEW.product_id;
+        END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_products_stock_changed
+        AFTER UPDATE OF stock ON Products WHEN NEW.stock IS NOT OLD.stock
+        BEGIN INSERT OR IGNORE INTO StockChanges (product_id, variant_id) VALUES (NEW.id, 0); END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_variants_stock_changed
+        AFTER UPDATE OF stock ON ProductVariants WHEN NEW.stock IS NOT OLD.stock
+        BEGIN INSERT OR IGNORE INTO StockChanges (product_id, variant_id) VALUES (NEW.product_id, NEW.id); END""")
+    # Created with stock other than through a movement
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_products_stock_inserted
+        AFTER INSERT ON Products WHEN COALESCE(NEW.stock, 0) != 0
+        BEGIN INSERT OR IGNORE INTO StockChanges (product_id, variant_id) VALUES (NEW.id, 0); END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_variants_stock_inserted
+        AFTER INSERT ON ProductVariants WHEN COALESCE(NEW.stock, 0) != 0
+        BEGIN INSERT OR IGNORE INTO StockChanges (product_id, variant_id) VALUES (NEW.product_id, NEW.id); END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_products_ledger_delete
+        AFTER DELETE ON Products
+        BEGIN
+            DELETE FROM StockSnapshots WHERE product_id = OLD.id;
+            DELETE FROM StockChanges WHERE product_id = OLD.id;
+        END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_variants_ledger_delete
+        AFTER DELETE ON ProductVariants
+        BEGIN
+            DELETE FROM StockSnapshots WHERE product_id = OLD.product_id AND variant_id = OLD.id;
+            DELETE FROM StockChanges WHERE product_id = OLD.product_id AND variant_id = OLD.id;
+        END""")
+
+
+# The JSON object of a ProductVariants row (NEW, or an alias), NULL unless it
+# is a valid object: attribute_values, or the older attributes column
+def _variant_attributes_json(variant):
+    raw = f"COALESCE(NULLIF({variant}.attribute_values, ''), {variant}.attributes)"
+    return f"CASE WHEN json_valid({raw}) THEN CASE WHEN json_type({raw}) = 'object' THEN {raw} END END"
+
+
+def _variant_attribute_links(variant):
+    """Statements creating the attributes, values and junction rows of one variant"""
+    attributes = _variant_attributes_json(variant)
+    return [
+        f"""INSERT OR IGNORE INTO ProductAttributes (name)
+            SELECT j.key FROM json_each({attributes}) j WHERE j.type IN ('text', 'integer', 'real')""",
+        f"""INSERT OR IGNORE INTO ProductAttributeValues (attribute_id, value)
+            SELECT a.id, CAST(j.value AS TEXT)
+            FROM json_each({attributes}) j
+            JOIN ProductAttributes a ON a.name = j.key
+            WHERE j.type IN ('text', 'integer', 'real')""",
+        f"""INSERT OR IGNORE INTO VariantAttributeValues (variant_id, attribute_value_id)
+            SELECT {variant}.id, v.id
+            FROM json_each({attributes}) j
+            JOIN ProductAttributes a ON a.name = j.key
+            JOIN ProductAttributeValues v ON v.attribute_id = a.id AND v.value = CAST(j.value AS TEXT)
+            WHERE j.type IN ('text', 'integer', 'real')""",
+    ]
+
+
+def migration_013_variant_attribute_values(cursor):
+    """VariantAttributeValues: which ProductAttributeValues each variant has.
+
+    Filled from the JSON of every variant, then kept in step with it by
+    triggers, so the JSON columns stay readable as before while filtering
+    variants by attribute goes through indexes. Attributes and values found
+    in the JSON but missing from ProductAttributes are created.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS VariantAttributeValues (
+            variant_id INTEGER NOT NULL,
+            attribute_value_id INTEGER NOT NULL,
+            PRIMARY KEY (variant_id, attribute_value_id),
+            FOREIGN KEY (variant_id) REFERENCES ProductVariants(id) ON DELETE CASCADE,
+            FOREIGN KEY (attribute_value_id) REFERENCES ProductAttributeValues(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    # Value -> variants, for the filters; the primary key covers variant -> values
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_variant_attribute_values_value
+        ON VariantAttributeValues(attribute_value_id, variant_id)""")
+
+    for statement in _variant_attribute_links('pv'):
+        cursor.execute(statement.replace("FROM json_each(", "FROM ProductVariants pv, json_each(", 1))
+
+    links = " ".join(f"{statement};" for statement in _variant_attribute_links('NEW'))
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_variants_attributes_insert
+        AFTER INSERT ON ProductVariants BEGIN {links} END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_variants_attributes_update
+        AFTER UPDATE OF attributes, attribute_values ON ProductVariants
+        BEGIN
+            DELETE FROM VariantAttributeValues WHERE variant_id = NEW.id;
+            {links}
+        END""")
+    # Foreign keys aren't enforced on these connections: cascade by hand
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_variants_attributes_delete
+        AFTER DELETE ON ProductVariants
+        BEGIN DELETE FROM VariantAttributeValues WHERE variant_id = OLD.id; END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_attribute_values_delete
+        AFTER DELETE ON ProductAttributeValues
+        BEGIN DELETE FROM VariantAttributeValues WHERE attribute_value_id = OLD.id; END""")
+
+
+def migration_014_deferred_search_refresh(cursor):
+    """Let bulk variant inserts refresh a product's search row once.
+
+    The insert trigger rebuilds the whole row of the product for every
+    variant, which is quadratic when thousands are generated at once. While
+    a product is listed in ProductSearchDeferred, the trigger skips it and
+    the writer calls refresh_product_search() at the end.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ProductSearchDeferred (
+            product_id INTEGER PRIMARY KEY
+        )
+    """)
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'trg_variants_search_insert'").fetchone():
+        cursor.execute("DROP TRIGGER trg_variants_search_insert")
+        cursor.execute(f"""CREATE TRIGGER trg_variants_search_insert
+            AFTER INSERT ON ProductVariants
+            WHEN NOT EXISTS (SELECT 1 FROM ProductSearchDeferred WHERE product_id = NEW.product_id)
+            BEGIN {_product_search_refresh('NEW.product_id')} END""")
+
+
+def _variant_attribute_inserts(variant):
+    """_variant_attribute_links() with NOT EXISTS instead of OR IGNORE.
+
+    Inside a trigger, the conflict clause of the statement that fired it
+    wins over OR IGNORE: an INSERT ... ON CONFLICT DO UPDATE that fires an
+    update trigger turns its OR IGNORE back into ABORT.
+    """
+    attributes = _variant_attributes_json(variant)
+    scalar = "j.type IN ('text', 'integer', 'real')"
+    return [
+        f"""INSERT INTO ProductAttributes (name)
+            SELECT DISTINCT j.key FROM json_each({attributes}) j
+            WHERE {scalar} AND NOT EXISTS (SELECT 1 FROM ProductAttributes a WHERE a.name = j.key)""",
+        f"""INSERT INTO ProductAttributeValues (attribute_id, value)
+            SELECT DISTINCT a.id, CAST(j.value AS TEXT)
+            FROM json_each({attributes}) j
+            JOIN ProductAttributes a ON a.name = j.key
+            WHERE {scalar} AND NOT EXISTS (
+                SELECT 1 FROM ProductAttributeValues v
+                WHERE v.attribute_id = a.id AND v.value = CAST(j.value AS TEXT)
+            )""",
+        f"""INSERT INTO VariantAttributeValues (variant_id, attribute_value_id)
+            SELECT DISTINCT {variant}.id, v.id
+            FROM json_each({attributes}) j
+            JOIN ProductAttributes a ON a.name = j.key
+            JOIN ProductAttributeValues v ON v.attribute_id = a.id AND v.value = CAST(j.value AS TEXT)
+            WHERE {scalar} AND NOT EXISTS (
+                SELECT 1 FROM VariantAttributeValues x
+                WHERE x.variant_id = {variant}.id AND x.attribute_value_id = v.id
+            )""",
+    ]
+
+
+def _stock_change_insert(product_id, variant_id):
+    return f"""INSERT INTO StockChanges (product_id, variant_id)
+        SELECT {product_id}, {variant_id}
+        WHERE NOT EXISTS (
+            SELECT 1 FROM StockChanges WHERE product_id = {product_id} AND variant_id = {variant_id}
+        );"""
+
+
+def migration_015_upsert_safe_triggers(cursor):
+    """Recreate the triggers that relied on INSERT OR IGNORE.
+
+    An upsert (INSERT ... ON CONFLICT DO UPDATE) on ProductVariants or
+    Products made them fail with a UNIQUE error as soon as the row they
+    insert already existed; they now check with NOT EXISTS.
+    """
+    for name in ('trg_variants_attributes_insert', 'trg_variants_attributes_update',
+                 'trg_products_stock_changed', 'trg_variants_stock_changed',
+                 'trg_products_stock_inserted', 'trg_variants_stock_inserted'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    links = " ".join(f"{statement};" for statement in _variant_attribute_inserts('NEW'))
+    cursor.execute(f"""CREATE TRIGGER trg_variants_attributes_insert
+        AFTER INSERT ON ProductVariants BEGIN {links} END""")
+    cursor.execute(f"""CREATE TRIGGER trg_variants_attributes_update
+        AFTER UPDATE OF attributes, attribute_values ON ProductVariants
+        BEGIN
+            DELETE FROM VariantAttributeValues WHERE variant_id = NEW.id;
+            {links}
+        END""")
+
+    cursor.execute(f"""CREATE TRIGGER trg_products_stock_changed
+        AFTER UPDATE OF stock ON Products WHEN NEW.stock IS NOT OLD.stock
+        BEGIN {_stock_change_insert('NEW.id', '0')} END""")
+    cursor.execute(f"""CREATE TRIGGER trg_variants_stock_changed
+        AFTER UPDATE OF stock ON ProductVariants WHEN NEW.stock IS NOT OLD.stock
+        BEGIN {_stock_change_insert('NEW.product_id', 'NEW.id')} END""")
+    # Created with stock other than through a movement
+    cursor.execute(f"""CREATE TRIGGER trg_products_stock_inserted
+        AFTER INSERT ON Products WHEN COALESCE(NEW.stock, 0) != 0
+        BEGIN {_stock_change_insert('NEW.id', '0')} END""")
+    cursor.execute(f"""CREATE TRIGGER trg_variants_stock_inserted
+        AFTER INSERT ON ProductVariants WHEN COALESCE(NEW.stock, 0) != 0
+        BEGIN {_stock_change_insert('NEW.product_id', 'NEW.id')} END""")
+
+
+BULK_OPERATIONS_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS BulkOperations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL CHECK (kind IN ('price', 'stock')),
+        description TEXT,
+        filters TEXT,
+        item_count INTEGER NOT NULL DEFAULT 0,
+        user_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        undone_at TIMESTAMP
+    )
+    """,
+    # Prices before and after a price operation, to undo it
+    """
+    CREATE TABLE IF NOT EXISTS BulkPriceChanges (
+        operation_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        field TEXT NOT NULL,
+        old_value REAL,
+        new_value REAL,
+        PRIMARY KEY (operation_id, product_id, field)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+def migration_016_bulk_operations(cursor):
+    """Bulk price and stock operations, recorded so they can be undone.
+
+    A price operation keeps every product's old and new price in
+    BulkPriceChanges; a stock operation's movements carry its id in
+    StockMovements.bulk_operation_id and are undone by reversing them.
+    ProductSuppliers gets an index by supplier for the supplier filter.
+    """
+    for statement in BULK_OPERATIONS_SCHEMA:
+        cursor.execute(statement)
+    if 'bulk_operation_id' not in table_columns(cursor, 'StockMovements'):
+        cursor.execute("ALTER TABLE StockMovements ADD COLUMN bulk_operation_id INTEGER")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_stockmovements_bulk
+        ON StockMovements(bulk_operation_id) WHERE bulk_operation_id IS NOT NULL""")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_productsuppliers_supplier
+        ON ProductSuppliers(supplier_id, product_id)""")
+
+
+def migration_017_stock_movements_by_date(cursor):
+    """Index StockMovements by date, for period exports of the ledger"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stockmovements_created ON StockMovements(created_at)")
+
+
+def _summary_changes(sale, sign):
+    """Statements adding (sign 1) or taking back (sign -1) a Sales row in the per-sale summaries"""
+    day = _report_day(sale)
+    hour = f"CAST(strftime('%H', {sale}.created_at) AS INTEGER)"
+    final_total = f"{sign} * COALESCE({sale}.final_total_cents, {_cents(sale + '.final_total')})"
+    per_sale = """INSERT INTO {table} (day, {key}, sale_count, final_total_cents)
+            VALUES ({day}, {value}, {sign}, {final_total})
+            ON CONFLICT(day, {key}) DO UPDATE SET
+                sale_count = sale_count + excluded.sale_count,
+                final_total_cents = final_total_cents + excluded.final_total_cents;"""
+    return [
+        f"""INSERT INTO SalesDailySummary (day, sale_count, total_cents, discount_cents, tax_cents, final_total_cents)
+            VALUES ({day}, {sign},
+                    {sign} * COALESCE({sale}.total_cents, {_cents(sale + '.total_amount')}),
+                    {sign} * COALESCE({sale}.discount_cents, {_cents(sale + '.discount')}, 0),
+                    {sign} * COALESCE({sale}.tax_cents, {_cents(sale + '.tax_amount')}, 0),
+                    {final_total})
+            ON CONFLICT(day) DO UPDATE SET
+                sale_count = sale_count + excluded.sale_count,
+                total_cents = total_cents + excluded.total_cents,
+                discount_cents = discount_cents + excluded.discount_cents,
+                tax_cents = tax_cents + excluded.tax_cents,
+                final_total_cents = final_total_cents + excluded.final_total_cents;""",
+        per_sale.format(table='SalesHourlySummary', key='hour', value=hour,
+                        day=day, sign=sign, final_total=final_total),
+        per_sale.format(table='SalesCashierSummary', key='user_id', value=f"COALESCE({sale}.user_id, 0)",
+                        day=day, sign=sign, final_total=final_total),
+        per_sale.format(table='SalesPaymentSummary', key='payment_method',
+                        value=f"COALESCE({sale}.payment_method, 'CASH')",
+                        day=day, sign=sign, final_total=final_total),
+    ]
+
+
+def _item_summary_changes(item, sign):
+    """Statements adding or taking back one SaleItems row; nothing if its sale is gone"""
+    revenue = f"{sign} * COALESCE({item}.subtotal_cents, {_cents(item + '.subtotal')}, 0)"
+    category = f"COALESCE((SELECT category_id FROM Products WHERE id = {item}.product_id), 0)"
+    return [
+        f"""INSERT INTO SalesProductSummary (day, product_id, quantity, revenue_cents)
+            SELECT {_report_day('s')}, {item}.product_id, {sign} * {item}.quantity, {revenue}
+            FROM Sales s WHERE s.id = {item}.sale_id
+            ON CONFLICT(day, product_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity,
+                revenue_cents = revenue_cents + excluded.revenue_cents;""",
+        f"""INSERT INTO SalesCategorySummary (day, category_id, quantity, revenue_cents)
+            SELECT {_report_day('s')}, {category}, {sign} * {item}.quantity, {revenue}
+            FROM Sales s WHERE s.id = {item}.sale_id
+            ON CONFLICT(day, category_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity,
+                revenue_cents = revenue_cents + excluded.revenue_cents;""",
+    ]
+
+
+def _sale_items_summary_changes(sale, sign):
+    """Statements adding or taking back every line of a Sales row, e.g. when it moves to another day"""
+    day = _report_day(sale)
+    revenue = f"COALESCE(si.subtotal_cents, {_cents('si.subtotal')}, 0)"
+    return [
+        f"""INSERT INTO SalesProductSummary (day, product_id, quantity, revenue_cents)
+            SELECT {day}, si.product_id, {sign} * SUM(si.quantity), {sign} * SUM({revenue})
+            FROM SaleItems si WHERE si.sale_id = {sale}.id GROUP BY si.product_id
+            ON CONFLICT(day, product_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity,
+                revenue_cents = revenue_cents + excluded.revenue_cents;""",
+        f"""INSERT INTO SalesCategorySummary (day, category_id, quantity, revenue_cents)
+            SELECT {day}, COALESCE(p.category_id, 0), {sign} * SUM(si.quantity), {sign} * SUM({revenue})
+            FROM SaleItems si LEFT JOIN Products p ON p.id = si.product_id
+            WHERE si.sale_id = {sale}.id GROUP BY 2
+            ON CONFLICT(day, category_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity,
+                revenue_cents = revenue_cents + excluded.revenue_cents;""",
+    ]
+
+
+def _summary_cleanup(*sales):
+    """Drop the rows a correction brought back to nothing on the days of sales, as a rebuild would"""
+    days = ", ".join(_report_day(sale) for sale in sales)
+    return [
+        f"DELETE FROM {table} WHERE day IN ({days}) AND sale_count = 0;"
+        for table in ('SalesDailySummary', 'SalesHourlySummary', 'SalesCashierSummary', 'SalesPaymentSummary')
+    ] + [
+        f"DELETE FROM {table} WHERE day IN ({days}) AND quantity = 0 AND revenue_cents = 0;"
+        for table in ('SalesProductSummary', 'SalesCategorySummary')
+    ]
+
+
+def _item_cleanup(item):
+    """_summary_cleanup for the day of a SaleItems row's sale"""
+    day = f"(SELECT {_report_day('s')} FROM Sales s WHERE s.id = {item}.sale_id)"
+    return [
+        f"DELETE FROM {table} WHERE day = {day} AND quantity = 0 AND revenue_cents = 0;"
+        for table in ('SalesProductSummary', 'SalesCategorySummary')
+    ]
+
+
+def migration_018_frozen_z_reports(cursor):
+    """Freeze Z reports and keep the summaries right when sales change.
+
+    A Z now stores its totals and breakdown, so a reprint shows what was
+    closed, and the last sale it covers: a sale made on a closed day after
+    its Z counts in the next open day, instead of changing a closed one.
+    The summaries follow UPDATE and DELETE on Sales and SaleItems too, not
+    only INSERT.
+    """
+    columns = table_columns(cursor, 'ZReports')
+    for name in ('total_cents', 'discount_cents', 'tax_cents', 'last_sale_id'):
+        if name not in columns:
+            cursor.execute(f"ALTER TABLE ZReports ADD COLUMN {name} INTEGER")
+    if 'details' not in columns:
+        cursor.execute("ALTER TABLE ZReports ADD COLUMN details TEXT")
+    # Days closed so far keep every sale they have now
+    cursor.execute("""
+        UPDATE ZReports SET last_sale_id = COALESCE(
+            (SELECT MAX(id) FROM Sales WHERE date(created_at) <= ZReports.day), 0)
+        WHERE last_sale_id IS NULL
+    """)
+
+    for name in ('trg_sales_summary_insert', 'trg_saleitems_summary_insert'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    def body(*groups):
+        return " ".join(statement for group in groups for statement in group)
+
+    cursor.execute(f"""CREATE TRIGGER trg_sales_summary_insert
+        AFTER INSERT ON Sales BEGIN {body(_summary_changes('NEW', 1))} END""")
+    # Only when what the summaries hold changes: not when the cents
+    # columns are filled in from the REAL ones after an insert
+    def changed(*expressions):
+        return " OR ".join(f"{expression.format(row='NEW')} IS NOT {expression.format(row='OLD')}"
+                           for expression in expressions)
+    sale_changed = changed(
+        "{row}.created_at", "{row}.user_id", "{row}.payment_method",
+        f"COALESCE({{row}}.total_cents, {_cents('{row}.total_amount')})",
+        f"COALESCE({{row}}.discount_cents, {_cents('{row}.discount')})",
+        f"COALESCE({{row}}.tax_cents, {_cents('{row}.tax_amount')})",
+        f"COALESCE({{row}}.final_total_cents, {_cents('{row}.final_total')})",
+    )
+    item_changed = changed(
+        "{row}.sale_id", "{row}.product_id", "{row}.quantity",
+        f"COALESCE({{row}}.subtotal_cents, {_cents('{row}.subtotal')})",
+    )
+
+    cursor.execute(f"""CREATE TRIGGER trg_sales_summary_update
+        AFTER UPDATE OF created_at, user_id, payment_method, total_amount, discount, tax_amount,
+                        final_total, total_cents, discount_cents, tax_cents, final_total_cents ON Sales
+        WHEN {sale_changed}
+        BEGIN {body(_summary_changes('OLD', -1), _summary_changes('NEW', 1), _summary_cleanup('OLD', 'NEW'))} END""")
+    cursor.execute(f"""CREATE TRIGGER trg_sales_summary_move
+        AFTER UPDATE OF created_at ON Sales WHEN {_report_day('NEW')} IS NOT {_report_day('OLD')}
+        BEGIN {body(_sale_items_summary_changes('OLD', -1), _sale_items_summary_changes('NEW', 1),
+                    _summary_cleanup('OLD'))} END""")
+    cursor.execute(f"""CREATE TRIGGER trg_sales_summary_delete
+        AFTER DELETE ON Sales
+        BEGIN {body(_summary_changes('OLD', -1), _sale_items_summary_changes('OLD', -1), _summary_cleanup('OLD'))} END""")
+    cursor.execute(f"""CREATE TRIGGER trg_saleitems_summary_insert
+        AFTER INSERT ON SaleItems BEGIN {body(_item_summary_changes('NEW', 1))} END""")
+    cursor.execute(f"""CREATE TRIGGER trg_saleitems_summary_update
+        AFTER UPDATE OF sale_id, product_id, quantity, subtotal, subtotal_cents ON SaleItems
+        WHEN {item_changed}
+        BEGIN {body(_item_summary_changes('OLD', -1), _item_summary_changes('NEW', 1), _item_cleanup('OLD'))} END""")
+    cursor.execute(f"""CREATE TRIGGER trg_saleitems_summary_delete
+        AFTER DELETE ON SaleItems
+        BEGIN {body(_item_summary_changes('OLD', -1), _item_cleanup('OLD'))} END""")
+
+
+# Ordered list of (version, description, migration). Append only; never
+# renumber or edit a migration that has shipped.
+MIGRATIONS = [
+    (1, "Base schema", migration_001_base_schema),
+    (2, "Columns missing from legacy databases", migration_002_legacy_columns),
+    (3, "Indexes for the hot query paths", migration_003_hot_path_indexes),
+    (4, "Full-text product search", migration_004_product_search),
+    (5, "Barcode change counter", migration_005_barcode_version),
+    (6, "Catalogue and stock change counters", migration_006_catalog_versions),
+    (7, "Sale journal ids", migration_007_sale_journal_id),
+    (8, "Integer cents money columns", migration_008_money_cents),
+    (9, "Sales summary tables", migration_009_sales_summaries),
+    (10, "Sales history indexes", migration_010_sales_history_indexes),
+    (11, "Stock valuation", migration_011_stock_valuation),
+    (12, "Stock ledger", migration_012_stock_ledger),
+    (13, "Variant attribute values", migration_013_variant_attribute_values),
+    (14, "Deferred product search refresh", migration_014_deferred_search_refresh),
+    (15, "Upsert-safe triggers", migration_015_upsert_safe_triggers),
+    (16, "Bulk operations", migration_016_bulk_operations),
+    (17, "Stock movements by date", migration_017_stock_movements_by_date),
+    (18, "Frozen Z reports", migration_018_frozen_z_reports),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version():
+    """Return the schema version recorded in the database."""
+    with DatabaseManager.session() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations():
+    """Apply pending migrations in order and return the resulting version."""
+    version = get_schema_version()
+    for target, description, migration in MIGRATIONS:
+        if target <= version:
+            continue
+        with DatabaseManager.session() as conn:
+            cursor = conn.cursor()
+            # Another instance may have migrated in the meantime
+            if cursor.execute("PRAGMA user_version").fetchone()[0] >= target:
+                version = target
+                continue
+            migration(cursor)
+            # user_version is transactional: it only sticks if the migration commits
+            cursor.execute(f"PRAGMA user_version = {target}")
+        print(f"✅ Migration {target:03d} appliquée : {description}")
+        version = target
+    return version
@@ -0,0 +1,224 @@
+"""Sales analytics over columnar NumPy arrays.
+
+Sale lines are streamed out of SQLite with fetchmany() in chunks and each
+chunk is turned into a 2-D array in one call; the per-product, per-category
+and per-hour figures are then np.bincount() sums accumulated chunk by
+chunk, so memory stays bounded by the chunk size and the number of
+products, not by the length of the history. Amounts are integer cents
+(see models.money).
+"""
+from database import DatabaseManager
+import numpy as np
+
+CHUNK_SIZE = 100000
+
+# Column order of SALE_LINES_QUERY
+PRODUCT, CATEGORY, USER, WEEKDAY, HOUR, QUANTITY, REVENUE, COST = range(8)
+
+SALE_LINES_QUERY = """
+    SELECT si.product_id,
+           COALESCE(p.category_id, 0),
+           COALESCE(s.user_id, 0),
+           CAST(strftime('%w', s.created_at) AS INTEGER),
+           CAST(strftime('%H', s.created_at) AS INTEGER),
+           si.quantity,
+           COALESCE(si.subtotal_cents, 0),
+           COALESCE(p.purchase_price_cents, 0)
+    FROM Sales s
+    JOIN SaleItems si ON si.sale_id = s.id
+    LEFT JOIN Products p ON p.id = si.product_id
+    WHERE s.created_at >= ? AND s.created_at < ?
+"""
+
+SALE_TOTALS_QUERY = """
+    SELECT CAST(strftime('%H', created_at) AS INTEGER), COALESCE(final_total_cents, 0)
+    FROM Sales
+    WHERE created_at >= ? AND created_at < ?
+"""
+
+PRODUCT_STOCK_QUERY = "SELECT id, COALESCE(stock, 0) FROM Products"
+
+
+def iter_chunks(query, params=(), chunk_size=CHUNK_SIZE):
+    """Yield the rows of query as float64 2-D arrays of at most chunk_size rows.
+
+    Ids, hours and cents are integers well inside float64's exact range;
+    callers cast the key columns back to int64.
+    """
+    with DatabaseManager.session() as conn:
+        cursor = conn.cursor()
+        # Plain tuples: NumPy converts them far faster than sqlite3.Row
+        cursor.row_factory = None
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield np.array(rows, dtype=np.float64)
+
+
+def grouped_sum(keys, values, size):
+    """values summed per integer key in [0, size): one np.bincount pass"""
+    return np.bincount(keys, weights=values, minlength=size)
+
+
+def _accumulate(total, keys, values):
+    """Add the grouped sums of one chunk to total, growing it for new keys"""
+    sums = grouped_sum(keys, values, len(total))
+    if len(sums) > len(total):
+        total = np.concatenate([total, np.zeros(len(sums) - len(total))])
+    total += sums
+    return total
+
+
+def grouped_percentiles(keys, values, percentiles):
+    """{key: array of percentiles of its values}, by sorting once on (key, value)
+
+    The sort puts each group's values in order and side by side, so every
+    group is a contiguous slice found with np.flatnonzero(np.diff(keys)).
+    """
+    if len(keys) == 0:
+        return {}
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+    ends = np.concatenate([starts[1:], [len(keys)]])
+    fractions = np.asarray(percentiles, dtype=np.float64) / 100
+    result = {}
+    for start, end in zip(starts, ends):
+        group = values[start:end]
+        # Linear interpolation between closest ranks, as np.percentile does
+        positions = fractions * (len(group) - 1)
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.minimum(lower + 1, len(group) - 1)
+        weights = positions - lower
+        result[int(keys[start])] = group[lower] * (1 - weights) + group[upper] * weights
+    return result
+
+
+class SalesAnalytics:
+    """Margin, ABC, sell-through and hourly figures for sales in [start, end)."""
+
+    @staticmethod
+    def product_totals(start, end, chunk_size=CHUNK_SIZE):
+        """Arrays indexed by product_id: quantity, revenue_cents, cost_cents.
+
+        The cost is the product's current purchase price times the quantity.
+        """
+        quantity = np.zeros(0)
+        revenue = np.zeros(0)
+        cost = np.zeros(0)
+        for chunk in iter_chunks(SALE_LINES_QUERY, (start, end), chunk_size):
+            products = chunk[:, PRODUCT].astype(np.int64)
+            quantity = _accumulate(quantity, products, chunk[:, QUANTITY])
+            revenue = _accumulate(revenue, products, chunk[:, REVENUE])
+            cost = _accumulate(cost, products, chunk[:, QUANTITY] * chunk[:, COST])
+        # Same keys in every call, so the three arrays have the same length
+        return quantity, revenue, np.rint(cost)
+
+    @staticmethod
+    def category_totals(start, end, chunk_size=CHUNK_SIZE):
+        """{category_id: (quantity, revenue_cents)}, category 0 being products without one"""
+        quantity = np.zeros(0)
+        revenue = np.zeros(0)
+        try:
+            for chunk in iter_chunks(SALE_LINES_QUERY, (start, end), chunk_size):
+                categories = chunk[:, CATEGORY].astype(np.int64)
+                quantity = _accumulate(quantity, categories, chunk[:, QUANTITY])
+                revenue = _accumulate(revenue, categories, chunk[:, REVENUE])
+        except Exception as e:
+            print(f"Error computing category totals: {e}")
+            return {}
+        return {int(category_id): (float(quantity[category_id]), int(revenue[category_id]))
+                for category_id in np.flatnonzero(quantity)}
+
+    @staticmethod
+    def margins(start, end, chunk_size=CHUNK_SIZE):
+        """[{product_id, quantity, revenue_cents, cost_cents, margin_cents, margin_pct}], best margin first"""
+        try:
+            quantity, revenue, cost = SalesAnalytics.product_totals(start, end, chunk_size)
+            margin = revenue - cost
+            with np.errstate(divide='ignore', invalid='ignore'):
+                margin_pct = np.where(revenue > 0, margin / revenue * 100, 0.0)
+            sold = np.flatnonzero(quantity)
+            sold = sold[np.argsort(-margin[sold], kind='stable')]
+            return [{
+                'product_id': int(product_id),
+                'quantity': float(quantity[product_id]),
+                'revenue_cents': int(revenue[product_id]),
+                'cost_cents': int(cost[product_id]),
+                'margin_cents': int(margin[product_id]),
+                'margin_pct': round(float(margin_pct[product_id]), 2),
+            } for product_id in sold]
+        except Exception as e:
+            print(f"Error computing margins: {e}")
+            return []
+
+    @staticmethod
+    def abc_analysis(start, end, a_share=0.8, b_share=0.95, chunk_size=CHUNK_SIZE):
+        """{product_id: 'A' | 'B' | 'C'} by share of cumulative revenue.
+
+        A products make the first a_share of the revenue, B the next ones up
+        to b_share, C the rest.
+        """
+        try:
+            _, revenue, _ = SalesAnalytics.product_totals(start, end, chunk_size)
+            sold = np.flatnonzero(revenue > 0)
+            if len(sold) == 0:
+                return {}
+            ranked = sold[np.argsort(-revenue[sold], kind='stable')]
+            # Share of revenue made before each product, so the product that
+            # crosses a threshold still belongs to the class below it
+            before = (np.cumsum(revenue[ranked]) - revenue[ranked]) / revenue[ranked].sum()
+            classes = np.where(before < a_share, 'A', np.where(before < b_share, 'B', 'C'))
+            return {int(product_id): str(cls) for product_id, cls in zip(ranked, classes)}
+        except Exception as e:
+            print(f"Error computing ABC analysis: {e}")
+            return {}
+
+    @staticmethod
+    def sell_through(start, end, chunk_size=CHUNK_SIZE):
+        """{product_id: % of the units available that sold}: sold / (sold + stock now)"""
+        try:
+            quantity, _, _ = SalesAnalytics.product_totals(start, end, chunk_size)
+            stock = np.zeros(len(quantity))
+            for chunk in iter_chunks(PRODUCT_STOCK_QUERY, (), chunk_size):
+                stock = _accumulate(stock, chunk[:, 0].astype(np.int64), chunk[:, 1])
+            quantity = np.concatenate([quantity, np.zeros(len(stock) - len(quantity))])
+            available = quantity + np.maximum(stock, 0)
+            sold = np.flatnonzero(quantity)
+            return {int(product_id): round(float(quantity[product_id] / available[product_id] * 100), 2)
+                    for product_id in sold if available[product_id] > 0}
+        except Exception as e:
+            print(f"Error computing sell-through: {e}")
+            return {}
+
+    @staticmethod
+    def hourly_heatmap(start, end, chunk_size=CHUNK_SIZE):
+        """7x24 array of revenue cents, weekday (0 = Sunday) by hour of day"""
+        heatmap = np.zeros(7 * 24)
+        try:
+            for chunk in iter_chunks(SALE_LINES_QUERY, (start, end), chunk_size):
+                cells = (chunk[:, WEEKDAY] * 24 + chunk[:, HOUR]).astype(np.int64)
+                heatmap += grouped_sum(cells, chunk[:, REVENUE], 7 * 24)
+        except Exception as e:
+            print(f"Error computing hourly heatmap: {e}")
+        return heatmap.reshape(7, 24)
+
+    @staticmethod
+    def basket_percentiles(start, end, percentiles=(50, 90, 99), chunk_size=CHUNK_SIZE):
+        """{hour: [percentiles of the sale totals in cents]} for each hour with sales.
+
+        Exact percentiles need every value, but only two numbers per sale
+        are kept, not the sale lines.
+        """
+        try:
+            chunks = list(iter_chunks(SALE_TOTALS_QUERY, (start, end), chunk_size))
+            if not chunks:
+                return {}
+            sales = np.concatenate(chunks)
+            grouped = grouped_percentiles(sales[:, 0].astype(np.int64), sales[:, 1], percentiles)
+            return {hour: [round(float(value)) for value in values] for hour, values in grouped.items()}
+        except Exception as e:
+            print(f"Error computing basket percentiles: {e}")
+            return {}
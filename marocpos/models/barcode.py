@@ -0,0 +1,123 @@
+from database import DatabaseManager
+from models.product import PRODUCT_FOR_SALE_QUERY
+import json
+import threading
+
+BARCODES_QUERY = """
+    SELECT barcode, id, NULL FROM Products
+    WHERE barcode IS NOT NULL AND barcode != ''
+    UNION ALL
+    SELECT barcode, product_id, id FROM ProductVariants
+    WHERE barcode IS NOT NULL AND barcode != ''
+"""
+
+BARCODE_VERSION_QUERY = "SELECT version FROM CatalogVersions WHERE name = 'barcodes'"
+
+
+class BarcodeIndex:
+    """Resolve scanned barcodes to a product or variant through an in-memory dict.
+
+    The dict maps every product and variant barcode to (product_id, variant_id)
+    and is reloaded when the 'barcodes' counter in CatalogVersions moves (see
+    migration 005), so barcodes written by any window, import or other till
+    are picked up on the next scan. Price and stock are always read fresh.
+    """
+    _lock = threading.Lock()
+    _index = None
+    _version = None
+
+    @staticmethod
+    def normalize(barcode):
+        """Strip the whitespace and control characters scanners append."""
+        return "".join(ch for ch in str(barcode or "") if ch.isprintable()).strip()
+
+    @classmethod
+    def invalidate(cls):
+        """Drop the index; the next lookup reloads it."""
+        with cls._lock:
+            cls._index = None
+            cls._version = None
+
+    @classmethod
+    def _current_index(cls, cursor):
+        version_row = cursor.execute(BARCODE_VERSION_QUERY).fetchone()
+        version = version_row[0] if version_row else None
+        index = cls._index
+        if index is not None and version is not None and version == cls._version:
+            return index
+
+        with cls._lock:
+            if cls._index is not None and version is not None and version == cls._version:
+                return cls._index
+            index = {}
+            # Variants come last so a variant barcode wins over a product
+            # that (wrongly) carries the same code: it is the more specific item
+            for barcode, product_id, variant_id in cursor.execute(BARCODES_QUERY):
+                index[str(barcode).strip()] = (product_id, variant_id)
+            cls._index = index
+            cls._version = version
+            return index
+
+    @classmethod
+    def _find(cls, index, barcode):
+        match = index.get(barcode)
+        if match is None and barcode.isdigit():
+            # UPC-A (12 digits) and its EAN-13 form differ by a leading zero,
+            # depending on how the scanner is configured
+            if len(barcode) == 12:
+                match = index.get("0" + barcode)
+            elif len(barcode) == 13 and barcode.startswith("0"):
+                match = index.get(barcode[1:])
+        return match
+
+    @classmethod
+    def lookup(cls, barcode):
+        """Return (product_id, variant_id) for a barcode, or None if unknown."""
+        barcode = cls.normalize(barcode)
+        if not barcode:
+            return None
+        try:
+            with DatabaseManager.session() as conn:
+                return cls._find(cls._current_index(conn.cursor()), barcode)
+        except Exception as e:
+            print(f"Error looking up barcode: {e}")
+            return None
+
+    @classmethod
+    def resolve(cls, barcode):
+        """Return (product, variant) dicts for a barcode, or None if unknown.
+
+        variant is None for a product barcode. The product dict has the same
+        keys as Product.get_products_by_category().
+        """
+        barcode = cls.normalize(barcode)
+        if not barcode:
+            return None
+        try:
+            with DatabaseManager.session() as conn:
+                cursor = conn.cursor()
+                match = cls._find(cls._current_index(cursor), barcode)
+                if match is None:
+                    return None
+                product_id, variant_id = match
+
+                row = cursor.execute(PRODUCT_FOR_SALE_QUERY, (product_id,)).fetchone()
+                if row is None:
+                    return None
+                product = dict(row)
+                if product.get('variant_attributes'):
+                    try:
+                        product['variant_attributes'] = json.loads(product['variant_attributes'])
+                    except:
+                        product['variant_attributes'] = None
+
+                variant = None
+                if variant_id is not None:
+                    row = cursor.execute("SELECT * FROM ProductVariants WHERE id = ?", (variant_id,)).fetchone()
+                    if row is None:
+                        return None
+                    variant = dict(row)
+                return product, variant
+        except Exception as e:
+            print(f"Error resolving barcode: {e}")
+            return None
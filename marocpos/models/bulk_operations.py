@@ -0,0 +1,406 @@
+"""Bulk price and stock changes over a filtered set of products.
+
+The products are picked by category, supplier and/or variant attributes,
+then changed BATCH_SIZE at a time, each batch a transaction over the
+batch's ids (passed as one JSON array). New prices are computed with the
+models.money helpers, so they round like every other amount, and written
+with the profit margin by one executemany(); stock changes are set-based
+movement inserts. Every
+operation is recorded in BulkOperations and can be undone by its id:
+price operations log each product's old and new price in
+BulkPriceChanges, stock operations write their movements with
+bulk_operation_id and are undone by reversing them through the ledger.
+"""
+from database import DatabaseManager
+from models.money import to_cents, from_cents, percent_cents
+import json
+
+BATCH_SIZE = 5000
+
+PRICE_FIELDS = {'unit_price': "Prix de vente", 'purchase_price': "Prix d'achat"}
+
+PRICE_MODES = ('percent', 'amount', 'set')
+STOCK_MODES = ('set', 'add')
+
+BATCH_IDS = "SELECT value FROM json_each(:ids)"
+
+INSERT_OPERATION = """
+    INSERT INTO BulkOperations (kind, description, filters, user_id, created_at)
+    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+"""
+COUNT_ITEMS = "UPDATE BulkOperations SET item_count = item_count + ? WHERE id = ?"
+
+BATCH_PRICES = """
+    SELECT id, unit_price, purchase_price FROM Products
+    WHERE id IN (""" + BATCH_IDS + """)
+"""
+
+LOG_PRICE = """
+    INSERT INTO BulkPriceChanges (operation_id, product_id, field, old_value, new_value)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# One row per product rather than UPDATE ... FROM, which needs SQLite 3.33
+APPLY_PRICE = """
+    UPDATE Products SET
+        unit_price = ?, purchase_price = ?,
+        profit_margin = ?,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+"""
+
+OPERATION_PRICES = """
+    SELECT c.product_id, c.field, c.old_value, c.new_value, p.unit_price, p.purchase_price
+    FROM BulkPriceChanges c
+    JOIN Products p ON p.id = c.product_id
+    WHERE c.operation_id = ?
+"""
+
+# :mode 'set' moves each item to :quantity, 'add' moves it by :quantity
+PRODUCT_MOVEMENTS = """
+    INSERT INTO StockMovements (
+        product_id, variant_id, movement_type, quantity, unit_price,
+        reference, notes, user_id, bulk_operation_id, created_at
+    )
+    SELECT id, NULL, 'adjustment', moved, purchase_price,
+           :reference, :notes, :user_id, :operation_id, CURRENT_TIMESTAMP
+    FROM (
+        SELECT id, purchase_price,
+               CASE :mode WHEN 'set' THEN :quantity - COALESCE(stock, 0) ELSE :quantity END AS moved
+        FROM Products
+        WHERE id IN (""" + BATCH_IDS + """)
+    )
+    WHERE moved != 0
+"""
+
+VARIANT_MOVEMENTS = """
+    INSERT INTO StockMovements (
+        product_id, variant_id, movement_type, quantity, unit_price,
+        reference, notes, user_id, bulk_operation_id, created_at
+    )
+    SELECT product_id, id, 'adjustment', moved, purchase_price,
+           :reference, :notes, :user_id, :operation_id, CURRENT_TIMESTAMP
+    FROM (
+        SELECT v.product_id, v.id, COALESCE(v.purchase_price, p.purchase_price) AS purchase_price,
+               CASE :mode WHEN 'set' THEN :quantity - COALESCE(v.stock, 0) ELSE :quantity END AS moved
+        FROM ProductVariants v
+        JOIN Products p ON p.id = v.product_id
+        WHERE v.id IN (""" + BATCH_IDS + """)
+    )
+    WHERE moved != 0
+"""
+
+REVERSE_MOVEMENTS = """
+    INSERT INTO StockMovements (
+        product_id, variant_id, movement_type, quantity, unit_price,
+        reference, notes, user_id, created_at
+    )
+    SELECT product_id, variant_id, 'adjustment', -quantity, unit_price,
+           ?, ?, ?, CURRENT_TIMESTAMP
+    FROM StockMovements
+    WHERE bulk_operation_id = ?
+    ORDER BY id
+"""
+
+HISTORY_QUERY = """
+    SELECT id, kind, description, filters, item_count, user_id, created_at, undone_at
+    FROM BulkOperations
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+
+def _matching_variants(attributes):
+    """(SQL selecting the ids of the variants having every attribute given, params)
+
+    attributes is {'Taille': 'M', 'Couleur': ['Rouge', 'Bleu']}, as for
+    Product.find_variants(); the lookup goes through VariantAttributeValues.
+    """
+    wanted = []
+    for name, values in attributes.items():
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+        wanted.extend((name, str(value)) for value in values)
+    sql = f"""
+        WITH wanted(name, value) AS (VALUES {', '.join(['(?, ?)'] * len(wanted))})
+        SELECT vav.variant_id
+        FROM wanted
+        JOIN ProductAttributes pa ON pa.name = wanted.name
+        JOIN ProductAttributeValues pav ON pav.attribute_id = pa.id AND pav.value = wanted.value
+        JOIN VariantAttributeValues vav ON vav.attribute_value_id = pav.id
+        GROUP BY vav.variant_id
+        HAVING COUNT(DISTINCT pa.id) = ?
+    """
+    return sql, [param for pair in wanted for param in pair] + [len(attributes)]
+
+
+def _product_conditions(filters):
+    """(WHERE conditions on Products p, params) for category_id, supplier_id and attributes"""
+    conditions, params = [], []
+    if filters.get('category_id') is not None:
+        conditions.append("p.category_id = ?")
+        params.append(filters['category_id'])
+    if filters.get('supplier_id') is not None:
+        conditions.append("p.id IN (SELECT product_id FROM ProductSuppliers WHERE supplier_id = ?)")
+        params.append(filters['supplier_id'])
+    if filters.get('attributes'):
+        variants, variant_params = _matching_variants(filters['attributes'])
+        conditions.append(f"p.id IN (SELECT product_id FROM ProductVariants WHERE id IN ({variants}))")
+        params.extend(variant_params)
+    return conditions or ["1 = 1"], params
+
+
+def _price_targets(cursor, filters):
+    conditions, params = _product_conditions(filters)
+    cursor.execute(f"SELECT p.id FROM Products p WHERE {' AND '.join(conditions)} ORDER BY p.id", params)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _stock_targets(cursor, filters):
+    """(product ids, variant ids) whose stock the operation changes.
+
+    A product with variants keeps its stock on them, so its variants are
+    the targets; with an attribute filter, only the variants matching it.
+    """
+    conditions, params = _product_conditions(filters)
+    where = " AND ".join(conditions)
+    products = []
+    if not filters.get('attributes'):
+        cursor.execute(f"""
+            SELECT p.id FROM Products p
+            WHERE {where} AND NOT EXISTS (SELECT 1 FROM ProductVariants v WHERE v.product_id = p.id)
+            ORDER BY p.id
+        """, params)
+        products = [row[0] for row in cursor.fetchall()]
+    variant_filter = ""
+    if filters.get('attributes'):
+        variants, variant_params = _matching_variants(filters['attributes'])
+        variant_filter = f"AND v.id IN ({variants})"
+        params = params + variant_params
+    cursor.execute(f"""
+        SELECT v.id FROM ProductVariants v
+        JOIN Products p ON p.id = v.product_id
+        WHERE {where} {variant_filter}
+        ORDER BY v.id
+    """, params)
+    return products, [row[0] for row in cursor.fetchall()]
+
+
+def _batches(ids, batch_size):
+    for start in range(0, len(ids), batch_size):
+        yield ids[start:start + batch_size]
+
+
+def new_price(old_value, mode, value):
+    """The price after the change, rounded to the cent like every other amount; never below zero"""
+    old_cents = to_cents(old_value)
+    if mode == 'percent':
+        cents = old_cents + percent_cents(old_cents, value)
+    elif mode == 'amount':
+        cents = old_cents + to_cents(value)
+    else:
+        cents = to_cents(value)
+    return from_cents(max(cents, 0))
+
+
+def profit_margin(unit_price, purchase_price):
+    """Margin on the purchase price in %, as Product.update_product computes it; None without a purchase price"""
+    if not purchase_price:
+        return None
+    return ((unit_price or 0) - purchase_price) / purchase_price * 100
+
+
+def _price_updates(rows):
+    """APPLY_PRICE parameters for (product_id, unit_price, purchase_price) rows"""
+    return [(unit_price, purchase_price, profit_margin(unit_price, purchase_price), product_id)
+            for product_id, unit_price, purchase_price in rows]
+
+
+def format_value(mode, value):
+    if mode == 'percent':
+        return f"{value:+g} %"
+    if mode == 'amount':
+        return f"{value:+.2f}"
+    return f"= {value:g}"
+
+
+class BulkOperations:
+    """Price and stock changes applied to many products at once, and their undo."""
+
+    @staticmethod
+    def preview(filters):
+        """{'products': products whose price would change, 'stock_items': products and variants whose stock would}"""
+        try:
+            with DatabaseManager.session() as conn:
+                cursor = conn.cursor()
+                products, variants = _stock_targets(cursor, filters)
+                return {
+                    'products': len(_price_targets(cursor, filters)),
+                    'stock_items': len(products) + len(variants),
+                }
+        except Exception as e:
+            print(f"Error previewing bulk operation: {e}")
+            return None
+
+    @staticmethod
+    def _start(kind, description, filters, user_id):
+        with DatabaseManager.session(immediate=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute(INSERT_OPERATION, (kind, description, json.dumps(filters, ensure_ascii=False), user_id))
+            return cursor.lastrowid
+
+    @staticmethod
+    def update_prices(filters, mode, value, field='unit_price', user_id=None,
+                      batch_size=BATCH_SIZE, progress=None):
+        """Change field of every product matching filters; return the operation id.
+
+        mode is 'percent' (+10 for 10 % more), 'amount' (added) or 'set'.
+        progress(done, total) is called after every batch. None on error;
+        the batches written before it stay, and undo() reverts them.
+        """
+        if mode not in PRICE_MODES:
+            raise ValueError(f"Mode de prix inconnu : {mode}")
+        if field not in PRICE_FIELDS:
+            raise ValueError(f"Champ de prix inconnu : {field}")
+        try:
+            with DatabaseManager.session() as conn:
+                ids = _price_targets(conn.cursor(), filters)
+            operation_id = BulkOperations._start(
+                'price', f"{PRICE_FIELDS[field]} {format_value(mode, value)}", filters, user_id
+            )
+            done = 0
+            for batch in _batches(ids, batch_size):
+                with DatabaseManager.session(immediate=True) as conn:
+                    cursor = conn.cursor()
+                    changes, updates = [], []
+                    for product_id, unit_price, purchase_price in cursor.execute(
+                            BATCH_PRICES, {'ids': json.dumps(batch)}).fetchall():
+                        old_value = unit_price if field == 'unit_price' else purchase_price
+                        new_value = new_price(old_value, mode, value)
+                        if new_value == old_value:
+                            continue
+                        changes.append((operation_id, product_id, field, old_value, new_value))
+                        if field == 'unit_price':
+                            unit_price = new_value
+                        else:
+                            purchase_price = new_value
+                        updates.append((product_id, unit_price, purchase_price))
+                    cursor.executemany(LOG_PRICE, changes)
+                    cursor.executemany(APPLY_PRICE, _price_updates(updates))
+                    cursor.execute(COUNT_ITEMS, (len(updates), operation_id))
+                done += len(batch)
+                if progress:
+                    progress(done, len(ids))
+            return operation_id
+        except Exception as e:
+            print(f"Error updating prices: {e}")
+            return None
+
+    @staticmethod
+    def update_stock(filters, mode, quantity, user_id=None, notes=None,
+                     batch_size=BATCH_SIZE, progress=None):
+        """Set ('set') or add to ('add') the stock of every item matching filters; return the operation id.
+
+        The changes are 'adjustment' movements, applied by the ledger.
+        progress(done, total) is called after every batch. None on error.
+        """
+        if mode not in STOCK_MODES:
+            raise ValueError(f"Mode de stock inconnu : {mode}")
+        description = f"Stock {'fixé à' if mode == 'set' else 'ajouté :'} {quantity:g}"
+        try:
+            with DatabaseManager.session() as conn:
+                products, variants = _stock_targets(conn.cursor(), filters)
+            operation_id = BulkOperations._start('stock', description, filters, user_id)
+            total = len(products) + len(variants)
+            done = 0
+            for statement, ids in ((PRODUCT_MOVEMENTS, products), (VARIANT_MOVEMENTS, variants)):
+                for batch in _batches(ids, batch_size):
+                    with DatabaseManager.session(immediate=True) as conn:
+                        cursor = conn.cursor()
+                        cursor.execute(statement, {
+                            'mode': mode,
+                            'quantity': quantity,
+                            'reference': f"Opération groupée #{operation_id}",
+                            'notes': notes,
+                            'user_id': user_id,
+                            'operation_id': operation_id,
+                            'ids': json.dumps(batch),
+                        })
+                        cursor.execute(COUNT_ITEMS, (cursor.rowcount, operation_id))
+                    done += len(batch)
+                    if progress:
+                        progress(done, total)
+            return operation_id
+        except Exception as e:
+            print(f"Error updating stock: {e}")
+            return None
+
+    @staticmethod
+    def undo(operation_id, user_id=None):
+        """Revert an operation; return how many items were put back.
+
+        Prices changed again since are left alone. Stock movements are
+        reversed, so sales made since the operation still count. None on
+        error or if the operation is unknown or already undone.
+        """
+        try:
+            with DatabaseManager.session(immediate=True) as conn:
+                cursor = conn.cursor()
+                row = cursor.execute(
+                    "SELECT kind, undone_at FROM BulkOperations WHERE id = ?", (operation_id,)
+                ).fetchone()
+                if row is None or row[1] is not None:
+                    return None
+                if row[0] == 'price':
+                    # Only prices nobody changed since the operation are put back
+                    updates = []
+                    for (product_id, field, old_value, new_value,
+                         unit_price, purchase_price) in cursor.execute(OPERATION_PRICES, (operation_id,)).fetchall():
+                        if field == 'unit_price' and unit_price == new_value:
+                            updates.append((product_id, old_value, purchase_price))
+                        elif field == 'purchase_price' and purchase_price == new_value:
+                            updates.append((product_id, unit_price, old_value))
+                    cursor.executemany(APPLY_PRICE, _price_updates(updates))
+                    restored = len(updates)
+                else:
+                    cursor.execute(REVERSE_MOVEMENTS, (
+                        f"Annulation opération groupée #{operation_id}", None, user_id, operation_id
+                    ))
+                    restored = cursor.rowcount
+                cursor.execute(
+                    "UPDATE BulkOperations SET undone_at = CURRENT_TIMESTAMP WHERE id = ?", (operation_id,)
+                )
+                return restored
+        except Exception as e:
+            print(f"Error undoing bulk operation: {e}")
+            return None
+
+    @staticmethod
+    def history(limit=50):
+        """The latest operations, newest first, as dicts"""
+        try:
+            with DatabaseManager.session() as conn:
+                rows = conn.execute(HISTORY_QUERY, (limit,)).fetchall()
+            return [{
+                'id': row[0],
+                'kind': row[1],
+                'description': row[2],
+                'filters': json.loads(row[3]) if row[3] else {},
+                'item_count': row[4],
+                'user_id': row[5],
+                'created_at': row[6],
+                'undone_at': row[7],
+            } for row in rows]
+        except Exception as e:
+            print(f"Error reading bulk operations: {e}")
+            return []
+
+    @staticmethod
+    def get_suppliers():
+        """(id, name) of every supplier, for the filters"""
+        try:
+            with DatabaseManager.session() as conn:
+                return [tuple(row) for row in conn.execute("SELECT id, name FROM Suppliers ORDER BY name")]
+        except Exception as e:
+            print(f"Error getting suppliers: {e}")
+            return []
@@ -0,0 +1,99 @@
+from models.money import to_cents, line_cents
+
+
+class CartLine:
+    def __init__(self, product_id, variant_id, name, unit_price_cents, quantity=1):
+        self.product_id = product_id
+        self.variant_id = variant_id
+        self.name = name
+        self.unit_price_cents = unit_price_cents
+        self.quantity = quantity
+        self.subtotal_cents = line_cents(unit_price_cents, quantity)
+        self.row = None
+
+    @property
+    def key(self):
+        return (self.product_id, self.variant_id)
+
+    @property
+    def unit_price(self):
+        return self.unit_price_cents / 100
+
+    @property
+    def subtotal(self):
+        return self.subtotal_cents / 100
+
+
+class Cart:
+    """The basket being rung up.
+
+    Lines are found by (product_id, variant_id) in a dict and the total is
+    kept in integer cents and adjusted by each change, so adding, scanning
+    again or changing a quantity costs the same on line 300 as on line 1.
+    Lines keep the order they were added in; row numbers follow that order.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._lines = {}
+        self._rows = []
+        self.total_cents = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    @property
+    def total(self):
+        return self.total_cents / 100
+
+    def sale_items(self):
+        """The lines as the item dicts SaleCommitService.commit() takes"""
+        return [{
+            'product_id': line.product_id,
+            'variant_id': line.variant_id,
+            'quantity': line.quantity,
+            'unit_price': line.unit_price,
+        } for line in self._rows]
+
+    def line_at(self, row):
+        return self._rows[row] if 0 <= row < len(self._rows) else None
+
+    def find(self, product_id, variant_id=None):
+        return self._lines.get((product_id, variant_id))
+
+    def add(self, product_id, variant_id, name, unit_price, quantity=1):
+        """Add quantity of an item; return (row, created) where created is False
+        when an existing line was incremented."""
+        line = self._lines.get((product_id, variant_id))
+        if line is not None:
+            self.set_quantity(line, line.quantity + quantity)
+            return line.row, False
+
+        line = CartLine(product_id, variant_id, name, to_cents(unit_price), quantity)
+        line.row = len(self._rows)
+        self._lines[line.key] = line
+        self._rows.append(line)
+        self.total_cents += line.subtotal_cents
+        return len(self._rows) - 1, True
+
+    def set_quantity(self, line, quantity):
+        if quantity <= 0:
+            raise ValueError("La quantité doit être positive")
+        subtotal_cents = line_cents(line.unit_price_cents, quantity)
+        self.total_cents += subtotal_cents - line.subtotal_cents
+        line.quantity = quantity
+        line.subtotal_cents = subtotal_cents
+
+    def remove(self, row):
+        line = self._rows.pop(row)
+        del self._lines[line.key]
+        # Removal is the one O(n) operation: the lines below move up a row
+        for following in self._rows[row:]:
+            following.row -= 1
+        self.total_cents -= line.subtotal_cents
+        return line
@@ -0,0 +1,145 @@
+from database import DatabaseManager
+from models.product import PRODUCTS_FOR_SALE_QUERY
+import json
+import threading
+
+CATALOG_VERSIONS_QUERY = "SELECT name, version FROM CatalogVersions WHERE name IN ('catalog', 'stock')"
+
+
+class Catalog:
+    """Process-wide in-memory copy of the products, variants and categories the till sells.
+
+    Loaded once, then kept coherent by the 'catalog' and 'stock' counters in
+    CatalogVersions (migration 006), which triggers bump on every write from
+    any code path or process. Each access costs one small query to compare
+    versions: a catalogue change reloads everything, a stock change only
+    reloads stock levels.
+
+    The returned dicts are shared; treat them as read-only.
+    """
+    _lock = threading.Lock()
+    _versions = None
+    _products = {}
+    _ordered = []
+    _by_category = {}
+    _variants = {}
+    _variants_by_id = {}
+    _categories = []
+
+    @classmethod
+    def invalidate(cls):
+        """Forget the loaded data; the next access reloads it."""
+        with cls._lock:
+            cls._versions = None
+
+    @classmethod
+    def _load(cls, cursor):
+        products = {}
+        ordered = []
+        by_category = {}
+        for row in cursor.execute(PRODUCTS_FOR_SALE_QUERY):
+            product = dict(row)
+            if product.get('variant_attributes'):
+                try:
+                    product['variant_attributes'] = json.loads(product['variant_attributes'])
+                except:
+                    product['variant_attributes'] = None
+            products[product['id']] = product
+            ordered.append(product)
+            by_category.setdefault(product['category_id'], []).append(product)
+
+        variants = {}
+        variants_by_id = {}
+        for row in cursor.execute("SELECT * FROM ProductVariants ORDER BY product_id, id"):
+            variant = dict(row)
+            try:
+                variant['attribute_values'] = json.loads(variant['attribute_values']) if variant['attribute_values'] else {}
+            except:
+                variant['attribute_values'] = {}
+            variant['stock'] = variant['stock'] or 0
+            variants.setdefault(variant['product_id'], []).append(variant)
+            variants_by_id[variant['id']] = variant
+
+        categories = [tuple(row) for row in cursor.execute(
+            "SELECT id, name, description FROM Categories ORDER BY name"
+        )]
+
+        cls._products = products
+        cls._ordered = ordered
+        cls._by_category = by_category
+        cls._variants = variants
+        cls._variants_by_id = variants_by_id
+        cls._categories = categories
+
+    @classmethod
+    def _load_stock(cls, cursor):
+        for product_id, stock in cursor.execute("SELECT id, stock FROM Products"):
+            product = cls._products.get(product_id)
+            if product is not None:
+                product['stock'] = stock or 0
+        for variant_id, stock in cursor.execute("SELECT id, stock FROM ProductVariants"):
+            variant = cls._variants_by_id.get(variant_id)
+            if variant is not None:
+                variant['stock'] = stock or 0
+
+    @classmethod
+    def refresh(cls):
+        """Bring the cache up to date with the database; return False on error."""
+        try:
+            with DatabaseManager.session() as conn:
+                cursor = conn.cursor()
+                versions = dict(cursor.execute(CATALOG_VERSIONS_QUERY).fetchall())
+                if versions and versions == cls._versions:
+                    return True
+
+                with cls._lock:
+                    loaded = cls._versions
+                    if loaded is None or not versions or versions.get('catalog') != loaded.get('catalog'):
+                        cls._load(cursor)
+                    elif versions.get('stock') != loaded.get('stock'):
+                        cls._load_stock(cursor)
+                    # Without the counters (database not migrated) reload every time
+                    cls._versions = versions or None
+                return True
+        except Exception as e:
+            print(f"Error refreshing catalogue: {e}")
+            return False
+
+    @classmethod
+    def products(cls, category_id=None):
+        """Products sorted by name, optionally only those of one category."""
+        cls.refresh()
+        if category_id is None:
+            return list(cls._ordered)
+        return list(cls._by_category.get(category_id, []))
+
+    @classmethod
+    def product(cls, product_id):
+        cls.refresh()
+        return cls._products.get(product_id)
+
+    @classmethod
+    def variants(cls, product_id):
+        """Variants of a product, attribute_values already decoded."""
+        cls.refresh()
+        return list(cls._variants.get(product_id, []))
+
+    @classmethod
+    def categories(cls):
+        """(id, name, description) tuples sorted by name."""
+        cls.refresh()
+        return list(cls._categories)
+
+    @classmethod
+    def price(cls, product_id, variant_id=None):
+        """Selling price: the product's price plus the variant's adjustment."""
+        cls.refresh()
+        product = cls._products.get(product_id)
+        if product is None:
+            return None
+        price = float(product['unit_price'] or 0)
+        if variant_id is not None:
+            variant = cls._variants_by_id.get(variant_id)
+            if variant is not None:
+                price += float(variant.get('price_adjustment') or 0)
+        return price
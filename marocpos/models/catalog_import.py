@@ -0,0 +1,525 @@
+"""Streaming catalogue import from CSV or XLSX.
+
+Rows are read one at a time (csv.DictReader, or openpyxl in read-only
+mode), validated, and staged per batch in a TEMP table; each batch is then
+written with a few set-based statements in its own transaction: the rows
+are matched to existing products, an INSERT ... ON CONFLICT DO UPDATE
+upsert into Products or ProductVariants, and the stock differences as
+'adjustment' movements, which
+the ledger applies to the counters (see models.stock_ledger). Categories
+are resolved through a dict loaded once, so a 100k-row file costs a few
+statements per batch rather than several per row.
+
+A row with attributes ("Taille=M | Couleur=Rouge") is a variant of the
+product named in its name column, matched on its barcode. A CSV row with
+more cells than the header (an unquoted "Taille=M; Couleur=Rouge" in a
+';' file) is rejected rather than silently cut short.
+"""
+from database import DatabaseManager
+from migrations import refresh_product_search
+import csv
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+
+BATCH_SIZE = 2000
+MAX_ERRORS = 1000
+IMPORT_REFERENCE = "Import catalogue"
+# Where csv.DictReader puts the cells beyond the header
+EXTRA_CELLS = '__extra__'
+
+# Normalized header -> field
+HEADER_ALIASES = {
+    'name': 'name', 'nom': 'name', 'produit': 'name', 'designation': 'name',
+    'nom_produit': 'name', 'article': 'name', 'libelle': 'name', 'product': 'name', 'product_name': 'name',
+    'barcode': 'barcode', 'code_barres': 'barcode', 'code_barre': 'barcode', 'ean': 'barcode',
+    'code_barre_ean': 'barcode', 'code_barres_ean': 'barcode', 'code_ean': 'barcode', 'ean13': 'barcode',
+    'ean_13': 'barcode', 'gtin': 'barcode', 'upc': 'barcode',
+    'description': 'description',
+    'category': 'category', 'categorie': 'category', 'famille': 'category',
+    'unit_price': 'unit_price', 'prix': 'unit_price', 'prix_vente': 'unit_price',
+    'prix_unitaire': 'unit_price', 'prix_unitaire_vente': 'unit_price', 'pu': 'unit_price',
+    'price': 'unit_price', 'selling_price': 'unit_price',
+    'purchase_price': 'purchase_price', 'prix_achat': 'purchase_price', 'prix_unitaire_achat': 'purchase_price',
+    'cout': 'purchase_price', 'cout_achat': 'purchase_price', 'prix_revient': 'purchase_price',
+    'cost': 'purchase_price',
+    'stock': 'stock', 'quantite': 'stock', 'quantite_stock': 'stock', 'qte': 'stock', 'qty': 'stock',
+    'quantity': 'stock',
+    'min_stock': 'min_stock', 'stock_min': 'min_stock', 'stock_minimum': 'min_stock',
+    'seuil': 'min_stock', 'seuil_alerte': 'min_stock', 'stock_alerte': 'min_stock',
+    'unit': 'unit', 'unite': 'unit',
+    'sku': 'sku', 'reference': 'sku', 'ref': 'sku',
+    'attributes': 'attributes', 'attributs': 'attributes',
+}
+
+# Linking words a header may carry: 'Prix de vente', "Prix d'achat" and
+# 'Quantité en stock' are looked up again as prix_vente, prix_achat, quantite_stock
+HEADER_FILLER_WORDS = {'de', 'd', 'du', 'des', 'l', 'la', 'le', 'les', 'en', 'of', 'the'}
+
+# Product columns a file may set, and what a blank cell stands for
+PRODUCT_FIELDS = {
+    'description': None,
+    'category_id': None,
+    'purchase_price': 0,
+    'min_stock': 0,
+    'unit': 'piece',
+}
+
+CREATE_STAGING = """
+    CREATE TEMP TABLE IF NOT EXISTS ImportRows (
+        line INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        barcode TEXT,
+        description TEXT,
+        category_id INTEGER,
+        unit_price REAL,
+        purchase_price REAL,
+        stock REAL,
+        min_stock INTEGER,
+        unit TEXT,
+        sku TEXT,
+        attribute_values TEXT,
+        product_id INTEGER,
+        variant_id INTEGER
+    )
+"""
+
+STAGE_ROW = """
+    INSERT INTO temp.ImportRows (
+        line, name, barcode, description, category_id, unit_price,
+        purchase_price, stock, min_stock, unit, sku, attribute_values
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Parents of the variant rows that are not in the catalogue yet; an existing
+# parent keeps its price, and its category unless it has none
+INSERT_PARENTS = """
+    INSERT INTO Products (
+        name, unit_price, purchase_price, stock, category_id, has_variants, created_at, updated_at
+    )
+    SELECT name, MIN(unit_price), MIN(COALESCE(purchase_price, 0)), 0, MIN(category_id), 1,
+           CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+    FROM temp.ImportRows
+    WHERE attribute_values IS NOT NULL
+    GROUP BY name
+    ON CONFLICT(name) DO UPDATE SET
+        has_variants = 1,
+        category_id = COALESCE(category_id, excluded.category_id)
+"""
+
+RESOLVE_PRODUCTS = """
+    UPDATE temp.ImportRows SET product_id = COALESCE(
+        CASE WHEN attribute_values IS NULL
+             THEN (SELECT id FROM Products WHERE barcode = temp.ImportRows.barcode) END,
+        (SELECT id FROM Products WHERE name = temp.ImportRows.name)
+    )
+"""
+
+# The selling price of a variant is its parent's price plus price_adjustment
+# (see Catalog.price), so the adjustment is taken against the parent's price
+# as it stands, which for an existing parent need not be the file's
+INSERT_VARIANTS = """
+    INSERT INTO ProductVariants (
+        product_id, name, barcode, unit_price, purchase_price, price_adjustment,
+        stock, attribute_values, sku, created_at, updated_at
+    )
+    SELECT r.product_id,
+           (SELECT group_concat(value, ' / ') FROM json_each(r.attribute_values)),
+           r.barcode, r.unit_price, r.purchase_price,
+           COALESCE(ROUND(r.unit_price - p.unit_price, 2), 0),
+           0, r.attribute_values, r.sku, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+    FROM temp.ImportRows r
+    JOIN Products p ON p.id = r.product_id
+    WHERE r.attribute_values IS NOT NULL
+    ORDER BY r.line
+    ON CONFLICT(barcode) DO UPDATE SET
+        product_id = excluded.product_id,
+        name = excluded.name,
+        unit_price = excluded.unit_price,
+        price_adjustment = CASE WHEN excluded.unit_price IS NULL
+                                THEN price_adjustment ELSE excluded.price_adjustment END,
+        purchase_price = COALESCE(excluded.purchase_price, purchase_price),
+        attribute_values = excluded.attribute_values,
+        sku = COALESCE(excluded.sku, sku),
+        updated_at = excluded.updated_at
+"""
+
+RESOLVE_VARIANTS = """
+    UPDATE temp.ImportRows SET variant_id = (
+        SELECT id FROM ProductVariants WHERE barcode = temp.ImportRows.barcode
+    )
+    WHERE attribute_values IS NOT NULL
+"""
+
+# The difference between the file's stock and the counter, through the ledger
+INSERT_STOCK_MOVEMENTS = """
+    INSERT INTO StockMovements (
+        product_id, variant_id, movement_type, quantity,
+        unit_price, reference, notes, user_id, created_at
+    )
+    SELECT r.product_id, r.variant_id, 'adjustment',
+           r.stock - COALESCE(CASE WHEN r.variant_id IS NULL THEN p.stock ELSE v.stock END, 0),
+           COALESCE(r.purchase_price, p.purchase_price), ?, ?, ?, CURRENT_TIMESTAMP
+    FROM temp.ImportRows r
+    JOIN Products p ON p.id = r.product_id
+    LEFT JOIN ProductVariants v ON v.id = r.variant_id
+    WHERE r.stock IS NOT NULL
+      AND r.stock != COALESCE(CASE WHEN r.variant_id IS NULL THEN p.stock ELSE v.stock END, 0)
+"""
+
+
+def normalize_header(header):
+    """' Prix de vente ' -> 'prix_de_vente': accents dropped, lower case, underscores"""
+    # Only the accents go; other symbols (’ as well as ') separate words
+    text = ''.join(char for char in unicodedata.normalize('NFKD', str(header or ''))
+                   if not unicodedata.combining(char))
+    return re.sub(r'[^a-z0-9]+', '_', text.strip().lower()).strip('_')
+
+
+def header_field(header):
+    """The field a column header stands for, or None"""
+    key = normalize_header(header)
+    field = HEADER_ALIASES.get(key)
+    if field is None:
+        field = HEADER_ALIASES.get('_'.join(word for word in key.split('_') if word not in HEADER_FILLER_WORDS))
+    return field
+
+
+def parse_number(value):
+    """12.5, '12,50', '1 234,50' or '1.234,50' -> float; None for a blank cell.
+
+    Raises ValueError for anything else.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace('\u00a0', '').replace(' ', '')
+    if not text:
+        return None
+    if ',' in text:
+        # The last separator is the decimal one
+        if '.' in text and text.rfind('.') > text.rfind(','):
+            text = text.replace(',', '')
+        else:
+            text = text.replace('.', '').replace(',', '.')
+    return float(text)
+
+
+def parse_text(value):
+    """Cell as a stripped string, None if blank; whole floats lose their '.0' (barcodes from Excel)"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+def parse_attributes(value):
+    """'Taille=M | Couleur=Rouge' or a JSON object -> {'Taille': 'M', 'Couleur': 'Rouge'}
+
+    ';' is accepted as the separator too, where it isn't the file's delimiter.
+    """
+    text = parse_text(value)
+    if not text:
+        return {}
+    if text.startswith('{'):
+        attributes = json.loads(text)
+        if not isinstance(attributes, dict):
+            raise ValueError("attributs JSON invalides")
+        return {str(name): str(value) for name, value in attributes.items()}
+    attributes = {}
+    for part in re.split(r'[;|]', text):
+        if not part.strip():
+            continue
+        name, separator, value = part.partition('=')
+        if not separator:
+            name, separator, value = part.partition(':')
+        if not separator or not name.strip() or not value.strip():
+            raise ValueError(f"attribut invalide : {part.strip()}")
+        attributes[name.strip()] = value.strip()
+    return attributes
+
+
+def read_rows(path):
+    """Yield (line number, {header: cell}) for every data row of a CSV or XLSX file"""
+    if os.path.splitext(path)[1].lower() in ('.xlsx', '.xlsm'):
+        yield from _read_xlsx(path)
+    else:
+        yield from _read_csv(path)
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        # The delimiter is taken from the header line: decimal commas in the
+        # data mislead csv.Sniffer on French files
+        header = f.readline()
+        f.seek(0)
+        delimiter = max(';\t,', key=header.count)
+        reader = csv.DictReader(f, delimiter=delimiter, restkey=EXTRA_CELLS)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def _read_xlsx(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("openpyxl est requis pour importer des fichiers Excel (pip install openpyxl)")
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = next(rows, None)
+        if headers is None:
+            return
+        for line, values in enumerate(rows, start=2):
+            if all(value is None for value in values):
+                continue
+            yield line, dict(zip(headers, values))
+    finally:
+        workbook.close()
+
+
+def _clean_row(row):
+    """{field: cell} from a raw row, unknown columns dropped"""
+    cleaned = {}
+    if row.get(EXTRA_CELLS):
+        cleaned[EXTRA_CELLS] = row[EXTRA_CELLS]
+    for header, value in row.items():
+        field = header_field(header)
+        if field and field not in cleaned:
+            cleaned[field] = value
+    return cleaned
+
+
+def _validate(row, categories):
+    """Staging tuple (without line) for a cleaned row; raises ValueError with a French message"""
+    if row.get(EXTRA_CELLS):
+        raise ValueError(
+            f"{len(row[EXTRA_CELLS])} cellule(s) de plus que l'en-tête "
+            "(séparer les attributs par '|' ou mettre la cellule entre guillemets)"
+        )
+    name = parse_text(row.get('name'))
+    if not name:
+        raise ValueError("nom manquant")
+    try:
+        unit_price = parse_number(row.get('unit_price'))
+    except ValueError:
+        raise ValueError(f"prix de vente invalide : {row.get('unit_price')}")
+    if unit_price is None or unit_price < 0:
+        raise ValueError("prix de vente manquant ou négatif")
+    numbers = {}
+    for field in ('purchase_price', 'stock', 'min_stock'):
+        try:
+            numbers[field] = parse_number(row.get(field))
+        except ValueError:
+            raise ValueError(f"{field} invalide : {row.get(field)}")
+        if numbers[field] is not None and numbers[field] < 0 and field != 'stock':
+            raise ValueError(f"{field} négatif")
+
+    barcode = parse_text(row.get('barcode'))
+    attributes = parse_attributes(row.get('attributes'))
+    if attributes and not barcode:
+        raise ValueError("une variante doit avoir un code-barres")
+
+    category = parse_text(row.get('category'))
+    category_id = categories.get(category.lower()) if category else None
+
+    return (
+        name,
+        barcode,
+        parse_text(row.get('description')),
+        category_id,
+        unit_price,
+        numbers['purchase_price'],
+        numbers['stock'],
+        None if numbers['min_stock'] is None else int(numbers['min_stock']),
+        parse_text(row.get('unit')),
+        parse_text(row.get('sku')),
+        json.dumps(attributes, ensure_ascii=False) if attributes else None,
+    )
+
+
+def _upsert_products_sql(columns):
+    """Products upsert setting the columns the file has; the others keep their value.
+
+    Rows are matched beforehand (RESOLVE_PRODUCTS: on the barcode, or on the
+    name), so the upsert has a single conflict target, the id. A blank cell
+    in a present column means the column's default.
+    """
+    fields = [field for field in PRODUCT_FIELDS if field in columns]
+    values = ", ".join(
+        field if PRODUCT_FIELDS[field] is None else f"COALESCE({field}, {PRODUCT_FIELDS[field]!r})"
+        for field in fields
+    )
+    updates = "".join(f", {field} = excluded.{field}" for field in fields)
+    return f"""
+        INSERT INTO Products (id, name, barcode, unit_price, stock{"".join(", " + field for field in fields)},
+                              created_at, updated_at)
+        SELECT product_id, name, barcode, unit_price, 0{", " + values if values else ""},
+               CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+        FROM temp.ImportRows
+        WHERE attribute_values IS NULL
+        ORDER BY line
+        ON CONFLICT(id) DO UPDATE SET
+            name = excluded.name,
+            barcode = COALESCE(barcode, excluded.barcode),
+            unit_price = excluded.unit_price{updates},
+            updated_at = excluded.updated_at
+    """
+
+
+class CatalogImport:
+    """Bulk import of products and variants from a CSV or XLSX file."""
+
+    @staticmethod
+    def load_categories():
+        """{lower-case name: id} of every category"""
+        try:
+            with DatabaseManager.session() as conn:
+                return {row[1].strip().lower(): row[0]
+                        for row in conn.execute("SELECT id, name FROM Categories") if row[1]}
+        except Exception as e:
+            print(f"Error loading categories: {e}")
+            return {}
+
+    @staticmethod
+    def create_categories(names, categories):
+        """Create the categories of names missing from categories, adding them to it"""
+        missing = {}
+        for name in names:
+            if name and name.lower() not in categories:
+                missing.setdefault(name.lower(), name)
+        if not missing:
+            return
+        with DatabaseManager.session(immediate=True) as conn:
+            for key, name in missing.items():
+                conn.execute("""
+                    INSERT INTO Categories (name, created_at, updated_at)
+                    VALUES (?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                    ON CONFLICT(name) DO NOTHING
+                """, (name,))
+                categories[key] = conn.execute("SELECT id FROM Categories WHERE name = ?", (name,)).fetchone()[0]
+
+    @staticmethod
+    def run(path, batch_size=BATCH_SIZE, user_id=None, progress=None):
+        """Import path; return {'rows', 'products', 'variants', 'movements', 'errors', 'error_count', 'seconds'}.
+
+        progress(rows read, rows per second) is called after every batch; if
+        it returns True the import stops there, the batches already written
+        staying in. errors lists the first MAX_ERRORS (line, message) of the
+        rows that were skipped. Raises on an unreadable file.
+        """
+        result = {'rows': 0, 'products': 0, 'variants': 0, 'movements': 0,
+                  'errors': [], 'error_count': 0, 'seconds': 0.0}
+        categories = CatalogImport.load_categories()
+        started = time.perf_counter()
+
+        def error(line, message):
+            result['error_count'] += 1
+            if len(result['errors']) < MAX_ERRORS:
+                result['errors'].append((line, message))
+
+        columns = None
+        batch = []
+        for line, raw in read_rows(path):
+            row = _clean_row(raw)
+            if columns is None:
+                columns = set(row)
+                if 'category' in columns:
+                    columns.add('category_id')
+                if 'name' not in columns or 'unit_price' not in columns:
+                    raise ValueError("colonnes obligatoires manquantes : nom, prix_vente")
+            if not any(parse_text(value) for value in row.values()):
+                continue
+            result['rows'] += 1
+            batch.append((line, row))
+            if len(batch) >= batch_size:
+                CatalogImport._write_batch(batch, columns, categories, user_id, result, error)
+                batch = []
+                if progress and progress(result['rows'], result['rows'] / (time.perf_counter() - started)):
+                    break
+        else:
+            if batch:
+                CatalogImport._write_batch(batch, columns, categories, user_id, result, error)
+            if progress:
+                progress(result['rows'], result['rows'] / max(time.perf_counter() - started, 1e-9))
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+    @staticmethod
+    def _write_batch(batch, columns, categories, user_id, result, error):
+        CatalogImport.create_categories(
+            [parse_text(row.get('category')) for _, row in batch], categories
+        )
+        staged = {}
+        for line, row in batch:
+            try:
+                values = _validate(row, categories)
+            except (ValueError, TypeError) as e:
+                error(line, str(e))
+                continue
+            name, barcode, attribute_values = values[0], values[1], values[10]
+            # Last row wins when an item comes twice in a batch
+            key = ('variant', barcode) if attribute_values else ('product', barcode or name.lower())
+            staged.pop(key, None)
+            staged[key] = (line,) + values
+        rows = list(staged.values())
+        if not rows:
+            return
+        try:
+            CatalogImport._write_rows(rows, columns, user_id, result)
+        except sqlite3.IntegrityError:
+            # One row clashes (e.g. a barcode already used under another
+            # name): write the batch again row by row to find which
+            for row in rows:
+                try:
+                    CatalogImport._write_rows([row], columns, user_id, result)
+                except sqlite3.IntegrityError as e:
+                    error(row[0], f"conflit : {e}")
+
+    @staticmethod
+    def _write_rows(rows, columns, user_id, result):
+        with DatabaseManager.session(immediate=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute(CREATE_STAGING)
+            cursor.execute("DELETE FROM temp.ImportRows")
+            cursor.executemany(STAGE_ROW, rows)
+
+            # Matched first, on the barcode or else the name, so that the
+            # upsert only has the id to conflict on
+            cursor.execute(RESOLVE_PRODUCTS)
+            cursor.execute(_upsert_products_sql(columns))
+            products = max(cursor.rowcount, 0)
+            variants = 0
+            has_variants = any(row[11] for row in rows)
+            if has_variants:
+                cursor.execute(INSERT_PARENTS)
+            cursor.execute(RESOLVE_PRODUCTS)
+            if has_variants:
+                parents = [row[0] for row in cursor.execute(
+                    "SELECT DISTINCT product_id FROM temp.ImportRows WHERE attribute_values IS NOT NULL"
+                )]
+                # One search refresh per product instead of one per variant (see migration 014)
+                cursor.executemany("INSERT OR IGNORE INTO ProductSearchDeferred (product_id) VALUES (?)",
+                                   [(product_id,) for product_id in parents])
+                cursor.execute(INSERT_VARIANTS)
+                variants = max(cursor.rowcount, 0)
+                cursor.execute(RESOLVE_VARIANTS)
+                cursor.executemany("DELETE FROM ProductSearchDeferred WHERE product_id = ?",
+                                   [(product_id,) for product_id in parents])
+                for product_id in parents:
+                    refresh_product_search(cursor, product_id)
+
+            movements = 0
+            if 'stock' in columns:
+                cursor.execute(INSERT_STOCK_MOVEMENTS, (IMPORT_REFERENCE, None, user_id))
+                movements = max(cursor.rowcount, 0)
+            cursor.execute("DELETE FROM temp.ImportRows")
+        result['products'] += products
+        result['variants'] += variants
+        result['movements'] += movements
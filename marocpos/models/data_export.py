@@ -0,0 +1,195 @@
+"""Streaming exports of sales, sale lines, stock movements and the catalogue.
+
+Each dataset is one query read with fetchmany() in chunks of CHUNK_SIZE
+rows, and every chunk is written out before the next is read, so memory
+stays flat however long the period. CSV is written with the csv module;
+Parquet with pyarrow, when it is installed, one row group per chunk.
+The file is written under a temporary name and renamed at the end, so an
+interrupted export never leaves a truncated file behind. Amounts are
+exported in currency units, from the integer cents columns.
+"""
+from database import DatabaseManager
+import csv
+import os
+
+CHUNK_SIZE = 50000
+
+# Bounds of an export without a period. Both bounds are inclusive;
+# created_at has a time part, so the queries stop before the next day
+NO_START = "0000-01-01"
+NO_END = "9999-12-30"
+
+SALES_QUERY = """
+    SELECT s.id, s.created_at, s.user_id, u.username, s.payment_method, s.payment_status,
+           s.total_cents / 100.0, s.discount_cents / 100.0, s.tax_cents / 100.0,
+           s.final_total_cents / 100.0, s.notes
+    FROM Sales s
+    LEFT JOIN Users u ON u.id = s.user_id
+    WHERE s.created_at >= :date_from AND s.created_at < date(:date_to, '+1 day')
+    ORDER BY s.created_at, s.id
+"""
+
+SALE_ITEMS_QUERY = """
+    SELECT si.id, si.sale_id, s.created_at, s.user_id, s.payment_method,
+           si.product_id, p.barcode, p.name, si.variant_id, v.name, c.name,
+           si.quantity, si.unit_price_cents / 100.0, si.subtotal_cents / 100.0,
+           COALESCE(v.purchase_price_cents, p.purchase_price_cents) / 100.0
+    FROM Sales s
+    JOIN SaleItems si ON si.sale_id = s.id
+    LEFT JOIN Products p ON p.id = si.product_id
+    LEFT JOIN ProductVariants v ON v.id = si.variant_id
+    LEFT JOIN Categories c ON c.id = p.category_id
+    WHERE s.created_at >= :date_from AND s.created_at < date(:date_to, '+1 day')
+    ORDER BY s.created_at, s.id, si.id
+"""
+
+STOCK_MOVEMENTS_QUERY = """
+    SELECT sm.id, sm.created_at, sm.product_id, p.barcode, p.name, sm.variant_id,
+           sm.movement_type, sm.quantity, sm.unit_price, sm.reference, sm.notes,
+           sm.user_id, sm.sale_item_id
+    FROM StockMovements sm
+    LEFT JOIN Products p ON p.id = sm.product_id
+    WHERE sm.created_at >= :date_from AND sm.created_at < date(:date_to, '+1 day')
+    ORDER BY sm.created_at, sm.id
+"""
+
+PRODUCTS_QUERY = """
+    SELECT p.id, p.barcode, p.name, c.name, p.unit_price_cents / 100.0,
+           p.purchase_price_cents / 100.0, p.stock, p.min_stock, p.unit,
+           p.status, p.has_variants, p.created_at, p.updated_at
+    FROM Products p
+    LEFT JOIN Categories c ON c.id = p.category_id
+    ORDER BY p.id
+"""
+
+# dataset -> (query, [(column, type)]); types are 'int', 'float' or 'text'
+DATASETS = {
+    'sales': (SALES_QUERY, [
+        ('sale_id', 'int'), ('created_at', 'text'), ('user_id', 'int'), ('cashier', 'text'),
+        ('payment_method', 'text'), ('payment_status', 'text'), ('total', 'float'),
+        ('discount', 'float'), ('tax', 'float'), ('final_total', 'float'), ('notes', 'text'),
+    ]),
+    'sale_items': (SALE_ITEMS_QUERY, [
+        ('sale_item_id', 'int'), ('sale_id', 'int'), ('created_at', 'text'), ('user_id', 'int'),
+        ('payment_method', 'text'), ('product_id', 'int'), ('barcode', 'text'), ('product', 'text'),
+        ('variant_id', 'int'), ('variant', 'text'), ('category', 'text'), ('quantity', 'float'),
+        ('unit_price', 'float'), ('subtotal', 'float'), ('unit_cost', 'float'),
+    ]),
+    'stock_movements': (STOCK_MOVEMENTS_QUERY, [
+        ('movement_id', 'int'), ('created_at', 'text'), ('product_id', 'int'), ('barcode', 'text'),
+        ('product', 'text'), ('variant_id', 'int'), ('movement_type', 'text'), ('quantity', 'float'),
+        ('unit_price', 'float'), ('reference', 'text'), ('notes', 'text'), ('user_id', 'int'),
+        ('sale_item_id', 'int'),
+    ]),
+    'products': (PRODUCTS_QUERY, [
+        ('product_id', 'int'), ('barcode', 'text'), ('name', 'text'), ('category', 'text'),
+        ('unit_price', 'float'), ('purchase_price', 'float'), ('stock', 'float'), ('min_stock', 'float'),
+        ('unit', 'text'), ('status', 'text'), ('has_variants', 'int'), ('created_at', 'text'),
+        ('updated_at', 'text'),
+    ]),
+}
+
+DATASET_LABELS = {
+    'sales': "Ventes",
+    'sale_items': "Lignes de vente",
+    'stock_movements': "Mouvements de stock",
+    'products': "Catalogue produits",
+}
+
+def export_format(path):
+    """'parquet' for a .parquet path, 'csv' otherwise"""
+    return 'parquet' if os.path.splitext(path)[1].lower() in ('.parquet', '.pq') else 'csv'
+
+
+def iter_chunks(query, params, chunk_size=CHUNK_SIZE):
+    """Yield the rows of query as lists of tuples of at most chunk_size rows"""
+    with DatabaseManager.session() as conn:
+        cursor = conn.cursor()
+        # Plain tuples: the writers only need positions
+        cursor.row_factory = None
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+
+class _CsvWriter:
+    def __init__(self, path, columns, delimiter):
+        # utf-8-sig so that Excel reads the accents right
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file, delimiter=delimiter)
+        self.writer.writerow([name for name, _ in columns])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow est requis pour exporter en Parquet (pip install pyarrow)")
+        types = {'int': pa.int64(), 'float': pa.float64(), 'text': pa.string()}
+        self.pa = pa
+        self.schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, rows):
+        # Column-wise: one array per column, from the chunk transposed
+        arrays = [
+            self.pa.array(values, type=field.type)
+            for values, field in zip(zip(*rows), self.schema)
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class DataExport:
+    """Exports of the sales history, the stock ledger and the catalogue for accounting."""
+
+    @staticmethod
+    def run(dataset, path, date_from=None, date_to=None, chunk_size=CHUNK_SIZE,
+            delimiter=',', progress=None):
+        """Write dataset to path (CSV, or Parquet for .parquet); return the number of rows, None if stopped.
+
+        date_from and date_to (YYYY-MM-DD, both inclusive) bound the period;
+        the catalogue has none. progress(rows written) is called after every
+        chunk; if it returns True the export stops and no file is left.
+        Raises on error (unknown dataset, pyarrow missing, unwritable path).
+        """
+        if dataset not in DATASETS:
+            raise ValueError(f"Données inconnues : {dataset}")
+        query, columns = DATASETS[dataset]
+        params = {'date_from': date_from or NO_START, 'date_to': date_to or NO_END}
+
+        temporary = f"{path}.part"
+        if export_format(path) == 'parquet':
+            writer = _ParquetWriter(temporary, columns)
+        else:
+            writer = _CsvWriter(temporary, columns, delimiter)
+        written = 0
+        completed = False
+        try:
+            for rows in iter_chunks(query, params, chunk_size):
+                writer.write(rows)
+                written += len(rows)
+                if progress and progress(written):
+                    break
+            else:
+                completed = True
+        finally:
+            writer.close()
+            if completed:
+                os.replace(temporary, path)
+            else:
+                os.remove(temporary)
+        return written if completed else None
@@ -0,0 +1,96 @@
+"""Money as integer minor units (centimes for MAD).
+
+Amounts are converted to cents once, at the edge (a price typed in, a
+REAL read from an old column), with Decimal ROUND_HALF_UP; from then on
+totals, tax and discounts are integer arithmetic and add up exactly,
+however many rows are summed. The *_cents columns added by migration 008
+hold the same values in the database, so reports can SUM() integers in
+SQLite instead of floats in Python.
+"""
+from database import DatabaseManager
+from decimal import Decimal, ROUND_HALF_UP
+
+
+def _round(value):
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_cents(amount):
+    """MAD amount (float, str or Decimal) to integer cents, rounding half up"""
+    return _round(Decimal(str(amount or 0)) * 100)
+
+
+def from_cents(cents):
+    """Integer cents to a float amount, for the REAL columns and Qt widgets"""
+    return (cents or 0) / 100
+
+
+def to_decimal(cents):
+    return Decimal(cents or 0) / 100
+
+
+def line_cents(unit_price_cents, quantity):
+    """Subtotal of a line; quantity may be fractional (weighed goods)"""
+    return _round(Decimal(unit_price_cents) * Decimal(str(quantity)))
+
+
+def percent_cents(base_cents, rate):
+    """rate percent of base_cents (tax, percentage discount), rounded once"""
+    return _round(Decimal(base_cents) * Decimal(str(rate or 0)) / 100)
+
+
+def format_money(cents, currency="MAD"):
+    """12345 -> '123.45 MAD'"""
+    text = f"{to_decimal(cents):.2f}"
+    return f"{text} {currency}" if currency else text
+
+
+SALES_TOTALS_QUERY = """
+    SELECT COUNT(*),
+           COALESCE(SUM(total_cents), 0),
+           COALESCE(SUM(discount_cents), 0),
+           COALESCE(SUM(tax_cents), 0),
+           COALESCE(SUM(final_total_cents), 0)
+    FROM Sales
+    WHERE created_at >= ? AND created_at < ?
+"""
+
+PRODUCT_REVENUE_QUERY = """
+    SELECT si.product_id, SUM(si.quantity), SUM(si.subtotal_cents)
+    FROM Sales s
+    JOIN SaleItems si ON si.sale_id = s.id
+    WHERE s.created_at >= ? AND s.created_at < ?
+    GROUP BY si.product_id
+"""
+
+
+def sales_totals(start, end):
+    """Sale count and total/discount/tax/final cents for created_at in [start, end).
+
+    One integer SUM() per column inside SQLite: exact, and no row ever
+    reaches Python.
+    """
+    try:
+        with DatabaseManager.session() as conn:
+            count, total, discount, tax, final_total = conn.execute(SALES_TOTALS_QUERY, (start, end)).fetchone()
+        return {
+            'count': count,
+            'total_cents': total,
+            'discount_cents': discount,
+            'tax_cents': tax,
+            'final_total_cents': final_total,
+        }
+    except Exception as e:
+        print(f"Error computing sales totals: {e}")
+        return None
+
+
+def product_revenue(start, end):
+    """{product_id: (quantity, revenue_cents)} for sales in [start, end)"""
+    try:
+        with DatabaseManager.session() as conn:
+            rows = conn.execute(PRODUCT_REVENUE_QUERY, (start, end)).fetchall()
+        return {product_id: (quantity, cents) for product_id, quantity, cents in rows}
+    except Exception as e:
+        print(f"Error computing product revenue: {e}")
+        return {}
@@ -1,8 +1,129 @@
-from database import get_connection
+from database import DatabaseManager
+from migrations import apply_migrations
+from models.stock_ledger import record_movement, set_stock
+from models.variant_generator import insert_variants
 from datetime import datetime, UTC
 import json
+import re
 import sqlite3
 
+# Fixed query strings: the schema is guaranteed by the migrations, so these are
+# never rebuilt at runtime and stay in each pooled connection's statement cache.
+ALL_PRODUCTS_QUERY = """
+    SELECT 
+        p.id, 
+        p.name, 
+        p.barcode,
+        p.description,
+        COALESCE(p.unit_price, 0) as unit_price, 
+        COALESCE(p.purchase_price, 0) as purchase_price,
+        p.profit_margin,
+        COALESCE(p.stock, 0) as stock,
+        p.min_stock,
+        p.reorder_point,
+        p.image_path,
+        p.category_id,
+        p.unit,
+        p.weight,
+        p.volume,
+        COALESCE(p.status, 'available') as status,
+        COALESCE(p.product_type, 'stockable') as product_type,
+        COALESCE(p.valuation_method, 'FIFO') as valuation_method,
+        COALESCE(p.has_variants, 0) as has_variants,
+        p.variant_attributes,
+        COALESCE(c.name, 'Non catégorisé') as category_name,
+        p.created_at,
+        p.updated_at
+    FROM Products p
+    LEFT JOIN Categories c ON p.category_id = c.id
+    ORDER BY p.id DESC
+"""
+
+_PRODUCT_SALE_COLUMNS = """
+        p.id, 
+        p.name, 
+        p.barcode,
+        COALESCE(p.unit_price, 0) as unit_price, 
+        COALESCE(p.stock, 0) as stock,
+        p.image_path,
+        p.category_id,
+        COALESCE(p.has_variants, 0) as has_variants,
+        p.variant_attributes,
+        COALESCE(c.name, 'Non catégorisé') as category_name,
+        p.description,
+        COALESCE(p.purchase_price, 0) as purchase_price,
+        COALESCE(p.min_stock, 0) as min_stock,
+        p.unit,
+        p.weight,
+        p.volume,
+        COALESCE(p.status, 'available') as status,
+        COALESCE(p.product_type, 'stockable') as product_type,
+        COALESCE(p.valuation_method, 'FIFO') as valuation_method
+"""
+
+_PRODUCTS_FOR_SALE_SELECT = "SELECT" + _PRODUCT_SALE_COLUMNS + """
+    FROM Products p
+    LEFT JOIN Categories c ON p.category_id = c.id
+"""
+
+PRODUCTS_FOR_SALE_QUERY = _PRODUCTS_FOR_SALE_SELECT + " ORDER BY p.name"
+
+PRODUCTS_IN_CATEGORY_QUERY = _PRODUCTS_FOR_SALE_SELECT + " WHERE p.category_id = ? ORDER BY p.name"
+
+PRODUCT_FOR_SALE_QUERY = _PRODUCTS_FOR_SALE_SELECT + " WHERE p.id = ?"
+
+# Full-text search over ProductSearch (see migration 004). bm25() weights
+# follow its columns: a hit in the name counts most, then barcode, variants
+# and description.
+_PRODUCT_SEARCH_SELECT = "SELECT" + _PRODUCT_SALE_COLUMNS + """
+    FROM ProductSearch s
+    JOIN Products p ON p.id = s.rowid
+    LEFT JOIN Categories c ON p.category_id = c.id
+    WHERE ProductSearch MATCH ?
+      AND (? IS NULL OR p.category_id = ?)
+"""
+
+PRODUCT_SEARCH_RANKED_QUERY = _PRODUCT_SEARCH_SELECT + """
+    ORDER BY bm25(ProductSearch, 10.0, 8.0, 1.0, 4.0), p.name
+    LIMIT ? OFFSET ?
+"""
+
+# Scoring costs a couple of microseconds per hit, so a one- or two-letter
+# prefix matching most of the catalogue is returned in index order instead
+PRODUCT_SEARCH_UNRANKED_QUERY = _PRODUCT_SEARCH_SELECT + """
+    ORDER BY s.rowid
+    LIMIT ? OFFSET ?
+"""
+
+PRODUCT_SEARCH_COUNT_QUERY = "SELECT count(*) FROM ProductSearch WHERE ProductSearch MATCH ?"
+
+# Above this many hits a search is too broad for ranking to be worth it
+RANKED_SEARCH_LIMIT = 1000
+
+# Used when the SQLite build has no FTS5
+PRODUCT_SEARCH_LIKE_QUERY = _PRODUCTS_FOR_SALE_SELECT + """
+    WHERE (p.name LIKE ? OR p.barcode LIKE ?)
+      AND (? IS NULL OR p.category_id = ?)
+    ORDER BY p.name
+    LIMIT ? OFFSET ?
+"""
+
+PRODUCTS_PAGE_QUERY = _PRODUCTS_FOR_SALE_SELECT + """
+    WHERE (? IS NULL OR p.category_id = ?)
+    ORDER BY p.name
+    LIMIT ? OFFSET ?
+"""
+
+
+def fts_match_expression(text):
+    """Turn free text into an FTS5 query: every word must match as a prefix.
+
+    Words are quoted so that FTS5 operators typed by the user (AND, NEAR,
+    quotes, *) are searched for literally instead of being interpreted.
+    """
+    words = re.findall(r"\w+", text or "")
+    return " ".join(f'"{word}"*' for word in words)
+
 class Product:
     def __init__(self, name, unit_price=0, purchase_price=0, stock=0, category_id=None):
         self.name = name
@@ -13,195 +134,30 @@ class Product:
 
     @staticmethod
     def create_tables():
-        conn = get_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                
-                # Update Products table with variant support
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS Products (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        barcode TEXT,
-                        name TEXT NOT NULL,
-                        description TEXT,
-                        unit_price REAL DEFAULT 0,
-                        purchase_price REAL DEFAULT 0,
-                        profit_margin REAL,
-                        stock INTEGER DEFAULT 0,
-                        min_stock INTEGER DEFAULT 0,
-                        reorder_point INTEGER,
-                        image_path TEXT,
-                        category_id INTEGER,
-                        unit TEXT DEFAULT 'pièce',
-                        weight REAL,
-                        volume REAL,
-                        status TEXT DEFAULT 'available',
-                        product_type TEXT DEFAULT 'stockable',
-                        valuation_method TEXT DEFAULT 'FIFO',
-                        has_variants BOOLEAN DEFAULT 0,
-                        variant_attributes TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (category_id) REFERENCES Categories(id)
-                    )
-                """)
-                
-                # Create ProductVariants table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS ProductVariants (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        product_id INTEGER,
-                        attribute_values TEXT,
-                        price_adjustment REAL DEFAULT 0,
-                        stock INTEGER DEFAULT 0,
-                        barcode TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (product_id) REFERENCES Products(id)
-                    )
-                """)
-                
-                # Check if columns exist, add them if they don't
-                cursor.execute("PRAGMA table_info(Products)")
-                columns = {row[1] for row in cursor.fetchall()}
-                
-                # Add has_variants column if it doesn't exist
-                if 'has_variants' not in columns:
-                    print("Adding 'has_variants' column to Products table...")
-                    cursor.execute("ALTER TABLE Products ADD COLUMN has_variants BOOLEAN DEFAULT 0")
-                
-                # Add variant_attributes column if it doesn't exist
-                if 'variant_attributes' not in columns:
-                    print("Adding 'variant_attributes' column to Products table...")
-                    cursor.execute("ALTER TABLE Products ADD COLUMN variant_attributes TEXT")
-                
-                conn.commit()
-            finally:
-                conn.close()
+        """Ensure the product tables exist (delegates to the schema migrations)."""
+        return apply_migrations()
 
     @staticmethod
     def get_all_products():
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
-                
-                # First check if the variant columns exist
-                cursor.execute("PRAGMA table_info(Products)")
-                columns = {row[1] for row in cursor.fetchall()}
-                
-                # Build query based on available columns
-                query = """
-                    SELECT 
-                        p.id, 
-                        p.name, 
-                        p.barcode,
-                        p.description,
-                        COALESCE(p.unit_price, 0) as unit_price, 
-                        COALESCE(p.purchase_price, 0) as purchase_price,
-                        p.profit_margin,
-                        COALESCE(p.stock, 0) as stock,
-                        p.min_stock,
-                        p.reorder_point,
-                        p.image_path,
-                        p.category_id,
-                        p.unit,
-                        p.weight,
-                        p.volume,
-                        COALESCE(p.status, 'available') as status,
-                        COALESCE(p.product_type, 'stockable') as product_type,
-                        COALESCE(p.valuation_method, 'FIFO') as valuation_method,
-                """
-                
-                # Add variant columns if they exist
-                if 'has_variants' in columns:
-                    query += "p.has_variants,"
-                else:
-                    query += "0 as has_variants,"
-                    
-                if 'variant_attributes' in columns:
-                    query += "p.variant_attributes,"
-                else:
-                    query += "NULL as variant_attributes,"
-                
-                query += """
-                        COALESCE(c.name, 'Non catégorisé') as category_name,
-                        p.created_at,
-                        p.updated_at
-                    FROM Products p
-                    LEFT JOIN Categories c ON p.category_id = c.id
-                    ORDER BY p.id DESC
-                """
-                
-                cursor.execute(query)
+                cursor.execute(ALL_PRODUCTS_QUERY)
                 return cursor.fetchall()
-            except Exception as e:
-                print(f"Error in get_all_products: {e}")
-                return []
-            finally:
-                conn.close()
-        return []
+        except Exception as e:
+            print(f"Error in get_all_products: {e}")
+            return []
 
     @staticmethod
     def get_products_by_category(category_id=None):
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 
-                # Check if variant columns exist
-                cursor.execute("PRAGMA table_info(Products)")
-                columns = {row[1] for row in cursor.fetchall()}
-                
-                # Build the base query
-                query = """
-                    SELECT 
-                        p.id, 
-                        p.name, 
-                        p.barcode,
-                        COALESCE(p.unit_price, 0) as unit_price, 
-                        COALESCE(p.stock, 0) as stock,
-                        p.image_path,
-                        p.category_id,
-                """
-                
-                # Add variant columns if they exist
-                if 'has_variants' in columns:
-                    query += "p.has_variants,"
-                else:
-                    query += "0 as has_variants,"
-                    
-                if 'variant_attributes' in columns:
-                    query += "p.variant_attributes,"
-                else:
-                    query += "NULL as variant_attributes,"
-                
-                query += """
-                        COALESCE(c.name, 'Non catégorisé') as category_name,
-                        p.description,
-                        COALESCE(p.purchase_price, 0) as purchase_price,
-                        COALESCE(p.min_stock, 0) as min_stock,
-                        p.unit,
-                        p.weight,
-                        p.volume,
-                        COALESCE(p.status, 'available') as status,
-                        COALESCE(p.product_type, 'stockable') as product_type,
-                        COALESCE(p.valuation_method, 'FIFO') as valuation_method
-                    FROM Products p
-                    LEFT JOIN Categories c ON p.category_id = c.id
-                """
-                
-                # Add category filter if provided
                 if category_id is not None:
-                    query += " WHERE p.category_id = ? "
-                    params = (category_id,)
+                    cursor.execute(PRODUCTS_IN_CATEGORY_QUERY, (category_id,))
                 else:
-                    params = ()
-                
-                query += " ORDER BY p.name"
-                
-                cursor.execute(query, params)
+                    cursor.execute(PRODUCTS_FOR_SALE_QUERY)
 
                 products = cursor.fetchall()
                 
@@ -217,18 +173,14 @@ class Product:
                     result.append(product_dict)
                 
                 return result
-            except Exception as e:
-                print(f"Error getting products by category: {e}")
-                return []
-            finally:
-                conn.close()
-        return []
+        except Exception as e:
+            print(f"Error getting products by category: {e}")
+            return []
 
     @staticmethod
     def add_variant(product_id, attribute_values, price_adjustment=0, stock=0, barcode=None):
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 
                 # Convert attribute values to JSON if it's a dict
@@ -239,49 +191,92 @@ class Product:
                     INSERT INTO ProductVariants (
                         product_id, attribute_values, price_adjustment,
                         stock, barcode
-                    ) VALUES (?, ?, ?, ?, ?)
-                """, (product_id, attribute_values, price_adjustment, stock, barcode))
+                    ) VALUES (?, ?, ?, 0, ?)
+                """, (product_id, attribute_values, price_adjustment, barcode))
                 
                 variant_id = cursor.lastrowid
-                conn.commit()
+                # Opening stock goes through the ledger like any other
+                if stock:
+                    record_movement(cursor, product_id, variant_id, 'in', stock, reference="Stock initial")
                 return variant_id
-            except Exception as e:
-                print(f"Error adding variant: {e}")
-                return None
-            finally:
-                conn.close()
-        return None
+        except Exception as e:
+            print(f"Error adding variant: {e}")
+            return None
 
     @staticmethod
     def get_variants(product_id):
-        conn = get_connection()
-        if conn:
-            try:
+        with DatabaseManager.session() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT *
+                FROM ProductVariants
+                WHERE product_id = ?
+                ORDER BY id
+            """, (product_id,))
+            variants = cursor.fetchall()
+            
+            # Convert attribute_values from JSON string to dict
+            return [{
+                **dict(variant),
+                'attribute_values': json.loads(variant['attribute_values'])
+                if variant['attribute_values'] else {}
+            } for variant in variants]
+
+    @staticmethod
+    def find_variants(attributes, product_id=None):
+        """Variants having every attribute given, e.g. {'Taille': 'M', 'Couleur': ['Rouge', 'Bleu']}.
+
+        A list of values matches any of them. Values are looked up through
+        VariantAttributeValues and its indexes, not by reading the JSON of
+        every variant. Optionally limited to one product.
+        """
+        wanted = []
+        for name, values in attributes.items():
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            wanted.extend((name, str(value)) for value in values)
+        if not wanted:
+            return Product.get_variants(product_id) if product_id else []
+
+        params = [param for pair in wanted for param in pair] + [len(attributes)]
+        product_filter = ""
+        if product_id is not None:
+            product_filter = "AND pv.product_id = ?"
+            params.append(product_id)
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT *
-                    FROM ProductVariants
-                    WHERE product_id = ?
-                    ORDER BY id
-                """, (product_id,))
-                variants = cursor.fetchall()
-                
-                # Convert attribute_values from JSON string to dict
+                cursor.execute(f"""
+                    WITH wanted(name, value) AS (VALUES {', '.join(['(?, ?)'] * len(wanted))}),
+                    matches AS (
+                        SELECT vav.variant_id
+                        FROM wanted
+                        JOIN ProductAttributes pa ON pa.name = wanted.name
+                        JOIN ProductAttributeValues pav ON pav.attribute_id = pa.id AND pav.value = wanted.value
+                        JOIN VariantAttributeValues vav ON vav.attribute_value_id = pav.id
+                        GROUP BY vav.variant_id
+                        HAVING COUNT(DISTINCT pa.id) = ?
+                    )
+                    SELECT pv.*
+                    FROM matches
+                    JOIN ProductVariants pv ON pv.id = matches.variant_id
+                    WHERE 1 = 1 {product_filter}
+                    ORDER BY pv.id
+                """, params)
                 return [{
                     **dict(variant),
                     'attribute_values': json.loads(variant['attribute_values'])
                     if variant['attribute_values'] else {}
-                } for variant in variants]
-            finally:
-                conn.close()
-        return []
+                } for variant in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error finding variants: {e}")
+            return []
 
     @staticmethod
     def get_stock_movements(product_id, variant_id=None):
         """Get stock movement history for a product"""
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 
                 # Query base with parameters
@@ -310,128 +305,75 @@ class Product:
                 
                 # Convert to dictionaries
                 return [dict(movement) for movement in movements]
-            except Exception as e:
-                print(f"Error getting stock movements: {e}")
-                return []
-            finally:
-                conn.close()
-        return []
+        except Exception as e:
+            print(f"Error getting stock movements: {e}")
+            return []
     
     @staticmethod 
     def add_stock_movement(product_id, variant_id, movement_type, quantity, unit_price, reference, notes, user_id):
         """Add a stock movement record"""
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 
-                # Start a transaction
-                cursor.execute("BEGIN TRANSACTION")
                 
-                # Insert movement record
-                cursor.execute("""
-                    INSERT INTO StockMovements (
-                        product_id, variant_id, movement_type, 
-                        quantity, unit_price, reference, 
-                        notes, user_id, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, (
-                    product_id, variant_id, movement_type,
+                # Recording the movement updates the product or variant stock
+                return record_movement(
+                    cursor, product_id, variant_id, movement_type,
                     quantity, unit_price, reference,
                     notes, user_id
-                ))
-                
-                movement_id = cursor.lastrowid
-                
-                # Update product or variant stock
-                if variant_id:
-                    cursor.execute("""
-                        UPDATE ProductVariants
-                        SET stock = stock + ?,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    """, (quantity, variant_id))
-                else:
-                    cursor.execute("""
-                        UPDATE Products
-                        SET stock = stock + ?,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    """, (quantity, product_id))
-                
-                cursor.execute("COMMIT")
-                return movement_id
-            except Exception as e:
-                cursor.execute("ROLLBACK")
-                print(f"Error adding stock movement: {e}")
-                return None
-            finally:
-                conn.close()
-        return None
+                )
+        except Exception as e:
+            print(f"Error adding stock movement: {e}")
+            return None
     
     @staticmethod
-    def delete_stock_movement(movement_id):
-        """Delete a stock movement and revert its effects"""
-        conn = get_connection()
-        if conn:
-            try:
+    def delete_stock_movement(movement_id, user_id=None):
+        """Cancel a stock movement with an opposite one.
+
+        The ledger is append-only: the movement stays in the history and
+        the reversal brings the stock back.
+        """
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 
-                # Start a transaction
-                cursor.execute("BEGIN TRANSACTION")
                 
                 # Get the movement details
                 cursor.execute("""
-                    SELECT product_id, variant_id, quantity
+                    SELECT product_id, variant_id, quantity, unit_price
                     FROM StockMovements
                     WHERE id = ?
                 """, (movement_id,))
                 
                 movement = cursor.fetchone()
                 if not movement:
-                    cursor.execute("ROLLBACK")
                     return False
                 
-                product_id = movement['product_id']
-                variant_id = movement['variant_id']
-                quantity = movement['quantity']
-                
                 # Reverse the stock change
-                if variant_id:
-                    cursor.execute("""
-                        UPDATE ProductVariants
-                        SET stock = stock - ?,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    """, (quantity, variant_id))
-                else:
-                    cursor.execute("""
-                        UPDATE Products
-                        SET stock = stock - ?,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    """, (quantity, product_id))
+                record_movement(
+                    cursor, movement['product_id'], movement['variant_id'], 'adjustment',
+                    -movement['quantity'], movement['unit_price'],
+                    f"Annulation mouvement #{movement_id}", None, user_id
+                )
                 
-                # Delete the movement record
-                cursor.execute("DELETE FROM StockMovements WHERE id = ?", (movement_id,))
-                
-                cursor.execute("COMMIT")
                 return True
-            except Exception as e:
-                cursor.execute("ROLLBACK")
-                print(f"Error deleting stock movement: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error deleting stock movement: {e}")
+            return False
         
     @staticmethod
     def update_variant(variant_id, **kwargs):
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 
+                # Stock only changes through the ledger
+                if 'stock' in kwargs:
+                    row = cursor.execute("SELECT product_id FROM ProductVariants WHERE id = ?", (variant_id,)).fetchone()
+                    if row:
+                        set_stock(cursor, row['product_id'], variant_id, kwargs.pop('stock'))
+                
                 # Build update query dynamically
                 update_fields = []
                 values = []
@@ -455,26 +397,21 @@ class Product:
                 """
                 
                 cursor.execute(query, values)
-                conn.commit()
                 return True
-            except Exception as e:
-                print(f"Error updating variant: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error updating variant: {e}")
+            return False
 
     @staticmethod
     def add_product(name, unit_price=0, purchase_price=0, stock=0, category_id=None, has_variants=False, variant_attributes=None, variants=None, **kwargs):
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
-                cursor.execute("BEGIN TRANSACTION")
                 
                 # Prepare fields and values
+                # Stock starts at 0; the opening stock is recorded as a movement below
                 fields = ['name', 'unit_price', 'purchase_price', 'stock', 'category_id', 'has_variants']
-                values = [name, unit_price, purchase_price, stock, category_id, has_variants]
+                values = [name, unit_price, purchase_price, 0, category_id, has_variants]
                 
                 # Add variant_attributes if present
                 if variant_attributes:
@@ -511,6 +448,8 @@ class Product:
                 
                 cursor.execute(query, values)
                 product_id = cursor.lastrowid
+                if stock:
+                    record_movement(cursor, product_id, None, 'in', stock, purchase_price, "Stock initial")
                 
                 # Calculate and update profit margin if both prices are provided
                 if unit_price and purchase_price:
@@ -536,51 +475,26 @@ class Product:
                         kwargs.get('minimum_order')
                     ))
                 
-                # Add variants if provided
+                # Add variants if provided; may be a generator, written in batches
                 if has_variants and variants:
-                    for variant in variants:
-                        # Calculate variant price
-                        variant_price = variant.get('price', unit_price)
-                        
-                        # Prepare variant insert query
-                        cursor.execute("""
-                            INSERT INTO ProductVariants (
-                                product_id, name, barcode, unit_price, 
-                                purchase_price, stock, attributes, sku,
-                                created_at, updated_at
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            product_id,
-                            variant.get('name', ''),
-                            variant.get('barcode', ''),
-                            variant_price,
-                            variant.get('purchase_price', purchase_price),
-                            variant.get('stock', 0),
-                            variant.get('attribute_values', '{}'),
-                            variant.get('sku', ''),
-                            current_time,
-                            current_time
-                        ))
-                
-                # Commit transaction
-                cursor.execute("COMMIT")
+                    insert_variants(cursor, product_id, variants, unit_price, purchase_price)
+                
                 return product_id
                 
-            except Exception as e:
-                cursor.execute("ROLLBACK")
-                print(f"Error adding product: {e}")
-                return None
-            finally:
-                conn.close()
-        return None
+        except Exception as e:
+            print(f"Error adding product: {e}")
+            return None
 
     @staticmethod
     def update_product(product_id, **kwargs):
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 
+                # Stock only changes through the ledger
+                if 'stock' in kwargs:
+                    set_stock(cursor, product_id, None, kwargs.pop('stock'))
+                
                 # Build update query dynamically
                 update_fields = []
                 values = []
@@ -624,33 +538,41 @@ class Product:
                 """
                 
                 cursor.execute(query, values)
-                conn.commit()
                 return True
-            except Exception as e:
-                print(f"Error updating product: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error updating product: {e}")
+            return False
 
     @staticmethod
-    def delete_product(product_id):
-        conn = get_connection()
-        if conn:
-            try:
+    def delete_product(product_id, user_id=None):
+        """Delete a product and its variants.
+
+        Its stock movements stay in the ledger, which is append-only: what
+        is left in stock is written off with an adjustment first, so the
+        ledger balance of the deleted product ends at zero.
+        """
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
-                # Begin transaction
-                cursor.execute("BEGIN TRANSACTION")
-                
+
+                product = cursor.execute(
+                    "SELECT name, barcode FROM Products WHERE id = ?", (product_id,)
+                ).fetchone()
+                if product is None:
+                    return False
+                notes = f"Produit supprimé : {product['name']}"
+                if product['barcode']:
+                    notes += f" ({product['barcode']})"
+                variant_ids = [row[0] for row in cursor.execute(
+                    "SELECT id FROM ProductVariants WHERE product_id = ?", (product_id,)
+                )]
+                for variant_id in variant_ids + [None]:
+                    set_stock(cursor, product_id, variant_id, 0,
+                              reference="Suppression produit", notes=notes, user_id=user_id)
+
                 # Delete related records first
                 cursor.execute("DELETE FROM ProductVariants WHERE product_id = ?", (product_id,))
                 
-                # Try to delete from StockMovements if the table exists
-                try:
-                    cursor.execute("DELETE FROM StockMovements WHERE product_id = ?", (product_id,))
-                except sqlite3.OperationalError:
-                    pass  # Table might not exist
-                
                 # Try to delete from ProductSuppliers if the table exists
                 try:
                     cursor.execute("DELETE FROM ProductSuppliers WHERE product_id = ?", (product_id,))
@@ -660,23 +582,16 @@ class Product:
                 # Delete the product
                 cursor.execute("DELETE FROM Products WHERE id = ?", (product_id,))
                 
-                cursor.execute("COMMIT")
                 return True
-            except Exception as e:
-                cursor.execute("ROLLBACK")
-                print(f"Error deleting product: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error deleting product: {e}")
+            return False
 
     @staticmethod
     def update_stock(product_id, quantity, movement_type='adjustment', reference=None, user_id=None):
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
-                cursor.execute("BEGIN TRANSACTION")
 
                 # Get current stock and min_stock
                 cursor.execute("""
@@ -689,116 +604,104 @@ class Product:
                 if not product:
                     raise Exception("Product not found")
                 
-                new_stock = product['stock'] + quantity
+                new_stock = (product['stock'] or 0) + quantity
 
-                # Update product stock
-                cursor.execute("""
-                    UPDATE Products 
-                    SET stock = ?,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                """, (new_stock, product_id))
+                # Recording the movement updates the product stock
+                record_movement(cursor, product_id, None, movement_type, quantity,
+                                reference=reference, user_id=user_id)
 
-                # Try to record stock movement if table exists
-                try:
-                    cursor.execute("""
-                        INSERT INTO StockMovements (
-                            product_id, quantity, movement_type,
-                            reference, user_id, created_at
-                        ) VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                    """, (product_id, quantity, movement_type, reference, user_id))
-                except sqlite3.OperationalError:
-                    pass  # StockMovements table might not exist
-
-                cursor.execute("COMMIT")
-                
                 # Check if stock is below minimum
-                if new_stock <= product['min_stock']:
+                if new_stock <= (product['min_stock'] or 0):
                     # Could trigger notifications or automatic reordering here
                     print(f"Warning: Product {product_id} stock is below minimum!")
                 
                 return True
-            except Exception as e:
-                cursor.execute("ROLLBACK")
-                print(f"Error updating stock: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error updating stock: {e}")
+            return False
 
     @staticmethod
     def get_product(product_id):
-        conn = get_connection()
-        if conn:
-            try:
+        with DatabaseManager.session() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT 
+                    p.*, 
+                    COALESCE(c.name, 'Non catégorisé') as category_name
+                FROM Products p
+                LEFT JOIN Categories c ON p.category_id = c.id
+                WHERE p.id = ?
+            """, (product_id,))
+            return cursor.fetchone()
+
+    @staticmethod
+    def search(query, category_id=None, limit=50, offset=0):
+        """Return one page of products matching query, best matches first.
+
+        Matching is by word prefix and ignores case and accents ("cafe" finds
+        "Café"); variant names, barcodes and SKUs match their parent product.
+        Very broad searches come back unranked. An empty query lists the
+        products by name. limit=-1 means no limit.
+        """
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT 
-                        p.*, 
-                        COALESCE(c.name, 'Non catégorisé') as category_name
-                    FROM Products p
-                    LEFT JOIN Categories c ON p.category_id = c.id
-                    WHERE p.id = ?
-                """, (product_id,))
-                return cursor.fetchone()
-            finally:
-                conn.close()
-        return None
+                expression = fts_match_expression(query)
+                if not expression:
+                    cursor.execute(PRODUCTS_PAGE_QUERY, (category_id, category_id, limit, offset))
+                else:
+                    try:
+                        hits = cursor.execute(PRODUCT_SEARCH_COUNT_QUERY, (expression,)).fetchone()[0]
+                        query_sql = (PRODUCT_SEARCH_RANKED_QUERY if hits <= RANKED_SEARCH_LIMIT
+                                     else PRODUCT_SEARCH_UNRANKED_QUERY)
+                        cursor.execute(query_sql, (expression, category_id, category_id, limit, offset))
+                    except sqlite3.OperationalError:
+                        # No ProductSearch table: this SQLite build has no FTS5
+                        pattern = f"%{query.strip()}%"
+                        cursor.execute(PRODUCT_SEARCH_LIKE_QUERY,
+                                       (pattern, pattern, category_id, category_id, limit, offset))
+
+                result = []
+                for product in cursor.fetchall():
+                    product_dict = dict(product)
+                    if product_dict.get('variant_attributes'):
+                        try:
+                            product_dict['variant_attributes'] = json.loads(product_dict['variant_attributes'])
+                        except:
+                            product_dict['variant_attributes'] = None
+                    result.append(product_dict)
+                return result
+        except Exception as e:
+            print(f"Error searching products: {e}")
+            return []
 
     @staticmethod
     def search_products(query):
-        conn = get_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT 
-                        p.id, 
-                        p.name, 
-                        p.barcode,
-                        COALESCE(p.unit_price, 0) as unit_price, 
-                        COALESCE(p.stock, 0) as stock,
-                        p.image_path,
-                        p.category_id,
-                        COALESCE(c.name, 'Non catégorisé') as category_name
-                    FROM Products p
-                    LEFT JOIN Categories c ON p.category_id = c.id
-                    WHERE p.name LIKE ? OR p.barcode LIKE ?
-                    ORDER BY p.name
-                """, (f"%{query}%", f"%{query}%"))
-                return cursor.fetchall()
-            finally:
-                conn.close()
-        return []
+        """All products matching query; see search()."""
+        return Product.search(query, limit=-1)
 
     @staticmethod
     def get_product_suppliers(product_id):
-        conn = get_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT 
-                        s.*, 
-                        ps.price as supplier_price,
-                        ps.lead_time,
-                        ps.minimum_order
-                    FROM Suppliers s
-                    JOIN ProductSuppliers ps ON s.id = ps.supplier_id
-                    WHERE ps.product_id = ?
-                    ORDER BY ps.price ASC
-                """, (product_id,))
-                return cursor.fetchall()
-            finally:
-                conn.close()
-        return []
+        with DatabaseManager.session() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT 
+                    s.*, 
+                    ps.price as supplier_price,
+                    ps.lead_time,
+                    ps.minimum_order
+                FROM Suppliers s
+                JOIN ProductSuppliers ps ON s.id = ps.supplier_id
+                WHERE ps.product_id = ?
+                ORDER BY ps.price ASC
+            """, (product_id,))
+            return cursor.fetchall()
 
     @staticmethod
     def cleanup_database():
         """Clean up any NULL values in the database"""
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     UPDATE Products 
@@ -817,11 +720,7 @@ class Product:
                         OR product_type IS NULL 
                         OR valuation_method IS NULL
                 """)
-                conn.commit()
                 return True
-            except Exception as e:
-                print(f"Error cleaning up database: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
\ No newline at end of file
+        except Exception as e:
+            print(f"Error cleaning up database: {e}")
+            return False
\ No newline at end of file
@@ -1,4 +1,6 @@
-from database import get_connection
+from database import DatabaseManager
+from migrations import apply_migrations
+from models.variant_generator import iter_variant_combinations, insert_variants
 from datetime import datetime, UTC
 import json
 
@@ -10,48 +12,18 @@ class ProductAttribute:
     @staticmethod
     def create_tables():
         """Ensure the attribute tables exist"""
-        conn = get_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                
-                # Create ProductAttributes table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS ProductAttributes (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL UNIQUE,
-                        description TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Create ProductAttributeValues table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS ProductAttributeValues (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        attribute_id INTEGER NOT NULL,
-                        value TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (attribute_id) REFERENCES ProductAttributes(id) ON DELETE CASCADE,
-                        UNIQUE(attribute_id, value)
-                    )
-                """)
-                
-                conn.commit()
-                return True
-            except Exception as e:
-                print(f"Error creating attribute tables: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        try:
+            apply_migrations()
+            return True
+        except Exception as e:
+            print(f"Error creating attribute tables: {e}")
+            return False
 
     @staticmethod
     def get_all_attributes():
         """Get all product attributes"""
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT id, name, description, created_at
@@ -68,19 +40,15 @@ class ProductAttribute:
                         'created_at': row[3]
                     })
                 return attributes
-            except Exception as e:
-                print(f"Error getting attributes: {e}")
-                return []
-            finally:
-                conn.close()
-        return []
+        except Exception as e:
+            print(f"Error getting attributes: {e}")
+            return []
 
     @staticmethod
     def add_attribute(name, description=None):
         """Add a new product attribute"""
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 
                 # Check if attribute already exists
@@ -102,21 +70,16 @@ class ProductAttribute:
                 """, (name, description, current_time))
                 
                 attribute_id = cursor.lastrowid
-                conn.commit()
                 return attribute_id
-            except Exception as e:
-                print(f"Error adding attribute: {e}")
-                return None
-            finally:
-                conn.close()
-        return None
+        except Exception as e:
+            print(f"Error adding attribute: {e}")
+            return None
 
     @staticmethod
     def update_attribute(attribute_id, name, description=None):
         """Update an existing attribute"""
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     UPDATE ProductAttributes
@@ -124,25 +87,18 @@ class ProductAttribute:
                     WHERE id = ?
                 """, (name, description, attribute_id))
                 
-                conn.commit()
                 return cursor.rowcount > 0
-            except Exception as e:
-                print(f"Error updating attribute: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error updating attribute: {e}")
+            return False
 
     @staticmethod
     def delete_attribute(attribute_id):
         """Delete an attribute and its values"""
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 
-                # Start transaction
-                cursor.execute("BEGIN TRANSACTION")
                 
                 # Delete attribute values
                 cursor.execute("DELETE FROM ProductAttributeValues WHERE attribute_id = ?", (attribute_id,))
@@ -150,22 +106,16 @@ class ProductAttribute:
                 # Delete attribute
                 cursor.execute("DELETE FROM ProductAttributes WHERE id = ?", (attribute_id,))
                 
-                cursor.execute("COMMIT")
                 return True
-            except Exception as e:
-                cursor.execute("ROLLBACK")
-                print(f"Error deleting attribute: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error deleting attribute: {e}")
+            return False
 
     @staticmethod
     def get_attribute_values(attribute_id):
         """Get all values for a specific attribute"""
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT id, value
@@ -181,19 +131,15 @@ class ProductAttribute:
                         'value': row[1]
                     })
                 return values
-            except Exception as e:
-                print(f"Error getting attribute values: {e}")
-                return []
-            finally:
-                conn.close()
-        return []
+        except Exception as e:
+            print(f"Error getting attribute values: {e}")
+            return []
 
     @staticmethod
     def add_attribute_value(attribute_id, value):
         """Add a new value for an attribute"""
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 
                 # Check if value already exists
@@ -212,58 +158,101 @@ class ProductAttribute:
                 """, (attribute_id, value))
                 
                 value_id = cursor.lastrowid
-                conn.commit()
                 return value_id
-            except Exception as e:
-                print(f"Error adding attribute value: {e}")
-                return None
-            finally:
-                conn.close()
-        return None
+        except Exception as e:
+            print(f"Error adding attribute value: {e}")
+            return None
 
     @staticmethod
     def delete_attribute_value(value_id):
         """Delete an attribute value"""
-        conn = get_connection()
-        if conn:
-            try:
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM ProductAttributeValues WHERE id = ?", (value_id,))
-                conn.commit()
                 return cursor.rowcount > 0
-            except Exception as e:
-                print(f"Error deleting attribute value: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error deleting attribute value: {e}")
+            return False
+
+    @staticmethod
+    def get_variant_attributes(variant_id):
+        """{attribute name: value} of a variant, from VariantAttributeValues"""
+        try:
+            with DatabaseManager.session() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT pa.name, pav.value
+                    FROM VariantAttributeValues vav
+                    JOIN ProductAttributeValues pav ON pav.id = vav.attribute_value_id
+                    JOIN ProductAttributes pa ON pa.id = pav.attribute_id
+                    WHERE vav.variant_id = ?
+                    ORDER BY pa.name
+                """, (variant_id,))
+                return {row[0]: row[1] for row in cursor.fetchall()}
+        except Exception as e:
+            print(f"Error getting variant attributes: {e}")
+            return {}
+
+    @staticmethod
+    def get_value_counts(attribute_id, product_id=None):
+        """[{'id', 'value', 'variants'}]: how many variants have each value of an attribute"""
+        try:
+            with DatabaseManager.session() as conn:
+                cursor = conn.cursor()
+                if product_id is None:
+                    cursor.execute("""
+                        SELECT pav.id, pav.value, COUNT(vav.variant_id)
+                        FROM ProductAttributeValues pav
+                        LEFT JOIN VariantAttributeValues vav ON vav.attribute_value_id = pav.id
+                        WHERE pav.attribute_id = ?
+                        GROUP BY pav.id
+                        ORDER BY pav.value
+                    """, (attribute_id,))
+                else:
+                    cursor.execute("""
+                        SELECT pav.id, pav.value, COUNT(pv.id)
+                        FROM ProductAttributeValues pav
+                        LEFT JOIN VariantAttributeValues vav ON vav.attribute_value_id = pav.id
+                        LEFT JOIN ProductVariants pv ON pv.id = vav.variant_id AND pv.product_id = ?
+                        WHERE pav.attribute_id = ?
+                        GROUP BY pav.id
+                        ORDER BY pav.value
+                    """, (product_id, attribute_id))
+                return [{'id': row[0], 'value': row[1], 'variants': row[2]} for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error counting attribute values: {e}")
+            return []
 
     @staticmethod
     def generate_variant_combinations(attributes_values):
         """
-        Generate all possible combinations of attribute values
+        Generate all possible combinations of attribute values, lazily
         
         Args:
             attributes_values: A dict where keys are attribute names and values are lists of values
                 e.g. {'Color': ['Red', 'Blue'], 'Size': ['S', 'M', 'L']}
         
         Returns:
-            A list of dictionaries, each representing a variant combination
+            An iterator of dictionaries, each representing a variant combination;
+            count_variant_combinations() gives their number without generating them
         """
-        def generate_combinations(attrs, current=None, index=0):
-            if current is None:
-                current = {}
-            
-            if index >= len(attrs):
-                return [current.copy()]
-            
-            attr_name = list(attrs.keys())[index]
-            combinations = []
-            
-            for value in attrs[attr_name]:
-                current[attr_name] = value
-                combinations.extend(generate_combinations(attrs, current, index + 1))
-            
-            return combinations
-        
-        return generate_combinations(attributes_values)
+        return iter_variant_combinations(attributes_values)
+
+    @staticmethod
+    def create_variants(product_id, attributes_values, unit_price=None, purchase_price=None, progress=None):
+        """Create every combination as a variant of product_id; return how many were added.
+
+        Combinations already created (same SKU) are skipped, so running
+        it again after adding a value only adds the new ones. None on error.
+        """
+        try:
+            with DatabaseManager.session(immediate=True) as conn:
+                return insert_variants(
+                    conn.cursor(), product_id,
+                    ({'attributes': combination} for combination in iter_variant_combinations(attributes_values)),
+                    unit_price, purchase_price, progress=progress
+                )
+        except Exception as e:
+            print(f"Error creating variants: {e}")
+            return None
@@ -0,0 +1,130 @@
+from database import DatabaseManager
+from models.money import to_cents, from_cents, line_cents
+import time
+
+INSERT_SALE = """
+    INSERT INTO Sales (
+        created_at, user_id, total_amount,
+        discount, tax_amount, final_total,
+        payment_method, journal_id,
+        total_cents, discount_cents, tax_cents, final_total_cents
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SALE_BY_JOURNAL_ID = "SELECT id FROM Sales WHERE journal_id = ?"
+
+INSERT_SALE_ITEM = """
+    INSERT INTO SaleItems (
+        sale_id, product_id, variant_id,
+        quantity, unit_price, subtotal,
+        unit_price_cents, subtotal_cents
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# One 'out' movement per line, so the valuation engine can cost each line;
+# inserting them decrements the stock counters (see migration 012)
+INSERT_SALE_MOVEMENTS = """
+    INSERT INTO StockMovements (
+        product_id, variant_id, movement_type, quantity, unit_price,
+        reference, user_id, created_at, sale_item_id
+    )
+    SELECT si.product_id, si.variant_id, 'out', -si.quantity, si.unit_price,
+           'Vente #' || s.id, s.user_id, s.created_at, si.id
+    FROM SaleItems si
+    JOIN Sales s ON s.id = si.sale_id
+    WHERE si.sale_id = ?
+    ORDER BY si.id
+"""
+
+
+def _elapsed_ms(start, end):
+    return round((end - start) * 1000, 3)
+
+
+class SaleCommitService:
+    """Write a basket to the database in a single transaction.
+
+    The sale row, one executemany() for all its lines and one INSERT ... SELECT
+    for their stock movements, inside BEGIN IMMEDIATE: the write lock is taken
+    before anything is written, so a busy database makes the commit wait
+    (up to busy_timeout) at the start rather than fail half way.
+    """
+
+    @staticmethod
+    def commit(user_id, items, payment_method='CASH', discount=0, tax_amount=0, created_at=None,
+               journal_id=None):
+        """Commit a sale; return (sale_id, metrics).
+
+        items are dicts with product_id, variant_id (optional), quantity and
+        unit_price. metrics has the line count and prepare/lock/write/commit/total
+        times in ms. sale_id is None if the sale could not be written, with
+        the reason in metrics['error'] and the exception class name in
+        metrics['error_type'].
+
+        With a journal_id the commit is idempotent: if that basket was
+        already written, its sale_id is returned with metrics['duplicate']
+        set and nothing is written again.
+        """
+        started = time.perf_counter()
+        metrics = {'lines': len(items)}
+        try:
+            rows = []
+            total_cents = 0
+            for item in items:
+                unit_price_cents = to_cents(item['unit_price'])
+                subtotal_cents = line_cents(unit_price_cents, item['quantity'])
+                total_cents += subtotal_cents
+                rows.append((
+                    item['product_id'], item.get('variant_id'), item['quantity'],
+                    from_cents(unit_price_cents), from_cents(subtotal_cents),
+                    unit_price_cents, subtotal_cents
+                ))
+            discount_cents = to_cents(discount)
+            tax_cents = to_cents(tax_amount)
+            final_total_cents = total_cents + tax_cents - discount_cents
+
+            locking = time.perf_counter()
+            with DatabaseManager.session(immediate=True) as conn:
+                locked = time.perf_counter()
+                cursor = conn.cursor()
+                existing = None
+                if journal_id is not None:
+                    existing = cursor.execute(SALE_BY_JOURNAL_ID, (journal_id,)).fetchone()
+                if existing is not None:
+                    metrics['duplicate'] = True
+                    sale_id = existing[0]
+                else:
+                    sale_id = SaleCommitService._write(cursor, rows, (
+                        created_at or DatabaseManager.get_current_datetime(),
+                        user_id, from_cents(total_cents), from_cents(discount_cents),
+                        from_cents(tax_cents), from_cents(final_total_cents),
+                        payment_method, journal_id,
+                        total_cents, discount_cents, tax_cents, final_total_cents
+                    ))
+                written = time.perf_counter()
+            committed = time.perf_counter()
+
+            metrics.update({
+                'prepare_ms': _elapsed_ms(started, locking),
+                'lock_ms': _elapsed_ms(locking, locked),
+                'write_ms': _elapsed_ms(locked, written),
+                'commit_ms': _elapsed_ms(written, committed),
+                'total_ms': _elapsed_ms(started, committed),
+            })
+            return sale_id, metrics
+        except Exception as e:
+            print(f"Error committing sale: {e}")
+            metrics['error'] = str(e)
+            metrics['error_type'] = type(e).__name__
+            metrics['total_ms'] = _elapsed_ms(started, time.perf_counter())
+            return None, metrics
+
+    @staticmethod
+    def _write(cursor, rows, sale_row):
+        """Insert the sale, its lines and their stock movements; return the sale_id"""
+        cursor.execute(INSERT_SALE, sale_row)
+        sale_id = cursor.lastrowid
+
+        cursor.executemany(INSERT_SALE_ITEM, [(sale_id,) + row for row in rows])
+        cursor.execute(INSERT_SALE_MOVEMENTS, (sale_id,))
+        return sale_id
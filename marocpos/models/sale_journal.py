@@ -0,0 +1,231 @@
+from database import DatabaseManager
+from models.sale_commit import SaleCommitService
+from models.money import to_cents, from_cents
+import json
+import os
+import threading
+import uuid
+
+
+class SaleJournal:
+    """Append-only, fsync'd log of completed baskets, next to the database.
+
+    Checkout appends the basket here and treats the sale as done once the
+    line is on disk; apply() and replay() then write journalled baskets to
+    Sales/SaleItems. Each entry carries a journal_id stored on its Sales
+    row, so applying an entry twice (a retry, a replay after a crash
+    between the commit and the compaction) writes it only once.
+
+    One JSON object per line. A line torn by a crash while it was being
+    written is skipped: that basket was never acknowledged.
+
+    An entry the database will never accept (a constraint it breaks, or
+    the same error QUARANTINE_AFTER times in a row) is moved to a
+    quarantine file next to the journal for the operator to look at, so
+    it doesn't hold back every sale after it. Operational errors (locked
+    or busy database, full disk) are about the database, not the entry,
+    and are retried for as long as they last.
+    """
+    _lock = threading.Lock()
+    QUARANTINE_AFTER = 3
+    # Entries sent straight to quarantine, whatever their failure count
+    PERMANENT_ERRORS = {'IntegrityError'}
+    RETRIED_ERRORS = {'OperationalError'}
+    # journal_id -> (error, consecutive failures) for this process
+    _failures = {}
+
+    @staticmethod
+    def path():
+        return os.path.splitext(DatabaseManager.DB_PATH)[0] + ".journal.jsonl"
+
+    @staticmethod
+    def quarantine_path():
+        return os.path.splitext(DatabaseManager.DB_PATH)[0] + ".journal.quarantine.jsonl"
+
+    @classmethod
+    def append(cls, user_id, items, payment_method='CASH', created_at=None, discount=0, tax_amount=0):
+        """Durably record a basket; return its entry, or None if it could not be written"""
+        entry = {
+            'journal_id': uuid.uuid4().hex,
+            'user_id': user_id,
+            'items': items,
+            'payment_method': payment_method,
+            # Rounded to the cent as commit() will, and JSON-safe whatever the type
+            'discount': from_cents(to_cents(discount)),
+            'tax_amount': from_cents(to_cents(tax_amount)),
+            'created_at': created_at or DatabaseManager.get_current_datetime(),
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            with cls._lock:
+                with open(cls.path(), "a+b") as journal:
+                    # Start on a fresh line if a crash left the last one torn
+                    if journal.seek(0, os.SEEK_END) > 0:
+                        journal.seek(-1, os.SEEK_END)
+                        if journal.read(1) != b"\n":
+                            line = b"\n" + line
+                    journal.write(line)
+                    journal.flush()
+                    os.fsync(journal.fileno())
+            return entry
+        except Exception as e:
+            print(f"Error writing sale journal: {e}")
+            return None
+
+    @classmethod
+    def entries(cls):
+        """Every readable entry in the journal, oldest first"""
+        with cls._lock:
+            return cls._read()
+
+    @classmethod
+    def quarantined(cls):
+        """Entries set aside by replay(), oldest first, each with its 'error'"""
+        with cls._lock:
+            return cls._read(cls.quarantine_path())
+
+    @classmethod
+    def _read(cls, path=None):
+        try:
+            with open(path or cls.path(), encoding="utf-8") as journal:
+                lines = journal.readlines()
+        except FileNotFoundError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                print(f"Skipping unreadable sale journal line: {line[:80]!r}")
+        return entries
+
+    @staticmethod
+    def apply(entry):
+        """Write one journalled basket to the database; (sale_id, metrics) as SaleCommitService.commit"""
+        return SaleCommitService.commit(
+            entry['user_id'], entry['items'],
+            payment_method=entry.get('payment_method', 'CASH'),
+            # Entries written before these were journalled had neither
+            discount=entry.get('discount', 0),
+            tax_amount=entry.get('tax_amount', 0),
+            created_at=entry.get('created_at'),
+            journal_id=entry['journal_id']
+        )
+
+    @staticmethod
+    def applied_ids(journal_ids):
+        """The subset of journal_ids that already have a Sales row"""
+        applied = set()
+        journal_ids = list(journal_ids)
+        with DatabaseManager.session() as conn:
+            # Chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(journal_ids), 500):
+                chunk = journal_ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT journal_id FROM Sales WHERE journal_id IN ({placeholders})", chunk
+                ).fetchall()
+                applied.update(row[0] for row in rows)
+        return applied
+
+    @classmethod
+    def pending(cls):
+        """Entries not yet written to the database"""
+        entries = cls.entries()
+        if not entries:
+            return []
+        done = cls.applied_ids(entry['journal_id'] for entry in entries) | cls._quarantined_ids()
+        return [entry for entry in entries if entry['journal_id'] not in done]
+
+    @classmethod
+    def replay(cls):
+        """Apply every pending entry, then compact; return [(journal_id, sale_id, metrics)].
+
+        sale_id is None for an entry that failed (journal_id too if the
+        database could not even be read). Stops at the first failure, so
+        sales are written in the order they were rung up; the rest are
+        retried on the next replay. A failed entry that is quarantined
+        instead has metrics['quarantined'] set, and the replay goes on.
+        """
+        try:
+            pending = cls.pending()
+        except Exception as e:
+            print(f"Error reading sale journal: {e}")
+            return [(None, None, {'error': str(e)})]
+        results = []
+        for entry in pending:
+            sale_id, metrics = cls.apply(entry)
+            results.append((entry['journal_id'], sale_id, metrics))
+            if sale_id is not None:
+                cls._failures.pop(entry['journal_id'], None)
+                continue
+            if not (cls._should_quarantine(entry['journal_id'], metrics) and cls._quarantine(entry, metrics)):
+                break
+            metrics['quarantined'] = True
+        cls.compact()
+        return results
+
+    @classmethod
+    def _should_quarantine(cls, journal_id, metrics):
+        """Count this failure; True once the entry is not worth retrying"""
+        error_type = metrics.get('error_type')
+        if error_type in cls.RETRIED_ERRORS:
+            cls._failures.pop(journal_id, None)
+            return False
+        if error_type in cls.PERMANENT_ERRORS:
+            return True
+        error = metrics.get('error')
+        previous, count = cls._failures.get(journal_id, (None, 0))
+        count = count + 1 if error == previous else 1
+        cls._failures[journal_id] = (error, count)
+        return count >= cls.QUARANTINE_AFTER
+
+    @classmethod
+    def _quarantine(cls, entry, metrics):
+        """Durably copy a failed entry to the quarantine file; compact() then drops it"""
+        record = dict(entry, error=metrics.get('error'), error_type=metrics.get('error_type'),
+                      quarantined_at=DatabaseManager.get_current_datetime())
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            with cls._lock:
+                with open(cls.quarantine_path(), "ab") as quarantine:
+                    quarantine.write(line)
+                    quarantine.flush()
+                    os.fsync(quarantine.fileno())
+        except Exception as e:
+            print(f"Error writing sale journal quarantine: {e}")
+            return False
+        cls._failures.pop(entry['journal_id'], None)
+        print(f"Sale journal entry {entry['journal_id']} quarantined: {metrics.get('error')}")
+        return True
+
+    @classmethod
+    def _quarantined_ids(cls):
+        return {entry['journal_id'] for entry in cls._read(cls.quarantine_path())}
+
+    @classmethod
+    def compact(cls):
+        """Drop the entries that are in the database or quarantined; return how many are left"""
+        try:
+            with cls._lock:
+                entries = cls._read()
+                if not entries:
+                    return 0
+                done = cls.applied_ids(entry['journal_id'] for entry in entries) | cls._quarantined_ids()
+                remaining = [entry for entry in entries if entry['journal_id'] not in done]
+                if len(remaining) == len(entries):
+                    return len(remaining)
+
+                # Write the survivors aside and swap them in, so a crash leaves
+                # either the old journal or the new one, never half of it
+                temp_path = cls.path() + ".tmp"
+                with open(temp_path, "w", encoding="utf-8") as journal:
+                    for entry in remaining:
+                        journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                os.replace(temp_path, cls.path())
+                return len(remaining)
+        except Exception as e:
+            print(f"Error compacting sale journal: {e}")
+            return None
@@ -1,5 +1,7 @@
-from database import get_connection
-from datetime import datetime, UTC
+from database import DatabaseManager
+from migrations import apply_migrations
+from models.sale_commit import SaleCommitService
+from models.money import to_cents, from_cents, line_cents, percent_cents
 from escpos.printer import Usb
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, letter
@@ -10,153 +12,117 @@ import os
 class Sales:
     @staticmethod
     def create_tables():
-        conn = get_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                
-                # Create Sales table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS Sales (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        created_at TIMESTAMP NOT NULL,
-                        user_id INTEGER NOT NULL,
-                        total_amount REAL NOT NULL,
-                        discount REAL DEFAULT 0,
-                        tax_amount REAL DEFAULT 0,
-                        final_total REAL NOT NULL,
-                        payment_method TEXT DEFAULT 'CASH',
-                        payment_status TEXT DEFAULT 'COMPLETED',
-                        notes TEXT,
-                        FOREIGN KEY (user_id) REFERENCES Users(id)
-                    )
-                """)
-
-                # Create SaleItems table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS SaleItems (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        sale_id INTEGER NOT NULL,
-                        product_id INTEGER NOT NULL,
-                        quantity REAL NOT NULL,
-                        unit_price REAL NOT NULL,
-                        subtotal REAL NOT NULL,
-                        FOREIGN KEY (sale_id) REFERENCES Sales(id),
-                        FOREIGN KEY (product_id) REFERENCES Products(id)
-                    )
-                """)
-
-                conn.commit()
-                return True
-            except Exception as e:
-                print(f"Error creating sales tables: {e}")
-                return False
-            finally:
-                conn.close()
+        """Ensure the sales tables exist (delegates to the schema migrations)."""
+        try:
+            apply_migrations()
+            return True
+        except Exception as e:
+            print(f"Error creating sales tables: {e}")
+            return False
 
     @staticmethod
     def create_sale(user_id, items, payment_method='CASH', discount=0, tax_rate=0):
-        conn = get_connection()
-        if conn:
-            try:
+        # Tax on the exact cents subtotal, rounded once for the whole sale
+        subtotal_cents = sum(line_cents(to_cents(item['unit_price']), item['quantity']) for item in items)
+        tax_amount = from_cents(percent_cents(subtotal_cents, tax_rate))
+        sale_id, metrics = SaleCommitService.commit(
+            user_id, items, payment_method=payment_method,
+            discount=discount, tax_amount=tax_amount
+        )
+        return sale_id
+
+    @staticmethod
+    def get_sales_page(after_id=None, limit=100, filters=None):
+        """One page of sales, newest first, starting after the sale after_id.
+
+        Keyset pagination over (created_at, id): every page costs the same
+        however deep into the history it is, unlike OFFSET. filters may hold
+        date_from and date_to (YYYY-MM-DD, both inclusive), user_id and
+        payment_method; they are applied in SQL.
+        """
+        filters = filters or {}
+        clauses, params = [], []
+        if filters.get('date_from'):
+            clauses.append("s.created_at >= ?")
+            params.append(filters['date_from'])
+        if filters.get('date_to'):
+            # created_at has a time part: stop before the next day
+            clauses.append("s.created_at < date(?, '+1 day')")
+            params.append(filters['date_to'])
+        if filters.get('user_id') is not None:
+            clauses.append("s.user_id = ?")
+            params.append(filters['user_id'])
+        if filters.get('payment_method'):
+            clauses.append("s.payment_method = ?")
+            params.append(filters['payment_method'])
+        if after_id is not None:
+            clauses.append("(s.created_at, s.id) < (SELECT created_at, id FROM Sales WHERE id = ?)")
+            params.append(after_id)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        try:
+            with DatabaseManager.session() as conn:
                 cursor = conn.cursor()
-                # Start transaction
-                cursor.execute("BEGIN TRANSACTION")
-
-                # Calculate totals
-                subtotal = sum(item['quantity'] * item['unit_price'] for item in items)
-                tax_amount = subtotal * (tax_rate / 100)
-                total_with_tax = subtotal + tax_amount
-                final_total = total_with_tax - discount
-
-                # Create sale record
-                cursor.execute("""
-                    INSERT INTO Sales (
-                        created_at, user_id, total_amount, 
-                        discount, tax_amount, final_total, 
-                        payment_method
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    datetime.now(UTC).strftime("%Y-%m-%d %H:%M:%S"),
-                    user_id, subtotal, discount, tax_amount,
-                    final_total, payment_method
-                ))
-                
-                sale_id = cursor.lastrowid
-
-                # Add sale items
-                for item in items:
-                    cursor.execute("""
-                        INSERT INTO SaleItems (
-                            sale_id, product_id, quantity,
-                            unit_price, subtotal
-                        ) VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        sale_id, item['product_id'], 
-                        item['quantity'], item['unit_price'],
-                        item['quantity'] * item['unit_price']
-                    ))
-
-                    # Update product stock
-                    cursor.execute("""
-                        UPDATE Products 
-                        SET stock = stock - ? 
-                        WHERE id = ?
-                    """, (item['quantity'], item['product_id']))
-
-                cursor.execute("COMMIT")
-                return sale_id
-
-            except Exception as e:
-                cursor.execute("ROLLBACK")
-                print(f"Error creating sale: {e}")
-                return None
-            finally:
-                conn.close()
-        return None
+                cursor.execute(f"""
+                    SELECT s.id, s.created_at, s.user_id, u.username,
+                           s.total_amount, s.discount, s.tax_amount, s.final_total,
+                           s.payment_method
+                    FROM Sales s
+                    LEFT JOIN Users u ON u.id = s.user_id
+                    {where}
+                    ORDER BY s.created_at DESC, s.id DESC
+                    LIMIT ?
+                """, params + [limit])
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error loading sales page: {e}")
+            return []
+
+    @staticmethod
+    def get_payment_methods():
+        """Payment methods that appear in the sales history"""
+        try:
+            with DatabaseManager.session() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT DISTINCT payment_method FROM SalesPaymentSummary ORDER BY payment_method")
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error loading payment methods: {e}")
+            return []
 
 class ReceiptPrinter:
     def __init__(self):
         self.load_settings()
 
     def load_settings(self):
-        conn = get_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT key, value FROM Settings")
-                self.settings = dict(cursor.fetchall())
-            finally:
-                conn.close()
+        with DatabaseManager.session() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT key, value FROM Settings")
+            self.settings = dict(cursor.fetchall())
 
     def get_sale_data(self, sale_id):
-        conn = get_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                
-                # Get sale details
-                cursor.execute("""
-                    SELECT s.*, u.username 
-                    FROM Sales s
-                    JOIN Users u ON s.user_id = u.id
-                    WHERE s.id = ?
-                """, (sale_id,))
-                sale = cursor.fetchone()
-
-                # Get sale items with product names
-                cursor.execute("""
-                    SELECT si.*, p.name 
-                    FROM SaleItems si
-                    JOIN Products p ON si.product_id = p.id
-                    WHERE si.sale_id = ?
-                """, (sale_id,))
-                items = cursor.fetchall()
-
-                return sale, items
-            finally:
-                conn.close()
-        return None, None
+        with DatabaseManager.session() as conn:
+            cursor = conn.cursor()
+            
+            # Get sale details
+            cursor.execute("""
+                SELECT s.*, u.username 
+                FROM Sales s
+                JOIN Users u ON s.user_id = u.id
+                WHERE s.id = ?
+            """, (sale_id,))
+            sale = cursor.fetchone()
+
+            # Get sale items with product names
+            cursor.execute("""
+                SELECT si.*, p.name 
+                FROM SaleItems si
+                JOIN Products p ON si.product_id = p.id
+                WHERE si.sale_id = ?
+            """, (sale_id,))
+            items = cursor.fetchall()
+
+            return sale, items
 
     def print_thermal(self, sale_id):
         """Print receipt to thermal printer"""
@@ -0,0 +1,165 @@
+from database import DatabaseManager
+from migrations import SUMMARY_REBUILD
+from datetime import datetime
+import json
+
+DAILY_SUMMARY_QUERY = """
+    SELECT sale_count, total_cents, discount_cents, tax_cents, final_total_cents
+    FROM SalesDailySummary WHERE day = ?
+"""
+
+HOURLY_SUMMARY_QUERY = """
+    SELECT hour, sale_count, final_total_cents
+    FROM SalesHourlySummary WHERE day = ? ORDER BY hour
+"""
+
+CASHIER_SUMMARY_QUERY = """
+    SELECT c.user_id, u.username, c.sale_count, c.final_total_cents
+    FROM SalesCashierSummary c
+    LEFT JOIN Users u ON u.id = c.user_id
+    WHERE c.day = ? ORDER BY c.final_total_cents DESC
+"""
+
+PAYMENT_SUMMARY_QUERY = """
+    SELECT payment_method, sale_count, final_total_cents
+    FROM SalesPaymentSummary WHERE day = ? ORDER BY final_total_cents DESC
+"""
+
+PRODUCT_SUMMARY_QUERY = """
+    SELECT s.product_id, p.name, s.quantity, s.revenue_cents
+    FROM SalesProductSummary s
+    LEFT JOIN Products p ON p.id = s.product_id
+    WHERE s.day = ? ORDER BY s.revenue_cents DESC
+"""
+
+CATEGORY_SUMMARY_QUERY = """
+    SELECT s.category_id, c.name, s.quantity, s.revenue_cents
+    FROM SalesCategorySummary s
+    LEFT JOIN Categories c ON c.id = s.category_id
+    WHERE s.day = ? ORDER BY s.revenue_cents DESC
+"""
+
+Z_REPORT_QUERY = """
+    SELECT id, closed_by, closed_at, sale_count, total_cents, discount_cents, tax_cents,
+           final_total_cents, details
+    FROM ZReports WHERE day = ?
+"""
+
+LAST_SALE_QUERY = "SELECT COALESCE(MAX(id), 0) FROM Sales"
+
+CLOSE_DAY = """
+    INSERT INTO ZReports (day, sale_count, total_cents, discount_cents, tax_cents, final_total_cents,
+                          last_sale_id, details, closed_by)
+    VALUES (:day, :sale_count, :total_cents, :discount_cents, :tax_cents, :final_total_cents,
+            :last_sale_id, :details, :closed_by)
+    ON CONFLICT(day) DO NOTHING
+"""
+
+# Parts of a report frozen in ZReports.details when the day is closed
+BREAKDOWNS = ('hours', 'cashiers', 'payments', 'products', 'categories')
+TOTALS = ('sale_count', 'total_cents', 'discount_cents', 'tax_cents', 'final_total_cents')
+
+
+class SalesSummary:
+    """Day-end reports read from the summary tables of migration 009.
+
+    Triggers add every sale to the per-day summaries as it is inserted, so
+    a report reads a few rows for its day, whatever the size of the sales
+    history. rebuild() recomputes the summaries from scratch.
+
+    Closing a day (z_report) freezes its report in ZReports; a sale made
+    on that day afterwards counts in the next open day.
+    """
+
+    @staticmethod
+    def today():
+        # Same clock as the created_at written at the till
+        return datetime.now().strftime("%Y-%m-%d")
+
+    @staticmethod
+    def rebuild():
+        """Recompute every summary table from Sales and SaleItems"""
+        try:
+            with DatabaseManager.session(immediate=True) as conn:
+                for statement in SUMMARY_REBUILD:
+                    conn.execute(statement)
+            return True
+        except Exception as e:
+            print(f"Error rebuilding sales summaries: {e}")
+            return False
+
+    @staticmethod
+    def _summary(conn, day):
+        """The report of a day as the summary tables have it now"""
+        totals = conn.execute(DAILY_SUMMARY_QUERY, (day,)).fetchone()
+        report = dict(zip(TOTALS, totals if totals else (0, 0, 0, 0, 0)))
+        report.update({
+            'day': day,
+            'hours': [tuple(row) for row in conn.execute(HOURLY_SUMMARY_QUERY, (day,))],
+            'cashiers': [tuple(row) for row in conn.execute(CASHIER_SUMMARY_QUERY, (day,))],
+            'payments': [tuple(row) for row in conn.execute(PAYMENT_SUMMARY_QUERY, (day,))],
+            'products': [tuple(row) for row in conn.execute(PRODUCT_SUMMARY_QUERY, (day,))],
+            'categories': [tuple(row) for row in conn.execute(CATEGORY_SUMMARY_QUERY, (day,))],
+            'z_number': None,
+            'closed_at': None,
+        })
+        return report
+
+    @staticmethod
+    def report(day=None):
+        """Totals for a day with their breakdown by hour, cashier, payment method,
+        product and category; amounts in cents. None on error.
+
+        A closed day is reported as its Z froze it.
+        """
+        day = day or SalesSummary.today()
+        try:
+            with DatabaseManager.session() as conn:
+                report = SalesSummary._summary(conn, day)
+                closed = conn.execute(Z_REPORT_QUERY, (day,)).fetchone()
+                if closed:
+                    report['z_number'] = closed['id']
+                    report['closed_at'] = closed['closed_at']
+                    # Z reports taken before the totals and breakdown were
+                    # stored keep their count and final total only
+                    for key in TOTALS:
+                        if closed[key] is not None:
+                            report[key] = closed[key]
+                    if closed['details']:
+                        details = json.loads(closed['details'])
+                        for key in BREAKDOWNS:
+                            report[key] = [tuple(row) for row in details[key]]
+                return report
+        except Exception as e:
+            print(f"Error building sales report: {e}")
+            return None
+
+    @staticmethod
+    def x_report(day=None):
+        """Running totals for the day, without closing it (the Z once it is closed)"""
+        return SalesSummary.report(day)
+
+    @staticmethod
+    def z_report(day=None, user_id=None):
+        """Close the day and return its report, numbered in ZReports.
+
+        Closing is recorded once, with the report as it stands: asking again
+        for a closed day returns the same Z, e.g. to reprint it.
+        """
+        day = day or SalesSummary.today()
+        try:
+            with DatabaseManager.session(immediate=True) as conn:
+                if conn.execute(Z_REPORT_QUERY, (day,)).fetchone() is None:
+                    report = SalesSummary._summary(conn, day)
+                    conn.execute(CLOSE_DAY, {
+                        **{key: report[key] for key in TOTALS},
+                        'day': day,
+                        # Every sale so far is in this report or an earlier one
+                        'last_sale_id': conn.execute(LAST_SALE_QUERY).fetchone()[0],
+                        'details': json.dumps({key: report[key] for key in BREAKDOWNS}, ensure_ascii=False),
+                        'closed_by': user_id,
+                    })
+        except Exception as e:
+            print(f"Error closing the day: {e}")
+            return None
+        return SalesSummary.report(day)
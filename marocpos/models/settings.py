@@ -1,50 +1,34 @@
-from database import get_connection
+from database import DatabaseManager
 
 class SettingsManager:
     @staticmethod
     def get_all_settings():
-        conn = get_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT key, value, description FROM Settings")
-                return cursor.fetchall()
-            finally:
-                conn.close()
-        return []
+        with DatabaseManager.session() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT key, value, description FROM Settings")
+            return cursor.fetchall()
 
     @staticmethod
     def update_setting(key, value):
-        conn = get_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE Settings 
-                    SET value = ?, updated_at = CURRENT_TIMESTAMP 
-                    WHERE key = ?
-                """, (value, key))
-                conn.commit()
-                return True
-            finally:
-                conn.close()
-        return False
+        with DatabaseManager.session() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE Settings 
+                SET value = ?, updated_at = CURRENT_TIMESTAMP 
+                WHERE key = ?
+            """, (value, key))
+            return True
 
     @staticmethod
     def get_receipt_settings():
-        conn = get_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT value 
-                    FROM Settings 
-                    WHERE key IN (
-                        'store_name', 'store_address', 'store_phone',
-                        'store_email', 'receipt_footer', 'receipt_logo'
-                    )
-                """)
-                return dict(cursor.fetchall())
-            finally:
-                conn.close()
-        return {}
\ No newline at end of file
+        with DatabaseManager.session() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT value 
+                FROM Settings 
+                WHERE key IN (
+                    'store_name', 'store_address', 'store_phone',
+                    'store_email', 'receipt_footer', 'receipt_logo'
+                )
+            """)
+            return dict(cursor.fetchall())
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""Stock ledger: StockMovements is the record of every stock change.
+
+A movement applies itself to Products.stock or ProductVariants.stock when
+it is inserted (see migration 012), so the counters are a cache of the
+ledger. Balances are snapshotted per item in StockSnapshots up to a
+checkpoint movement; an item's balance is its snapshot plus the movements
+after the checkpoint, which makes reconciling cost the number of changes
+since the last snapshot, not the length of the history.
+"""
+from database import DatabaseManager
+
+INSERT_MOVEMENT = """
+    INSERT INTO StockMovements (
+        product_id, variant_id, movement_type,
+        quantity, unit_price, reference,
+        notes, user_id, created_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+"""
+
+PRODUCT_STOCK = "SELECT COALESCE(stock, 0) FROM Products WHERE id = ?"
+VARIANT_STOCK = "SELECT COALESCE(stock, 0) FROM ProductVariants WHERE id = ?"
+
+CHECKPOINT_QUERY = "SELECT last_movement_id, taken_at FROM StockLedgerCheckpoint WHERE id = 1"
+LAST_MOVEMENT_QUERY = "SELECT COALESCE(MAX(id), 0) FROM StockMovements"
+
+# Ledger balance and counter of every item that moved in (?, ?]: the items
+# whose counter changed plus those with movements after the checkpoint
+RECONCILE_QUERY = """
+    WITH tail AS (
+        SELECT product_id, COALESCE(variant_id, 0) AS variant_id, SUM(quantity) AS quantity
+        FROM StockMovements
+        WHERE id > ? AND id <= ? AND product_id IS NOT NULL
+        GROUP BY product_id, COALESCE(variant_id, 0)
+    ),
+    items AS (
+        SELECT product_id, variant_id FROM StockChanges
+        UNION
+        SELECT product_id, variant_id FROM tail
+    )
+    SELECT i.product_id, i.variant_id,
+           COALESCE(s.stock, 0) + COALESCE(t.quantity, 0),
+           CASE WHEN i.variant_id = 0 THEN COALESCE(p.stock, 0) ELSE COALESCE(v.stock, 0) END,
+           CASE WHEN i.variant_id = 0 THEN p.id ELSE v.id END
+    FROM items i
+    LEFT JOIN StockSnapshots s ON s.product_id = i.product_id AND s.variant_id = i.variant_id
+    LEFT JOIN tail t ON t.product_id = i.product_id AND t.variant_id = i.variant_id
+    LEFT JOIN Products p ON p.id = i.product_id
+    LEFT JOIN ProductVariants v ON v.id = i.variant_id
+"""
+
+SAVE_SNAPSHOT = """
+    INSERT INTO StockSnapshots (product_id, variant_id, stock, taken_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(product_id, variant_id) DO UPDATE SET
+        stock = excluded.stock,
+        taken_at = excluded.taken_at
+"""
+
+CLEAR_CHANGE = "DELETE FROM StockChanges WHERE product_id = ? AND variant_id = ?"
+SAVE_CHECKPOINT = """
+    UPDATE StockLedgerCheckpoint SET last_movement_id = ?, taken_at = CURRENT_TIMESTAMP WHERE id = 1
+"""
+
+
+def record_movement(cursor, product_id, variant_id, movement_type, quantity,
+                    unit_price=None, reference=None, notes=None, user_id=None):
+    """Insert a movement (quantity signed: + in, - out) with cursor; return its id"""
+    cursor.execute(INSERT_MOVEMENT, (
+        product_id, variant_id or None, movement_type,
+        quantity, unit_price, reference,
+        notes, user_id
+    ))
+    return cursor.lastrowid
+
+
+def set_stock(cursor, product_id, variant_id, stock, reference=None, notes=None, user_id=None):
+    """Bring an item's stock to stock with an 'adjustment' of the difference.
+
+    Returns the movement id, or None if the stock was already right.
+    """
+    if variant_id:
+        row = cursor.execute(VARIANT_STOCK, (variant_id,)).fetchone()
+    else:
+        row = cursor.execute(PRODUCT_STOCK, (product_id,)).fetchone()
+    difference = (stock or 0) - (row[0] if row else 0)
+    if not difference:
+        return None
+    return record_movement(cursor, product_id, variant_id, 'adjustment', difference,
+                           reference=reference, notes=notes, user_id=user_id)
+
+
+def _reconcile_rows(cursor):
+    """(checkpoint, last movement id, [(product_id, variant_id, ledger, counter)]) of the items that moved"""
+    checkpoint = cursor.execute(CHECKPOINT_QUERY).fetchone()[0]
+    last_movement_id = cursor.execute(LAST_MOVEMENT_QUERY).fetchone()[0]
+    rows = cursor.execute(RECONCILE_QUERY, (checkpoint, last_movement_id)).fetchall()
+    # Items deleted since are gone from the counters: nothing to check
+    items = [(row[0], row[1], row[2], row[3]) for row in rows if row[4] is not None]
+    return checkpoint, last_movement_id, items
+
+
+class StockLedger:
+    """Snapshots and reconciliation of the stock counters against StockMovements."""
+
+    @staticmethod
+    def reconcile(fix=False):
+        """Items whose counter disagrees with the ledger, as dicts with
+        product_id, variant_id (None for the product itself), ledger and counter.
+
+        Only the items that moved since the last snapshot are checked. With
+        fix, their counters are reset to the ledger balance. None on error.
+        """
+        try:
+            with DatabaseManager.session(immediate=fix) as conn:
+                cursor = conn.cursor()
+                _, _, items = _reconcile_rows(cursor)
+                mismatches = [item for item in items if item[2] != item[3]]
+                if fix:
+                    cursor.executemany("UPDATE Products SET stock = ? WHERE id = ?",
+                                       [(ledger, product_id) for product_id, variant_id, ledger, _ in mismatches
+                                        if not variant_id])
+                    cursor.executemany("UPDATE ProductVariants SET stock = ? WHERE id = ?",
+                                       [(ledger, variant_id) for _, variant_id, ledger, _ in mismatches
+                                        if variant_id])
+            return [{
+                'product_id': product_id,
+                'variant_id': variant_id or None,
+                'ledger': ledger,
+                'counter': counter,
+            } for product_id, variant_id, ledger, counter in mismatches]
+        except Exception as e:
+            print(f"Error reconciling stock: {e}")
+            return None
+
+    @staticmethod
+    def snapshot():
+        """Fold the movements since the last snapshot into StockSnapshots.
+
+        Returns (items snapshotted, mismatches left). Items whose counter
+        disagrees with the ledger stay in StockChanges, so the next
+        reconcile still reports them. None on error.
+        """
+        try:
+            with DatabaseManager.session(immediate=True) as conn:
+                cursor = conn.cursor()
+                _, last_movement_id, items = _reconcile_rows(cursor)
+                cursor.executemany(SAVE_SNAPSHOT, [
+                    (product_id, variant_id, ledger) for product_id, variant_id, ledger, _ in items
+                ])
+                cursor.executemany(CLEAR_CHANGE, [
+                    (product_id, variant_id) for product_id, variant_id, ledger, counter in items
+                    if ledger == counter
+                ])
+                cursor.execute(SAVE_CHECKPOINT, (last_movement_id,))
+                return len(items), sum(1 for item in items if item[2] != item[3])
+        except Exception as e:
+            print(f"Error taking stock snapshot: {e}")
+            return None
+
+    @staticmethod
+    def checkpoint():
+        """(last movement id in the snapshots, when they were taken)"""
+        try:
+            with DatabaseManager.session() as conn:
+                row = conn.execute(CHECKPOINT_QUERY).fetchone()
+                return row[0], row[1]
+        except Exception as e:
+            print(f"Error reading stock checkpoint: {e}")
+            return None
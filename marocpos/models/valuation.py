@@ -0,0 +1,273 @@
+"""Stock valuation from StockMovements: FIFO or weighted-average cost layers.
+
+Movements are consumed in id order. Incoming quantities add a cost layer
+at the movement's unit price; outgoing ones take their cost from the
+layers (oldest first for FIFO, at the running average otherwise) and the
+result is recorded in CostOfGoodsSold, per sale line for sales. The layers
+of every item are snapshotted in StockValuation together with the id of
+the last movement consumed, so an update only reads the movements added
+since; rebuild() starts over from the first one.
+"""
+from database import DatabaseManager
+from models.money import to_cents, line_cents
+import json
+
+FIFO = 'FIFO'
+AVERAGE = 'AVERAGE'
+# Names the valuation_method column and setting may hold for weighted average
+AVERAGE_METHODS = {'AVERAGE', 'AVG', 'CMUP', 'WAC', 'WEIGHTED_AVERAGE'}
+
+NEW_MOVEMENTS_QUERY = """
+    SELECT sm.id, sm.product_id, COALESCE(sm.variant_id, 0), sm.quantity,
+           sm.unit_price, sm.sale_item_id,
+           p.valuation_method, COALESCE(p.purchase_price_cents, 0)
+    FROM StockMovements sm
+    LEFT JOIN Products p ON p.id = sm.product_id
+    WHERE sm.id > ? AND sm.product_id IS NOT NULL
+    ORDER BY sm.id
+    LIMIT ?
+"""
+
+STATE_QUERY = """
+    SELECT method, layers FROM StockValuation WHERE product_id = ? AND variant_id = ?
+"""
+
+SAVE_STATE = """
+    INSERT INTO StockValuation (product_id, variant_id, method, quantity, value_cents, layers, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(product_id, variant_id) DO UPDATE SET
+        method = excluded.method,
+        quantity = excluded.quantity,
+        value_cents = excluded.value_cents,
+        layers = excluded.layers,
+        updated_at = excluded.updated_at
+"""
+
+INSERT_COGS = """
+    INSERT OR REPLACE INTO CostOfGoodsSold (movement_id, sale_item_id, product_id, variant_id, quantity, cost_cents)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+CHECKPOINT_QUERY = "SELECT last_movement_id, dirty FROM ValuationCheckpoint WHERE id = 1"
+SAVE_CHECKPOINT = "UPDATE ValuationCheckpoint SET last_movement_id = ?, dirty = 0 WHERE id = 1"
+
+# Whether update() has anything to do: a plain read, no write lock
+PENDING_QUERY = """
+    SELECT c.dirty OR EXISTS (
+        SELECT 1 FROM StockMovements sm WHERE sm.id > c.last_movement_id AND sm.product_id IS NOT NULL
+    )
+    FROM ValuationCheckpoint c WHERE c.id = 1
+"""
+
+INVENTORY_VALUE_QUERY = "SELECT COALESCE(SUM(quantity), 0), COALESCE(SUM(value_cents), 0) FROM StockValuation"
+
+SALE_COGS_QUERY = """
+    SELECT si.id, si.product_id, si.variant_id, si.quantity,
+           COALESCE(si.subtotal_cents, 0), c.cost_cents
+    FROM SaleItems si
+    LEFT JOIN CostOfGoodsSold c ON c.sale_item_id = si.id
+    WHERE si.sale_id = ?
+"""
+
+DEFAULT_METHOD_QUERY = "SELECT value FROM Settings WHERE key = 'default_valuation_method'"
+
+
+def normalize_method(method, default=FIFO):
+    method = (method or default or FIFO).strip().upper()
+    return AVERAGE if method in AVERAGE_METHODS else FIFO
+
+
+class CostLayers:
+    """Quantities on hand and what they cost, for one product or variant.
+
+    layers is a list of [quantity, unit_cost_cents], oldest first; under
+    weighted average there is a single layer at the running average cost.
+    Stock that went negative is a layer with a negative quantity, which
+    the next receipts fill before adding layers of their own.
+    """
+
+    def __init__(self, method, layers=None):
+        self.method = method
+        self.layers = layers or []
+
+    @property
+    def quantity(self):
+        return sum(quantity for quantity, _ in self.layers)
+
+    @property
+    def value_cents(self):
+        return sum(line_cents(cost, quantity) for quantity, cost in self.layers)
+
+    def last_cost(self):
+        return self.layers[-1][1] if self.layers else None
+
+    def receive(self, quantity, unit_cost_cents):
+        # Fill a deficit first: those units were already sold and costed
+        while quantity > 0 and self.layers and self.layers[0][0] < 0:
+            filled = min(quantity, -self.layers[0][0])
+            self.layers[0][0] += filled
+            quantity -= filled
+            if self.layers[0][0] == 0:
+                self.layers.pop(0)
+        if quantity <= 0:
+            return
+        if self.method == AVERAGE and self.layers:
+            held, cost = self.layers[0]
+            total = held + quantity
+            average = (line_cents(cost, held) + line_cents(unit_cost_cents, quantity)) / total
+            self.layers = [[total, round(average)]]
+        else:
+            self.layers.append([quantity, unit_cost_cents])
+
+    def issue(self, quantity, fallback_cost_cents):
+        """Take quantity out; return its cost in cents"""
+        cost = 0
+        last_cost = self.last_cost()
+        while quantity > 0 and self.layers and self.layers[0][0] > 0:
+            last_cost = self.layers[0][1]
+            taken = min(quantity, self.layers[0][0])
+            cost += line_cents(self.layers[0][1], taken)
+            self.layers[0][0] -= taken
+            quantity -= taken
+            if self.layers[0][0] == 0:
+                self.layers.pop(0)
+        if quantity > 0:
+            # More out than in: cost the shortfall at the last known cost
+            unit_cost = fallback_cost_cents if last_cost is None else last_cost
+            cost += line_cents(unit_cost, quantity)
+            if self.layers and self.layers[0][0] < 0:
+                self.layers[0][0] -= quantity
+            else:
+                self.layers.insert(0, [-quantity, unit_cost])
+        return cost
+
+
+class StockValuation:
+    """Runs the valuation engine and answers inventory value and COGS questions."""
+
+    BATCH_SIZE = 5000
+
+    @staticmethod
+    def update():
+        """Consume the movements added since the last update; return how many.
+
+        Replays everything instead if the history was rewritten since (see
+        migration 011). None on error. Only takes the write lock when there
+        are movements to consume, so reports don't queue behind checkouts.
+        """
+        try:
+            with DatabaseManager.session() as conn:
+                pending = conn.execute(PENDING_QUERY).fetchone()
+            if not (pending and pending[0]):
+                return 0
+            with DatabaseManager.session(immediate=True) as conn:
+                cursor = conn.cursor()
+                last_movement_id, dirty = cursor.execute(CHECKPOINT_QUERY).fetchone()
+                if dirty:
+                    cursor.execute("DELETE FROM StockValuation")
+                    cursor.execute("DELETE FROM CostOfGoodsSold")
+                    last_movement_id = 0
+                row = cursor.execute(DEFAULT_METHOD_QUERY).fetchone()
+                default_method = row[0] if row else FIFO
+
+                states = {}
+                consumed = 0
+                while True:
+                    movements = cursor.execute(NEW_MOVEMENTS_QUERY, (last_movement_id, StockValuation.BATCH_SIZE)).fetchall()
+                    if not movements:
+                        break
+                    cogs = []
+                    for (movement_id, product_id, variant_id, quantity, unit_price,
+                         sale_item_id, method, purchase_price_cents) in movements:
+                        key = (product_id, variant_id)
+                        state = states.get(key)
+                        if state is None:
+                            saved = cursor.execute(STATE_QUERY, key).fetchone()
+                            if saved:
+                                state = CostLayers(saved[0], json.loads(saved[1]))
+                            else:
+                                state = CostLayers(normalize_method(method, default_method))
+                            states[key] = state
+
+                        quantity = quantity or 0
+                        if quantity > 0:
+                            # A receipt without a price comes in at the current cost
+                            unit_cost = to_cents(unit_price) if unit_price else None
+                            if unit_cost is None:
+                                unit_cost = state.last_cost() or purchase_price_cents
+                            state.receive(quantity, unit_cost)
+                        elif quantity < 0:
+                            cost = state.issue(-quantity, purchase_price_cents)
+                            cogs.append((movement_id, sale_item_id, product_id, variant_id or None, -quantity, cost))
+                        last_movement_id = movement_id
+                    cursor.executemany(INSERT_COGS, cogs)
+                    consumed += len(movements)
+
+                cursor.executemany(SAVE_STATE, [
+                    (product_id, variant_id, state.method, state.quantity, state.value_cents, json.dumps(state.layers))
+                    for (product_id, variant_id), state in states.items()
+                ])
+                cursor.execute(SAVE_CHECKPOINT, (last_movement_id,))
+                return consumed
+        except Exception as e:
+            print(f"Error updating stock valuation: {e}")
+            return None
+
+    @staticmethod
+    def rebuild():
+        """Value the whole movement history from scratch"""
+        try:
+            with DatabaseManager.session() as conn:
+                conn.execute("UPDATE ValuationCheckpoint SET dirty = 1 WHERE id = 1")
+        except Exception as e:
+            print(f"Error resetting stock valuation: {e}")
+            return None
+        return StockValuation.update()
+
+    @staticmethod
+    def inventory_value():
+        """(quantity on hand, value in cents) over every item, after bringing the valuation up to date"""
+        StockValuation.update()
+        try:
+            with DatabaseManager.session() as conn:
+                quantity, value = conn.execute(INVENTORY_VALUE_QUERY).fetchone()
+                return quantity, value
+        except Exception as e:
+            print(f"Error reading inventory value: {e}")
+            return None
+
+    @staticmethod
+    def item_value(product_id, variant_id=None):
+        """{'method', 'quantity', 'value_cents', 'layers'} for one product or variant"""
+        StockValuation.update()
+        try:
+            with DatabaseManager.session() as conn:
+                row = conn.execute("""
+                    SELECT method, quantity, value_cents, layers FROM StockValuation
+                    WHERE product_id = ? AND variant_id = ?
+                """, (product_id, variant_id or 0)).fetchone()
+            if row is None:
+                return {'method': None, 'quantity': 0, 'value_cents': 0, 'layers': []}
+            return {'method': row[0], 'quantity': row[1], 'value_cents': row[2], 'layers': json.loads(row[3])}
+        except Exception as e:
+            print(f"Error reading item valuation: {e}")
+            return None
+
+    @staticmethod
+    def sale_cogs(sale_id):
+        """[{sale_item_id, product_id, variant_id, quantity, revenue_cents, cost_cents}] for a sale's lines"""
+        StockValuation.update()
+        try:
+            with DatabaseManager.session() as conn:
+                rows = conn.execute(SALE_COGS_QUERY, (sale_id,)).fetchall()
+            return [{
+                'sale_item_id': row[0],
+                'product_id': row[1],
+                'variant_id': row[2],
+                'quantity': row[3],
+                'revenue_cents': row[4],
+                'cost_cents': row[5],
+            } for row in rows]
+        except Exception as e:
+            print(f"Error reading sale COGS: {e}")
+            return []
@@ -0,0 +1,178 @@
+"""Lazy generation and bulk insertion of product variants.
+
+Combinations of attribute values come out of itertools.product one at a
+time, so five attributes of ten values each never sit in memory as 100k
+dicts. They are written in executemany() batches of BATCH_SIZE. SKUs and
+barcodes are derived from the product: the SKU from the combination, the
+barcode from the variant's rank, so generating the same variants again
+gives the same codes and skips the existing ones instead of duplicating
+them.
+"""
+from migrations import refresh_product_search
+from models.stock_ledger import record_movement
+from datetime import datetime, UTC
+import itertools
+import json
+import math
+import re
+import unicodedata
+
+BATCH_SIZE = 1000
+
+# Barcodes starting with 2 are reserved for in-store numbering (GS1)
+IN_STORE_PREFIX = "2"
+
+INSERT_VARIANT = """
+    INSERT INTO ProductVariants (
+        product_id, name, barcode, unit_price,
+        purchase_price, stock, attribute_values, sku,
+        created_at, updated_at
+    ) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, ?)
+"""
+
+# SKUs of a product's variants, and the highest rank used in its generated barcodes
+EXISTING_SKUS_QUERY = "SELECT sku FROM ProductVariants WHERE product_id = ? AND sku IS NOT NULL"
+LAST_RANK_QUERY = """
+    SELECT MAX(CAST(substr(barcode, 8, 5) AS INTEGER))
+    FROM ProductVariants
+    WHERE product_id = ? AND barcode LIKE ? AND length(barcode) = 13
+"""
+
+
+def iter_variant_combinations(attributes_values):
+    """Yield {attribute: value} for every combination, in a stable order.
+
+    attributes_values maps each attribute name to its list of values, e.g.
+    {'Couleur': ['Rouge', 'Bleu'], 'Taille': ['S', 'M', 'L']}.
+    """
+    names = list(attributes_values)
+    if not names:
+        return
+    for values in itertools.product(*(attributes_values[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def count_variant_combinations(attributes_values):
+    """How many combinations iter_variant_combinations() yields, without generating them"""
+    if not attributes_values:
+        return 0
+    return math.prod(len(values) for values in attributes_values.values())
+
+
+def variant_name(combination):
+    return " / ".join(str(value) for value in combination.values())
+
+
+def sku_part(value):
+    """'Bleu clair' -> 'BLEUCLAIR': accents dropped, letters and digits only"""
+    text = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^A-Za-z0-9]', '', text).upper()
+
+
+def variant_sku(product_id, combination):
+    """P00042-ROUGE-M"""
+    return "-".join([f"P{product_id:05d}"] + [sku_part(value) for value in combination.values()])
+
+
+def ean13_check_digit(digits):
+    """Check digit of the 12 first digits of an EAN-13"""
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(digits))
+    return str((10 - total % 10) % 10)
+
+
+def variant_barcode(product_id, rank):
+    """In-store EAN-13 of a product's rank-th generated variant: 2, product id, rank, check digit.
+
+    None once the product id or the rank no longer fit (6 and 5 digits).
+    """
+    if product_id >= 10 ** 6 or rank >= 10 ** 5:
+        return None
+    digits = f"{IN_STORE_PREFIX}{product_id:06d}{rank:05d}"
+    return digits + ean13_check_digit(digits)
+
+
+def insert_variants(cursor, product_id, variants, unit_price=None, purchase_price=None,
+                    batch_size=BATCH_SIZE, progress=None):
+    """Insert variants for a product with cursor; return how many were written.
+
+    variants is any iterable of dicts with 'attributes' ({name: value}) or
+    'attribute_values' (the same as JSON), and optionally name, sku,
+    barcode, price, purchase_price and stock. Missing SKUs are derived from
+    the combination and missing barcodes number the new variants after the
+    product's last generated one. A variant whose SKU the product already
+    has is skipped. Variants with stock get an opening 'in' movement.
+    progress(done) is called after every batch with the count so far.
+    """
+    try:
+        # For Python 3.11+
+        current_time = datetime.now(UTC).strftime("%Y-%m-%d %H:%M:%S")
+    except AttributeError:
+        # For older Python versions
+        current_time = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+    skus = {row[0] for row in cursor.execute(EXISTING_SKUS_QUERY, (product_id,))}
+    last_rank = cursor.execute(LAST_RANK_QUERY, (product_id, f"{IN_STORE_PREFIX}{product_id:06d}%")).fetchone()[0]
+    rank = 0 if last_rank is None else last_rank + 1
+
+    # The search row is rebuilt once at the end, not for every variant
+    # (see migration 014); the flag is only ever seen inside this transaction
+    cursor.execute("INSERT OR IGNORE INTO ProductSearchDeferred (product_id) VALUES (?)", (product_id,))
+
+    written = 0
+    done = 0
+    batch = []
+    for variant in variants:
+        attributes = variant.get('attributes')
+        if attributes is None:
+            attributes = variant.get('attribute_values') or {}
+            if isinstance(attributes, str):
+                attributes = json.loads(attributes) if attributes.strip() else {}
+        done += 1
+        sku = variant.get('sku') or variant_sku(product_id, attributes)
+        if sku in skus:
+            continue
+        skus.add(sku)
+        barcode = variant.get('barcode')
+        if not barcode:
+            barcode = variant_barcode(product_id, rank)
+            rank += 1
+        price = variant.get('price') or unit_price
+        cost = variant.get('purchase_price', purchase_price)
+        row = (
+            product_id,
+            variant.get('name') or variant_name(attributes),
+            barcode,
+            price,
+            cost,
+            json.dumps(attributes),
+            sku,
+            current_time,
+            current_time,
+        )
+        if variant.get('stock'):
+            # Rare (only rows edited in the dialog): inserted alone for the movement
+            cursor.execute(INSERT_VARIANT, row)
+            written += 1
+            record_movement(cursor, product_id, cursor.lastrowid, 'in', variant['stock'],
+                            cost, "Stock initial")
+        else:
+            batch.append(row)
+        if len(batch) >= batch_size:
+            written += _flush(cursor, batch)
+            if progress:
+                progress(done)
+    written += _flush(cursor, batch)
+    cursor.execute("DELETE FROM ProductSearchDeferred WHERE product_id = ?", (product_id,))
+    refresh_product_search(cursor, product_id)
+    if progress:
+        progress(done)
+    return written
+
+
+def _flush(cursor, batch):
+    if not batch:
+        return 0
+    cursor.executemany(INSERT_VARIANT, batch)
+    written = len(batch)
+    del batch[:]
+    return written
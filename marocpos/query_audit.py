@@ -0,0 +1,231 @@
+"""Audit the query plans of every SQL statement found in the models.
+
+Each string literal that looks like SQL is run through EXPLAIN QUERY PLAN
+against a scratch database built by the migrations (or against --db), and
+any full table scan is flagged. Statements that are meant to read a whole
+table are listed in EXPECTED_SCANS.
+
+    python query_audit.py [paths...] [--db pos7.db] [--verbose]
+"""
+import argparse
+import ast
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+from database import DatabaseManager
+
+SQL_START = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+# Staging tables the statements need, created on the audit connection first
+TEMP_TABLE = re.compile(r"^\s*CREATE\s+TEMP(ORARY)?\s+TABLE\b", re.IGNORECASE)
+
+# "Class.method" (or module-level name) -> why a full scan is acceptable there
+EXPECTED_SCANS = {
+    'Product.get_all_products': "lists the whole catalogue",
+    'Product.cleanup_database': "maintenance pass over every product",
+    'ALL_PRODUCTS_QUERY': "lists the whole catalogue",
+    '_PRODUCTS_FOR_SALE_SELECT': "base of the sale grid queries",
+    'PRODUCTS_FOR_SALE_QUERY': "lists the whole catalogue",
+    'BARCODES_QUERY': "loads the in-memory barcode index",
+    'Catalog._load': "loads the in-memory catalogue",
+    'Catalog._load_stock': "refreshes every cached stock level",
+    'Category.get_all_categories': "small table, listed in full",
+    'Category.clear_all_categories': "updates every product by design",
+    'ProductAttribute.get_all_attributes': "small table, listed in full",
+    'User.get_all_users': "small table, listed in full",
+    'Store.get_all_stores': "small table, listed in full",
+    'SettingsManager.get_all_settings': "small table, listed in full",
+    'ReceiptPrinter.load_settings': "small table, listed in full",
+    'PRODUCT_STOCK_QUERY': "stock of every product, for sell-through",
+    'User.delete_user': "counts active users in a small table",
+    'INVENTORY_VALUE_QUERY': "totals the value of every stocked item",
+    'RECONCILE_QUERY': "walks the items changed since the last snapshot",
+    'INSERT_PARENTS': "walks the import batch staging table",
+    'RESOLVE_PRODUCTS': "walks the import batch staging table",
+    'INSERT_VARIANTS': "walks the import batch staging table",
+    'RESOLVE_VARIANTS': "walks the import batch staging table",
+    'INSERT_STOCK_MOVEMENTS': "walks the import batch staging table",
+    'CatalogImport._write_rows': "walks the import batch staging table",
+    'BATCH_IDS': "walks the ids of one batch",
+    'BATCH_PRICES': "walks the ids of one batch",
+    'PRODUCT_MOVEMENTS': "walks the ids of one batch",
+    'VARIANT_MOVEMENTS': "walks the ids of one batch",
+    'HISTORY_QUERY': "latest operations, newest id first",
+    'BulkOperations.get_suppliers': "small table, listed in full",
+    'PRODUCTS_QUERY': "exports the whole catalogue",
+}
+
+
+class SQLCollector(ast.NodeVisitor):
+    """Collect SQL string literals together with the function that owns them."""
+
+    def __init__(self, path):
+        self.path = path
+        self.scope = []
+        self.statements = []
+        self.dynamic = []
+        self.temp_tables = []
+        self.constants = {}
+
+    def _owner(self):
+        return ".".join(self.scope) or "<module>"
+
+    def visit_ClassDef(self, node):
+        self.scope.append(node.name)
+        self.generic_visit(node)
+        self.scope.pop()
+
+    def visit_FunctionDef(self, node):
+        self.scope.append(node.name)
+        self.generic_visit(node)
+        self.scope.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Expr(self, node):
+        # Docstrings and other bare string statements are never executed
+        if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            return
+        self.generic_visit(node)
+
+    def visit_Assign(self, node):
+        # Module-level query constants are reported under their own name and
+        # may be built from each other, e.g. BASE_SELECT + " ORDER BY name"
+        if self.scope or len(node.targets) != 1 or not isinstance(node.targets[0], ast.Name):
+            self.generic_visit(node)
+            return
+        name = node.targets[0].id
+        value = self._resolve(node.value)
+        if isinstance(value, str):
+            self.constants[name] = value
+            if SQL_START.match(value):
+                self.statements.append((self.path, node.lineno, name, value))
+            elif TEMP_TABLE.match(value):
+                self.temp_tables.append(value)
+            return
+        self.scope.append(name)
+        self.generic_visit(node)
+        self.scope.pop()
+
+    def _resolve(self, node):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            return self.constants.get(node.id)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            left, right = self._resolve(node.left), self._resolve(node.right)
+            if isinstance(left, str) and isinstance(right, str):
+                return left + right
+        return None
+
+    def visit_JoinedStr(self, node):
+        text = "".join(v.value for v in node.values if isinstance(v, ast.Constant) and isinstance(v.value, str))
+        if SQL_START.match(text):
+            self.dynamic.append((self.path, node.lineno, self._owner()))
+        # Don't descend: the literal parts of an f-string aren't standalone SQL
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, str) and SQL_START.match(node.value):
+            self.statements.append((self.path, node.lineno, self._owner(), node.value))
+
+
+def collect(paths):
+    statements, dynamic, temp_tables = [], [], []
+    for root in paths:
+        files = [root] if root.endswith(".py") else [
+            os.path.join(dirpath, name)
+            for dirpath, _, names in os.walk(root)
+            for name in sorted(names) if name.endswith(".py")
+        ]
+        for path in files:
+            with open(path, encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=path)
+            collector = SQLCollector(path)
+            collector.visit(tree)
+            statements.extend(collector.statements)
+            dynamic.extend(collector.dynamic)
+            temp_tables.extend(collector.temp_tables)
+    return statements, dynamic, temp_tables
+
+
+BINDINGS = re.compile(r"uses (\d+), and there are 0 supplied")
+
+
+def explain(conn, sql):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement.
+
+    Placeholders are bound to NULL: the plan only depends on the shape of
+    the statement, not on the values.
+    """
+    try:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    except sqlite3.ProgrammingError as e:
+        match = BINDINGS.search(str(e))
+        if not match:
+            raise
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql, (None,) * int(match.group(1))).fetchall()
+    return [row[3] for row in rows]
+
+
+def is_table_scan(detail):
+    # "SCAN Products" is a full table scan; "SCAN p USING COVERING INDEX ..."
+    # is not, nor is a virtual table answering a constraint ("INDEX 0:M4"
+    # is an FTS5 MATCH)
+    if " VIRTUAL TABLE INDEX " in detail:
+        return not detail.rsplit(":", 1)[-1]
+    return detail.startswith("SCAN ") and " USING " not in detail
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", default=["models"])
+    parser.add_argument("--db", help="audit against this database instead of a fresh migrated one")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    if args.db:
+        DatabaseManager.DB_PATH = args.db
+    else:
+        DatabaseManager.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="pos_audit_"), "audit.db")
+    # Imported here so migrations run against the selected database
+    from migrations import apply_migrations
+    apply_migrations()
+
+    statements, dynamic, temp_tables = collect(args.paths)
+    conn = DatabaseManager.pooled_connection()
+    for sql in temp_tables:
+        conn.execute(sql)
+
+    flagged = 0
+    for path, line, owner, sql in statements:
+        location = f"{path}:{line} ({owner})"
+        try:
+            plan = explain(conn, sql)
+        except (sqlite3.Error, sqlite3.Warning) as e:
+            print(f"⚠️  {location}: cannot explain: {e}")
+            continue
+
+        scans = [detail for detail in plan if is_table_scan(detail)]
+        if scans and owner not in EXPECTED_SCANS:
+            flagged += 1
+            print(f"❌ {location}: {'; '.join(scans)}")
+        elif scans:
+            print(f"ℹ️  {location}: {'; '.join(scans)} (attendu: {EXPECTED_SCANS[owner]})")
+        elif args.verbose:
+            print(f"✅ {location}")
+
+        if args.verbose:
+            for detail in plan:
+                print(f"      {detail}")
+
+    for path, line, owner in dynamic:
+        print(f"⏭️  {path}:{line} ({owner}): SQL dynamique (f-string), non audité")
+
+    print(f"\n{len(statements)} requêtes analysées, {flagged} parcours complets de table signalés.")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Day-end sales reports from the summary tables.
+
+    python reports.py x [--day 2024-05-01]            running totals (X-report)
+    python reports.py z [--day 2024-05-01] [--user 1]  close the day (Z-report)
+    python reports.py rebuild                         recompute the summaries
+    python reports.py valuation [--full]              inventory value (FIFO / average cost)
+    python reports.py stock [--snapshot] [--fix]      check stock counters against the ledger
+    [--db pos7.db]
+"""
+import argparse
+import sys
+
+from database import DatabaseManager
+from migrations import apply_migrations
+from models.money import format_money
+from models.sales_summary import SalesSummary
+from models.stock_ledger import StockLedger
+from models.valuation import StockValuation
+
+
+def print_report(report, title):
+    print(f"===== {title} — {report['day']} =====")
+    if report['z_number'] is not None:
+        print(f"Z n° {report['z_number']}, clôturé le {report['closed_at']}")
+    print(f"Ventes        : {report['sale_count']}")
+    print(f"Sous-total    : {format_money(report['total_cents'])}")
+    print(f"Remises       : {format_money(report['discount_cents'])}")
+    print(f"TVA           : {format_money(report['tax_cents'])}")
+    print(f"Total         : {format_money(report['final_total_cents'])}")
+
+    print("\nPar mode de paiement")
+    for method, count, cents in report['payments']:
+        print(f"  {method:<20} {count:>6}  {format_money(cents):>16}")
+    print("\nPar caissier")
+    for user_id, username, count, cents in report['cashiers']:
+        print(f"  {username or f'#{user_id}':<20} {count:>6}  {format_money(cents):>16}")
+    print("\nPar heure")
+    for hour, count, cents in report['hours']:
+        print(f"  {hour:02d}h{'':<17} {count:>6}  {format_money(cents):>16}")
+    print("\nPar catégorie")
+    for category_id, name, quantity, cents in report['categories']:
+        print(f"  {name or 'Sans catégorie':<20} {quantity:>6g}  {format_money(cents):>16}")
+    print("\nPar produit")
+    for product_id, name, quantity, cents in report['products']:
+        print(f"  {name or f'#{product_id}':<20} {quantity:>6g}  {format_money(cents):>16}")
+
+
+def reconcile_stock(fix, snapshot):
+    checkpoint = StockLedger.checkpoint()
+    mismatches = StockLedger.reconcile(fix)
+    if checkpoint is None or mismatches is None:
+        return 1
+    print(f"Dernier instantané : mouvement #{checkpoint[0]} ({checkpoint[1]})")
+    for item in mismatches:
+        variant = f" / variante #{item['variant_id']}" if item['variant_id'] else ""
+        print(f"  Produit #{item['product_id']}{variant} : compteur {item['counter']:g}, "
+              f"mouvements {item['ledger']:g}")
+    if not mismatches:
+        print("✅ Compteurs de stock conformes aux mouvements.")
+    elif fix:
+        print(f"✅ {len(mismatches)} compteur(s) corrigé(s).")
+    else:
+        print(f"❌ {len(mismatches)} écart(s) de stock.")
+    if snapshot:
+        result = StockLedger.snapshot()
+        if result is None:
+            return 1
+        print(f"Instantané : {result[0]} article(s) mis à jour.")
+    return 0 if fix or not mismatches else 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rapports de ventes (X, Z) et reconstruction des résumés")
+    parser.add_argument("command", choices=["x", "z", "rebuild", "valuation", "stock"])
+    parser.add_argument("--day", help="jour au format AAAA-MM-JJ (défaut : aujourd'hui)")
+    parser.add_argument("--user", type=int, help="utilisateur qui clôture la journée (Z)")
+    parser.add_argument("--full", action="store_true", help="revaloriser tout l'historique des mouvements")
+    parser.add_argument("--snapshot", action="store_true", help="enregistrer les soldes de stock après contrôle")
+    parser.add_argument("--fix", action="store_true", help="remettre les compteurs de stock au solde des mouvements")
+    parser.add_argument("--db", default=DatabaseManager.DB_PATH)
+    args = parser.parse_args()
+
+    DatabaseManager.DB_PATH = args.db
+    apply_migrations()
+
+    if args.command == "rebuild":
+        if not SalesSummary.rebuild():
+            return 1
+        print("✅ Résumés des ventes reconstruits.")
+        return 0
+
+    if args.command == "valuation":
+        consumed = StockValuation.rebuild() if args.full else StockValuation.update()
+        if consumed is None:
+            return 1
+        quantity, value_cents = StockValuation.inventory_value()
+        print(f"Mouvements valorisés : {consumed}")
+        print(f"Quantité en stock    : {quantity:g}")
+        print(f"Valeur du stock      : {format_money(value_cents)}")
+        return 0
+
+    if args.command == "stock":
+        return reconcile_stock(args.fix, args.snapshot)
+
+    if args.command == "z":
+        report = SalesSummary.z_report(args.day, args.user)
+        # Closing the day is also when stock balances are snapshotted
+        if report is not None:
+            StockLedger.snapshot()
+    else:
+        report = SalesSummary.x_report(args.day)
+    if report is None:
+        return 1
+    print_report(report, "Rapport Z" if args.command == "z" else "Rapport X")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -249,7 +249,7 @@ class AddProductDialog(QDialog):
                 
                 # Update variant count label
                 if self.variants_data:
-                    self.variant_count_label.setText(f"{len(self.variants_data)} variantes configurées")
+                    self.variant_count_label.setText(f"{dialog.variant_count()} variantes configurées")
                     self.variant_count_label.setStyleSheet("color: green; font-weight: bold;")
                 else:
                     self.variant_count_label.setText("Aucune variante configurée")
@@ -0,0 +1,250 @@
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QLineEdit,
+    QPushButton, QComboBox, QSpinBox, QDoubleSpinBox, QGroupBox,
+    QTabWidget, QWidget, QTableWidget, QTableWidgetItem, QHeaderView,
+    QMessageBox, QProgressDialog, QApplication, QAbstractItemView
+)
+from PyQt5.QtCore import Qt
+from models.bulk_operations import BulkOperations, PRICE_FIELDS
+from models.category import Category
+from models.product_attribute import ProductAttribute
+
+
+class BulkUpdateDialog(QDialog):
+    """Change the prices or the stock of a filtered set of products at once, and undo past changes.
+
+    changed is True once something was applied or undone, so the caller
+    knows to reload its list.
+    """
+
+    PRICE_MODES = [("Pourcentage (%)", 'percent'), ("Montant (+/-)", 'amount'), ("Nouveau prix", 'set')]
+    STOCK_MODES = [("Fixer le stock à", 'set'), ("Ajouter au stock (+/-)", 'add')]
+
+    def __init__(self, parent=None, user_id=None):
+        super().__init__(parent)
+        self.user_id = user_id
+        self.changed = False
+        self.init_ui()
+        self.load_filters()
+        self.load_history()
+
+    def init_ui(self):
+        self.setWindowTitle("Modifications groupées")
+        self.setMinimumSize(700, 600)
+        main_layout = QVBoxLayout(self)
+
+        # Which products
+        filters_group = QGroupBox("Produits concernés")
+        filters_layout = QFormLayout(filters_group)
+        self.category_combo = QComboBox()
+        self.supplier_combo = QComboBox()
+        self.attribute_combo = QComboBox()
+        self.value_combo = QComboBox()
+        attribute_layout = QHBoxLayout()
+        attribute_layout.addWidget(self.attribute_combo)
+        attribute_layout.addWidget(self.value_combo)
+        filters_layout.addRow("Catégorie:", self.category_combo)
+        filters_layout.addRow("Fournisseur:", self.supplier_combo)
+        filters_layout.addRow("Attribut:", attribute_layout)
+        self.preview_label = QLabel()
+        self.preview_label.setStyleSheet("font-weight: bold;")
+        filters_layout.addRow(self.preview_label)
+        main_layout.addWidget(filters_group)
+
+        # What to change
+        tabs = QTabWidget()
+
+        price_tab = QWidget()
+        price_layout = QFormLayout(price_tab)
+        self.price_field = QComboBox()
+        for field, label in PRICE_FIELDS.items():
+            self.price_field.addItem(label, field)
+        self.price_mode = QComboBox()
+        for label, mode in self.PRICE_MODES:
+            self.price_mode.addItem(label, mode)
+        self.price_value = QDoubleSpinBox()
+        self.price_value.setRange(-1000000, 1000000)
+        self.price_value.setDecimals(2)
+        apply_price_btn = QPushButton("Appliquer aux prix")
+        apply_price_btn.clicked.connect(self.apply_prices)
+        price_layout.addRow("Prix:", self.price_field)
+        price_layout.addRow("Modification:", self.price_mode)
+        price_layout.addRow("Valeur:", self.price_value)
+        price_layout.addRow(apply_price_btn)
+        tabs.addTab(price_tab, "Prix")
+
+        stock_tab = QWidget()
+        stock_layout = QFormLayout(stock_tab)
+        self.stock_mode = QComboBox()
+        for label, mode in self.STOCK_MODES:
+            self.stock_mode.addItem(label, mode)
+        self.stock_quantity = QSpinBox()
+        self.stock_quantity.setRange(-1000000, 1000000)
+        self.stock_notes = QLineEdit()
+        self.stock_notes.setPlaceholderText("Ex: Inventaire annuel")
+        apply_stock_btn = QPushButton("Appliquer au stock")
+        apply_stock_btn.clicked.connect(self.apply_stock)
+        stock_layout.addRow("Modification:", self.stock_mode)
+        stock_layout.addRow("Quantité:", self.stock_quantity)
+        stock_layout.addRow("Notes:", self.stock_notes)
+        stock_layout.addRow(apply_stock_btn)
+        tabs.addTab(stock_tab, "Stock")
+        main_layout.addWidget(tabs)
+
+        # Past operations
+        history_group = QGroupBox("Historique")
+        history_layout = QVBoxLayout(history_group)
+        self.history_table = QTableWidget(0, 5)
+        self.history_table.setHorizontalHeaderLabels(["N°", "Date", "Opération", "Articles", "État"])
+        self.history_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.history_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.history_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.history_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        history_layout.addWidget(self.history_table)
+        undo_btn = QPushButton("Annuler l'opération sélectionnée")
+        undo_btn.clicked.connect(self.undo_selected)
+        history_layout.addWidget(undo_btn, alignment=Qt.AlignRight)
+        main_layout.addWidget(history_group)
+
+        close_btn = QPushButton("Fermer")
+        close_btn.clicked.connect(self.accept)
+        main_layout.addWidget(close_btn, alignment=Qt.AlignRight)
+
+    def load_filters(self):
+        for combo in (self.category_combo, self.supplier_combo, self.attribute_combo):
+            combo.blockSignals(True)
+        self.category_combo.addItem("Toutes les catégories", None)
+        for category in Category.get_all_categories():
+            self.category_combo.addItem(category[1], category[0])
+        self.supplier_combo.addItem("Tous les fournisseurs", None)
+        for supplier_id, name in BulkOperations.get_suppliers():
+            self.supplier_combo.addItem(name, supplier_id)
+        self.attribute_combo.addItem("Aucun", None)
+        for attribute in ProductAttribute.get_all_attributes():
+            self.attribute_combo.addItem(attribute['name'], attribute['id'])
+        for combo in (self.category_combo, self.supplier_combo, self.attribute_combo):
+            combo.blockSignals(False)
+
+        self.category_combo.currentIndexChanged.connect(self.update_preview)
+        self.supplier_combo.currentIndexChanged.connect(self.update_preview)
+        self.attribute_combo.currentIndexChanged.connect(self.load_attribute_values)
+        self.value_combo.currentIndexChanged.connect(self.update_preview)
+        self.load_attribute_values()
+
+    def load_attribute_values(self):
+        self.value_combo.blockSignals(True)
+        self.value_combo.clear()
+        attribute_id = self.attribute_combo.currentData()
+        if attribute_id is not None:
+            for value in ProductAttribute.get_attribute_values(attribute_id):
+                self.value_combo.addItem(value['value'])
+        self.value_combo.setEnabled(attribute_id is not None)
+        self.value_combo.blockSignals(False)
+        self.update_preview()
+
+    def filters(self):
+        filters = {}
+        if self.category_combo.currentData() is not None:
+            filters['category_id'] = self.category_combo.currentData()
+        if self.supplier_combo.currentData() is not None:
+            filters['supplier_id'] = self.supplier_combo.currentData()
+        if self.attribute_combo.currentData() is not None and self.value_combo.currentText():
+            filters['attributes'] = {self.attribute_combo.currentText(): self.value_combo.currentText()}
+        return filters
+
+    def update_preview(self):
+        self.preview = BulkOperations.preview(self.filters()) or {'products': 0, 'stock_items': 0}
+        self.preview_label.setText(
+            f"{self.preview['products']} produits (prix), {self.preview['stock_items']} articles (stock)"
+        )
+
+    def confirm(self, count, what):
+        if not count:
+            QMessageBox.information(self, "Modifications groupées", "Aucun produit ne correspond aux filtres.")
+            return False
+        scope = "" if self.filters() else "\n\nAucun filtre : tout le catalogue est concerné."
+        reply = QMessageBox.question(
+            self, "Confirmation",
+            f"{what} sur {count} articles ?{scope}\n\nL'opération pourra être annulée depuis l'historique.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        return reply == QMessageBox.Yes
+
+    def progress_dialog(self, total):
+        progress = QProgressDialog("Mise à jour...", None, 0, total, self)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)
+
+        def update(done, _total):
+            progress.setValue(done)
+            QApplication.processEvents()
+        return progress, update
+
+    def apply_prices(self):
+        what = f"{self.price_field.currentText()} : {self.price_mode.currentText()} {self.price_value.value():g}"
+        if not self.confirm(self.preview['products'], what):
+            return
+        progress, update = self.progress_dialog(self.preview['products'])
+        operation_id = BulkOperations.update_prices(
+            self.filters(), self.price_mode.currentData(), self.price_value.value(),
+            self.price_field.currentData(), self.user_id, progress=update
+        )
+        progress.close()
+        self.finish(operation_id)
+
+    def apply_stock(self):
+        what = f"{self.stock_mode.currentText()} {self.stock_quantity.value()}"
+        if not self.confirm(self.preview['stock_items'], what):
+            return
+        progress, update = self.progress_dialog(self.preview['stock_items'])
+        operation_id = BulkOperations.update_stock(
+            self.filters(), self.stock_mode.currentData(), self.stock_quantity.value(),
+            self.user_id, self.stock_notes.text().strip() or None, progress=update
+        )
+        progress.close()
+        self.finish(operation_id)
+
+    def finish(self, operation_id):
+        self.changed = True
+        self.load_history()
+        self.update_preview()
+        if operation_id is None:
+            QMessageBox.warning(self, "Erreur", "Erreur lors de la modification groupée.")
+        else:
+            QMessageBox.information(self, "Succès", f"Opération n° {operation_id} appliquée.")
+
+    def load_history(self):
+        operations = BulkOperations.history()
+        self.history_table.setRowCount(len(operations))
+        for row, operation in enumerate(operations):
+            item = QTableWidgetItem(str(operation['id']))
+            item.setData(Qt.UserRole, operation['id'])
+            self.history_table.setItem(row, 0, item)
+            self.history_table.setItem(row, 1, QTableWidgetItem(operation['created_at'] or ""))
+            self.history_table.setItem(row, 2, QTableWidgetItem(operation['description'] or ""))
+            self.history_table.setItem(row, 3, QTableWidgetItem(str(operation['item_count'])))
+            state = f"Annulée le {operation['undone_at']}" if operation['undone_at'] else "Appliquée"
+            self.history_table.setItem(row, 4, QTableWidgetItem(state))
+
+    def undo_selected(self):
+        row = self.history_table.currentRow()
+        if row < 0:
+            QMessageBox.information(self, "Historique", "Sélectionnez une opération à annuler.")
+            return
+        operation_id = self.history_table.item(row, 0).data(Qt.UserRole)
+        reply = QMessageBox.question(
+            self, "Confirmation",
+            f"Annuler l'opération n° {operation_id} ?\n\n"
+            "Les prix modifiés depuis ne sont pas touchés ; le stock est corrigé par des mouvements inverses.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        restored = BulkOperations.undo(operation_id, self.user_id)
+        if restored is None:
+            QMessageBox.warning(self, "Erreur", "Cette opération ne peut pas être annulée (déjà annulée ?).")
+            return
+        self.changed = True
+        self.load_history()
+        self.update_preview()
+        QMessageBox.information(self, "Succès", f"Opération n° {operation_id} annulée ({restored} articles).")
@@ -0,0 +1,85 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from models.cart import Cart
+
+COLUMNS = ["Produit", "Quantité", "Prix", "Actions"]
+QUANTITY_COLUMN = 1
+ACTIONS_COLUMN = 3
+
+
+def format_quantity(quantity):
+    return str(int(quantity)) if float(quantity).is_integer() else str(quantity)
+
+
+class CartTableModel(QAbstractTableModel):
+    """Qt view of a Cart: every change goes through here so only the touched row is repainted"""
+
+    def __init__(self, cart=None, parent=None):
+        super().__init__(parent)
+        self.cart = cart if cart is not None else Cart()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.cart)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        line = self.cart.line_at(index.row()) if index.isValid() else None
+        if line is None:
+            return None
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return line.name
+            if column == QUANTITY_COLUMN:
+                return format_quantity(line.quantity)
+            if column == 2:
+                return f"{line.unit_price:.2f}"
+            if column == ACTIONS_COLUMN:
+                return "🗑"
+        if role == Qt.TextAlignmentRole and column == ACTIONS_COLUMN:
+            return Qt.AlignCenter
+        if role == Qt.ToolTipRole and column == ACTIONS_COLUMN:
+            return "Retirer du panier"
+        return None
+
+    def add(self, product_id, variant_id, name, unit_price, quantity=1):
+        """Add an item, or increment its line if it is already in the cart; return the row"""
+        existing = self.cart.find(product_id, variant_id)
+        if existing is not None:
+            row, _ = self.cart.add(product_id, variant_id, name, unit_price, quantity)
+            self._row_changed(row)
+            return row
+
+        row = len(self.cart)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.cart.add(product_id, variant_id, name, unit_price, quantity)
+        self.endInsertRows()
+        return row
+
+    def set_quantity(self, row, quantity):
+        line = self.cart.line_at(row)
+        if line is None:
+            return
+        self.cart.set_quantity(line, quantity)
+        self._row_changed(row)
+
+    def remove(self, row):
+        if self.cart.line_at(row) is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.cart.remove(row)
+        self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.cart.clear()
+        self.endResetModel()
+
+    def _row_changed(self, row):
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
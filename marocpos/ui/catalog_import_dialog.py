@@ -0,0 +1,105 @@
+from PyQt5.QtWidgets import QProgressDialog, QFileDialog, QMessageBox
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+from models.catalog_import import CatalogImport
+
+
+class _ImportSignals(QObject):
+    progress = pyqtSignal(int, float)
+    finished = pyqtSignal(object, str)
+
+
+class _ImportJob(QRunnable):
+    """Run CatalogImport off the UI thread, reporting progress after every batch"""
+
+    def __init__(self, path, user_id, signals):
+        super().__init__()
+        self.path = path
+        self.user_id = user_id
+        self.signals = signals
+        self.cancelled = False
+
+    def _progress(self, rows, rate):
+        self.signals.progress.emit(rows, rate)
+        return self.cancelled
+
+    def run(self):
+        try:
+            result = CatalogImport.run(self.path, user_id=self.user_id, progress=self._progress)
+            self.signals.finished.emit(result, "")
+        except Exception as e:
+            print(f"Error importing catalogue: {e}")
+            self.signals.finished.emit(None, str(e))
+
+
+class CatalogImportDialog(QProgressDialog):
+    """Pick a CSV or XLSX file and import it, showing rows read and rows per second.
+
+    Cancelling stops after the batch being written; the batches before it
+    stay imported. exec_() returns Accepted once something was imported.
+    """
+
+    def __init__(self, parent=None, user_id=None):
+        super().__init__("Import du catalogue...", "Arrêter", 0, 0, parent)
+        self.setWindowTitle("Importer des produits")
+        self.setWindowModality(Qt.WindowModal)
+        self.setAutoClose(False)
+        self.setAutoReset(False)
+        self.setMinimumDuration(0)
+        self.setMinimumWidth(420)
+        self.user_id = user_id
+        self.job = None
+        self.result = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.pool.setExpiryTimeout(-1)
+        self.signals = _ImportSignals()
+        self.signals.progress.connect(self.on_progress)
+        self.signals.finished.connect(self.on_finished)
+        # Stop after the current batch rather than hiding the dialog at once
+        self.canceled.disconnect(self.cancel)
+        self.canceled.connect(self.on_cancel)
+
+    def exec_(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self.parentWidget(), "Importer des produits", "",
+            "Catalogue (*.csv *.xlsx);;CSV (*.csv);;Excel (*.xlsx)"
+        )
+        if not path:
+            return QProgressDialog.Rejected
+        self.job = _ImportJob(path, self.user_id, self.signals)
+        self.pool.start(self.job)
+        return super().exec_()
+
+    def on_progress(self, rows, rate):
+        self.setLabelText(f"{rows:,} lignes importées — {rate:,.0f} lignes/s".replace(",", " "))
+
+    def on_cancel(self):
+        if self.job and self.result is None:
+            self.job.cancelled = True
+            self.setLabelText("Arrêt après le lot en cours...")
+
+    def reject(self):
+        # Escape or closing the window: stay open until the worker reports what was written
+        if self.job and self.result is None:
+            self.on_cancel()
+        else:
+            super().reject()
+
+    def on_finished(self, result, error):
+        self.result = result
+        if result is None:
+            QMessageBox.warning(self, "Erreur", f"Erreur lors de l'import : {error}")
+            self.done(QProgressDialog.Rejected)
+            return
+        message = (
+            f"{result['rows']} lignes lues en {result['seconds']:.1f} s\n"
+            f"{result['products']} produits et {result['variants']} variantes écrits\n"
+            f"{result['movements']} mouvements de stock"
+        )
+        if result['error_count']:
+            lines = "\n".join(f"Ligne {line} : {text}" for line, text in result['errors'][:20])
+            message += f"\n\n{result['error_count']} lignes ignorées :\n{lines}"
+            if result['error_count'] > 20:
+                message += "\n..."
+        QMessageBox.information(self, "Import terminé", message)
+        self.done(QProgressDialog.Accepted)
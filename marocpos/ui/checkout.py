@@ -0,0 +1,163 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from models.sale_journal import SaleJournal
+import os
+import time
+
+# Receipt choices, in the order of the sales window combo box
+RECEIPT_THERMAL = 0
+RECEIPT_A4 = 1
+RECEIPT_PDF = 2
+RECEIPT_NONE = 3
+
+# PDF receipts are saved here instead of asking for a file name at the till
+RECEIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'receipts')
+
+
+class _CheckoutSignals(QObject):
+    sale_done = pyqtSignal(str, object, dict)
+    receipt_done = pyqtSignal(int, int, object, object, str)
+
+
+class _ReplayJob(QRunnable):
+    """Write the journalled baskets that are not in the database yet, oldest first"""
+
+    def __init__(self, signals):
+        super().__init__()
+        self.signals = signals
+
+    def run(self):
+        for journal_id, sale_id, metrics in SaleJournal.replay():
+            self.signals.sale_done.emit(journal_id or "", sale_id, metrics)
+
+
+class _ReceiptJob(QRunnable):
+    """Load a committed sale and render its receipt off the UI thread"""
+
+    def __init__(self, sale_id, option, signals):
+        super().__init__()
+        self.sale_id = sale_id
+        self.option = option
+        self.signals = signals
+
+    def run(self):
+        receipt, result, error = None, None, ""
+        try:
+            # Imported here: reportlab is only needed once a receipt is printed
+            from .receipt_generator import ReceiptGenerator
+            receipt = ReceiptGenerator(self.sale_id)
+            if not receipt.sale:
+                raise ValueError(f"Vente #{self.sale_id} introuvable")
+            if self.option == RECEIPT_A4:
+                result = receipt.render_pdf(receipt.a4_pdf_path())
+            elif self.option == RECEIPT_PDF:
+                os.makedirs(RECEIPTS_DIR, exist_ok=True)
+                result = receipt.render_pdf(os.path.join(RECEIPTS_DIR, f"receipt_{self.sale_id}.pdf"))
+        except Exception as e:
+            print(f"Error generating receipt: {e}")
+            error = str(e)
+        self.signals.receipt_done.emit(self.sale_id, self.option, receipt, result, error)
+
+
+class CheckoutQueue(QObject):
+    """Asynchronous checkout for the sales window.
+
+    submit() appends the basket to the SaleJournal, on disk and fsync'd,
+    and returns at once: from then on the sale survives a locked database
+    or a crash. A single worker thread writes journalled baskets to the
+    database in the order they were rung up; if the database refuses one,
+    it and the baskets after it stay in the journal and are retried every
+    RETRY_MS, and anything left over from a previous run is replayed at
+    startup. Receipts are rendered on a
+    second, separate queue so a slow PDF never holds back the next sale.
+    Both report back on the UI thread:
+
+    saleCommitted(journal_id, sale_id, metrics) -- sale_id is None while
+        the sale is still waiting in the journal, with the reason in
+        metrics['error'], or once it was moved to the journal's quarantine
+        (metrics['quarantined'])
+    receiptReady(sale_id, option, receipt, result, error) -- receipt is the
+        ReceiptGenerator, result the PDF path for the A4 and PDF options,
+        error is empty on success
+    """
+    saleCommitted = pyqtSignal(str, object, dict)
+    receiptReady = pyqtSignal(int, int, object, object, str)
+
+    RETRY_MS = 5000
+    # Longest a window waits for queued sales and receipts when it closes
+    CLOSE_WAIT_MS = 3000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Workers never expire, so each keeps its pooled database connection
+        self.sales_pool = QThreadPool(self)
+        self.sales_pool.setMaxThreadCount(1)
+        self.sales_pool.setExpiryTimeout(-1)
+        self.receipts_pool = QThreadPool(self)
+        self.receipts_pool.setMaxThreadCount(1)
+        self.receipts_pool.setExpiryTimeout(-1)
+        self.pending = {}
+        self.signals = _CheckoutSignals()
+        self.signals.sale_done.connect(self._on_sale_done)
+        self.signals.receipt_done.connect(self.receiptReady)
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self.replay)
+        self.replay()
+
+    def submit(self, user_id, items, payment_method='CASH', created_at=None, receipt_option=RECEIPT_NONE,
+               discount=0, tax_amount=0):
+        """Journal a basket and queue it for the database; return its journal_id.
+
+        None means the journal could not be written and the sale was not
+        taken: the basket should stay in the cart.
+        """
+        entry = SaleJournal.append(user_id, items, payment_method, created_at, discount, tax_amount)
+        if entry is None:
+            return None
+        self.pending[entry['journal_id']] = (receipt_option, time.perf_counter())
+        # A replay rather than just this entry, so an earlier basket that is
+        # waiting for a retry still goes in first
+        self.replay()
+        return entry['journal_id']
+
+    def replay(self):
+        """Queue a pass over the journal for sales not yet in the database"""
+        self.sales_pool.start(_ReplayJob(self.signals))
+
+    def pending_count(self):
+        return len(self.pending)
+
+    def wait(self, msecs=-1):
+        """Block until queued sales and receipts are done, e.g. before closing.
+
+        msecs bounds the whole wait (-1: no limit); False if it ran out.
+        """
+        if msecs < 0:
+            return self.sales_pool.waitForDone() and self.receipts_pool.waitForDone()
+        deadline = time.perf_counter() + msecs / 1000
+        if not self.sales_pool.waitForDone(msecs):
+            return False
+        remaining = int((deadline - time.perf_counter()) * 1000)
+        return self.receipts_pool.waitForDone(max(remaining, 0))
+
+    def _on_sale_done(self, journal_id, sale_id, metrics):
+        if metrics.get('quarantined'):
+            # Set aside for the operator; the sales after it went on
+            self.pending.pop(journal_id, None)
+            self.saleCommitted.emit(journal_id, sale_id, metrics)
+            return
+        if sale_id is None:
+            # Still safe in the journal; try again once the database is free
+            if not self.retry_timer.isActive():
+                self.retry_timer.start(self.RETRY_MS)
+            self.saleCommitted.emit(journal_id, sale_id, metrics)
+            return
+
+        # Baskets from a previous run have no receipt to print
+        receipt_option, queued = self.pending.pop(journal_id, (RECEIPT_NONE, None))
+        if queued is not None:
+            # Time from the cashier's click, including any wait behind earlier sales
+            metrics['queued_ms'] = round((time.perf_counter() - queued) * 1000, 3)
+        self.saleCommitted.emit(journal_id, sale_id, metrics)
+        if receipt_option != RECEIPT_NONE:
+            self.receipts_pool.start(_ReceiptJob(sale_id, receipt_option, self.signals))
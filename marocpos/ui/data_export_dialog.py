@@ -0,0 +1,169 @@
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QComboBox,
+    QDateEdit, QCheckBox, QPushButton, QFileDialog, QMessageBox, QProgressDialog
+)
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QDate, Qt, pyqtSignal
+from models.data_export import DataExport, DATASET_LABELS
+import time
+
+
+class _ExportSignals(QObject):
+    progress = pyqtSignal(int, float)
+    finished = pyqtSignal(object, str)
+
+
+class _ExportJob(QRunnable):
+    """Run DataExport off the UI thread, reporting the rows written after every chunk"""
+
+    def __init__(self, dataset, path, date_from, date_to, delimiter, signals):
+        super().__init__()
+        self.args = (dataset, path, date_from, date_to)
+        self.delimiter = delimiter
+        self.signals = signals
+        self.cancelled = False
+        self.started = None
+
+    def _progress(self, rows):
+        self.signals.progress.emit(rows, rows / max(time.perf_counter() - self.started, 1e-9))
+        return self.cancelled
+
+    def run(self):
+        self.started = time.perf_counter()
+        try:
+            rows = DataExport.run(*self.args, delimiter=self.delimiter, progress=self._progress)
+            self.signals.finished.emit(rows, "")
+        except Exception as e:
+            print(f"Error exporting data: {e}")
+            self.signals.finished.emit(None, str(e))
+
+
+class DataExportDialog(QDialog):
+    """Export the sales, sale lines, stock movements or catalogue of a period to CSV or Parquet."""
+
+    FORMATS = [("CSV (séparateur virgule)", 'csv', ','),
+               ("CSV pour Excel (séparateur point-virgule)", 'csv', ';'),
+               ("Parquet", 'parquet', None)]
+
+    def __init__(self, parent=None, date_from=None, date_to=None):
+        super().__init__(parent)
+        self.job = None
+        self.progress = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.pool.setExpiryTimeout(-1)
+        self.signals = _ExportSignals()
+        self.signals.progress.connect(self.on_progress)
+        self.signals.finished.connect(self.on_finished)
+        self.init_ui(date_from, date_to)
+
+    def init_ui(self, date_from, date_to):
+        self.setWindowTitle("Exporter les données")
+        self.setMinimumWidth(450)
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+
+        self.dataset_combo = QComboBox()
+        for dataset, label in DATASET_LABELS.items():
+            self.dataset_combo.addItem(label, dataset)
+        self.dataset_combo.setCurrentIndex(self.dataset_combo.findData('sale_items'))
+        self.dataset_combo.currentIndexChanged.connect(self.update_period)
+        form.addRow("Données:", self.dataset_combo)
+
+        self.whole_history = QCheckBox("Tout l'historique")
+        self.whole_history.toggled.connect(self.update_period)
+        today = QDate.currentDate()
+        self.date_from = QDateEdit(date_from or QDate(today.year(), 1, 1))
+        self.date_to = QDateEdit(date_to or today)
+        period_layout = QHBoxLayout()
+        for widget in (self.date_from, self.date_to):
+            widget.setCalendarPopup(True)
+            widget.setDisplayFormat("yyyy-MM-dd")
+        period_layout.addWidget(self.date_from)
+        period_layout.addWidget(QLabel("au"))
+        period_layout.addWidget(self.date_to)
+        form.addRow("Période du:", period_layout)
+        form.addRow("", self.whole_history)
+
+        self.format_combo = QComboBox()
+        for label, _, _ in self.FORMATS:
+            self.format_combo.addItem(label)
+        form.addRow("Format:", self.format_combo)
+        layout.addLayout(form)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        export_btn = QPushButton("Exporter...")
+        export_btn.clicked.connect(self.export)
+        close_btn = QPushButton("Fermer")
+        close_btn.clicked.connect(self.reject)
+        buttons.addWidget(export_btn)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+        self.update_period()
+
+    def update_period(self):
+        # The catalogue is exported as it is now
+        dated = self.dataset_combo.currentData() != 'products'
+        self.whole_history.setEnabled(dated)
+        for widget in (self.date_from, self.date_to):
+            widget.setEnabled(dated and not self.whole_history.isChecked())
+
+    def export(self):
+        dataset = self.dataset_combo.currentData()
+        _, fmt, delimiter = self.FORMATS[self.format_combo.currentIndex()]
+        date_from = date_to = None
+        if self.date_from.isEnabled():
+            date_from = self.date_from.date().toString("yyyy-MM-dd")
+            date_to = self.date_to.date().toString("yyyy-MM-dd")
+            if date_from > date_to:
+                QMessageBox.warning(self, "Erreur", "La date de début est après la date de fin.")
+                return
+        suffix = f"_{date_from}_{date_to}" if date_from else ""
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Exporter", f"{dataset}{suffix}.{fmt}",
+            "Parquet (*.parquet)" if fmt == 'parquet' else "CSV (*.csv)"
+        )
+        if not path:
+            return
+        if not path.lower().endswith(f".{fmt}"):
+            path += f".{fmt}"
+
+        self.job = _ExportJob(dataset, path, date_from, date_to, delimiter or ',', self.signals)
+        self.progress = QProgressDialog("Export en cours...", "Arrêter", 0, 0, self)
+        self.progress.setWindowTitle("Exporter les données")
+        self.progress.setWindowModality(Qt.WindowModal)
+        self.progress.setMinimumDuration(0)
+        self.progress.setAutoClose(False)
+        self.progress.setAutoReset(False)
+        # Stop after the current chunk; the dialog closes when the worker reports back
+        self.progress.canceled.disconnect(self.progress.cancel)
+        self.progress.canceled.connect(self.on_cancel)
+        self.path = path
+        self.pool.start(self.job)
+        self.progress.show()
+
+    def on_progress(self, rows, rate):
+        if self.progress:
+            self.progress.setLabelText(f"{rows:,} lignes exportées — {rate:,.0f} lignes/s".replace(",", " "))
+
+    def on_cancel(self):
+        if self.job:
+            self.job.cancelled = True
+            self.progress.setLabelText("Arrêt après le bloc en cours...")
+
+    def on_finished(self, rows, error):
+        if self.progress:
+            self.progress.close()
+            self.progress = None
+        self.job = None
+        if error:
+            QMessageBox.warning(self, "Erreur", f"Erreur lors de l'export : {error}")
+        elif rows is None:
+            QMessageBox.information(self, "Export", "Export arrêté, aucun fichier écrit.")
+        else:
+            QMessageBox.information(self, "Export terminé", f"{rows} lignes exportées dans\n{self.path}")
+
+    def reject(self):
+        # Not while an export is running: its worker still reports here
+        if self.job is None:
+            super().reject()
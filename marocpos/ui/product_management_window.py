@@ -1,14 +1,12 @@
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, 
+    QWidget, QVBoxLayout, QHBoxLayout, QTableView,
     QPushButton, QLabel, QHeaderView, QMessageBox, QComboBox, QLineEdit,
     QSpinBox, QDoubleSpinBox, QFrame, QCheckBox, QDialog
 )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap
 from models.product import Product
 from models.category import Category
+from .product_table_model import ProductTableModel, ProductActionsDelegate, ACTIONS_COLUMN
 import json
-import os
 
 class ProductManagementWindow(QWidget):
     def __init__(self):
@@ -54,37 +52,45 @@ class ProductManagementWindow(QWidget):
             }
         """)
         
+        # Bulk import from a CSV or XLSX file
+        import_btn = QPushButton("Importer")
+        import_btn.setToolTip("Importer des produits depuis un fichier CSV ou Excel")
+        import_btn.clicked.connect(self.import_products)
+
+        # Price and stock changes over a whole category, supplier or attribute
+        bulk_btn = QPushButton("Modifications groupées")
+        bulk_btn.clicked.connect(self.bulk_update)
+
         # Add widgets to top layout
         top_layout.addWidget(search_label)
         top_layout.addWidget(self.search_input)
         top_layout.addWidget(category_label)
         top_layout.addWidget(self.category_filter)
         top_layout.addStretch()
+        top_layout.addWidget(import_btn)
+        top_layout.addWidget(bulk_btn)
         top_layout.addWidget(add_product_btn)
         
         main_layout.addLayout(top_layout)
 
-        # Products table
-        self.products_table = QTableWidget()
-        self.products_table.setColumnCount(12)
-        self.products_table.setHorizontalHeaderLabels([
-            "ID", "Image", "Code-barres", "Nom", "Prix vente", "Prix achat", 
-            "Stock", "Stock min", "Catégorie", "Variantes", "Marge", "Actions"
-        ])
+        # Products table: a model/view pair that only fetches and paints what is visible
+        self.products_model = ProductTableModel(self)
+        self.products_table = QTableView()
+        self.products_table.setModel(self.products_model)
+        self.products_table.setSelectionBehavior(QTableView.SelectRows)
+        self.products_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.products_table.setMouseTracking(True)
+        self.products_table.verticalHeader().setDefaultSectionSize(64)
+        self.products_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.products_table.verticalHeader().hide()
+        
+        self.actions_delegate = ProductActionsDelegate(self.products_table)
+        self.actions_delegate.actionTriggered.connect(self.on_product_action)
+        self.products_table.setItemDelegateForColumn(ACTIONS_COLUMN, self.actions_delegate)
 
         # Set column widths
-        self.products_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Fixed)
-        self.products_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Fixed)
-        self.products_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Fixed)
+        self.products_table.horizontalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.products_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
-        self.products_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Fixed)
-        self.products_table.horizontalHeader().setSectionResizeMode(5, QHeaderView.Fixed)
-        self.products_table.horizontalHeader().setSectionResizeMode(6, QHeaderView.Fixed)
-        self.products_table.horizontalHeader().setSectionResizeMode(7, QHeaderView.Fixed)
-        self.products_table.horizontalHeader().setSectionResizeMode(8, QHeaderView.Fixed)
-        self.products_table.horizontalHeader().setSectionResizeMode(9, QHeaderView.Fixed)
-        self.products_table.horizontalHeader().setSectionResizeMode(10, QHeaderView.Fixed)
-        self.products_table.horizontalHeader().setSectionResizeMode(11, QHeaderView.Fixed)
         
         self.products_table.setColumnWidth(0, 50)  # ID
         self.products_table.setColumnWidth(1, 70)  # Image
@@ -113,182 +119,37 @@ class ProductManagementWindow(QWidget):
         for category in categories:
             self.category_filter.addItem(category[1], category[0])
 
-    def load_products(self, category_id=None):
-        """Load products from database using more reliable methods"""
+    def load_products(self, category_id=None, search_text=""):
+        """Show the products of a category and/or matching a search, first page only"""
         try:
-            # Clear table
-            self.products_table.setRowCount(0)
-            
-            # Get products using more reliable helpers
-            from ui.product_helpers import get_all_products_reliable, get_products_by_category_reliable, debug_log
-            
-            debug_log(f"Loading products for category_id: {category_id}")
-            
-            if category_id:
-                products = get_products_by_category_reliable(category_id)
-            else:
-                products = get_all_products_reliable()
-            
-            debug_log(f"Found {len(products)} products")
-            
-            # Set row count
-            self.products_table.setRowCount(len(products))
-            
-            # Fill table
-            for row, product_dict in enumerate(products):
-                try:
-                    # Extract values with defaults
-                    product_id = product_dict.get('id', 0)
-                    unit_price = float(product_dict.get('unit_price', 0))
-                    purchase_price = float(product_dict.get('purchase_price', 0))
-                    stock = int(product_dict.get('stock', 0))
-                    min_stock = int(product_dict.get('min_stock', 0))
-                    
-                    debug_log(f"Processing product row {row}: ID={product_id}, Name={product_dict.get('name')}")
-                    
-                    # ID column
-                    id_item = QTableWidgetItem(str(product_id))
-                    id_item.setFlags(id_item.flags() & ~Qt.ItemIsEditable)  # Make read-only
-                    self.products_table.setItem(row, 0, id_item)
-                    
-                    # Image column
-                    image_label = QLabel()
-                    image_label.setAlignment(Qt.AlignCenter)
-                    
-                    # Check if image exists
-                    if product_dict.get('image_path') and os.path.exists(product_dict.get('image_path', '')):
-                        pixmap = QPixmap(product_dict.get('image_path', ''))
-                        if not pixmap.isNull():
-                            scaled_pixmap = pixmap.scaled(
-                                60, 60,
-                                Qt.KeepAspectRatio,
-                                Qt.SmoothTransformation
-                            )
-                            image_label.setPixmap(scaled_pixmap)
-                    
-                    self.products_table.setCellWidget(row, 1, image_label)
-                    
-                    # Other columns
-                    self.products_table.setItem(row, 2, QTableWidgetItem(str(product_dict.get('barcode', ''))))
-                    self.products_table.setItem(row, 3, QTableWidgetItem(str(product_dict.get('name', ''))))
-                    self.products_table.setItem(row, 4, QTableWidgetItem(f"{unit_price:.2f} MAD"))
-                    self.products_table.setItem(row, 5, QTableWidgetItem(f"{purchase_price:.2f} MAD"))
-                    
-                    # Color stock cell based on min stock
-                    stock_item = QTableWidgetItem(str(stock))
-                    if stock <= min_stock:
-                        stock_item.setBackground(Qt.red)
-                        stock_item.setForeground(Qt.white)
-                    self.products_table.setItem(row, 6, stock_item)
-                    
-                    self.products_table.setItem(row, 7, QTableWidgetItem(str(min_stock)))
-                    self.products_table.setItem(row, 8, QTableWidgetItem(str(product_dict.get('category_name', ''))))
-                    
-                    # Variants info
-                    has_variants = product_dict.get('has_variants', False)
-                    variant_text = "Oui" if has_variants else "Non"
-                    
-                    if has_variants and product_dict.get('variant_attributes'):
-                        try:
-                            # Convert to list if it's a string
-                            if isinstance(product_dict['variant_attributes'], str):
-                                variant_attrs = json.loads(product_dict['variant_attributes'])
-                            else:
-                                variant_attrs = product_dict['variant_attributes']
-                                
-                            # Handle list or non-list data
-                            if isinstance(variant_attrs, list):
-                                variant_text += f"\n({', '.join(variant_attrs)})"
-                            else:
-                                variant_text += "\n(Format inconnu)"
-                        except Exception as e:
-                            print(f"Error parsing variant attributes: {e}")
-                            variant_text += "\n(Erreur de format)"
-                    
-                    self.products_table.setItem(row, 9, QTableWidgetItem(variant_text))
-                    
-                    # Profit margin
-                    margin = 0
-                    if purchase_price > 0:
-                        margin = ((unit_price - purchase_price) / purchase_price) * 100
-                    self.products_table.setItem(row, 10, QTableWidgetItem(f"{margin:.1f}%"))
-                    
-                    # Actions buttons
-                    actions_widget = QWidget()
-                    actions_layout = QHBoxLayout(actions_widget)
-                    actions_layout.setContentsMargins(0, 0, 0, 0)
-                    
-                    stock_btn = QPushButton("📦")
-                    variant_btn = QPushButton("🔄")
-                    edit_btn = QPushButton("✏️")
-                    delete_btn = QPushButton("🗑️")
-                    
-                    stock_btn.setToolTip("Gérer le stock")
-                    variant_btn.setToolTip("Gérer les variantes")
-                    edit_btn.setToolTip("Modifier le produit")
-                    delete_btn.setToolTip("Supprimer le produit")
-                    
-                    # Connect buttons to actions
-                    stock_btn.clicked.connect(lambda checked, p=product_dict: self.manage_stock(p))
-                    edit_btn.clicked.connect(lambda checked, p=product_dict: self.edit_product(p))
-                    delete_btn.clicked.connect(lambda checked, id=product_id: self.delete_product(id))
-                    variant_btn.clicked.connect(lambda checked, p=product_dict: self.manage_variants(p))
-                    
-                    # Smaller button sizes
-                    for btn in [stock_btn, variant_btn, edit_btn, delete_btn]:
-                        btn.setMaximumWidth(40)
-                        btn.setMaximumHeight(30)
-                    
-                    actions_layout.addWidget(stock_btn)
-                    
-                    if has_variants:
-                        actions_layout.addWidget(variant_btn)
-                        
-                    actions_layout.addWidget(edit_btn)
-                    actions_layout.addWidget(delete_btn)
-                    actions_layout.addStretch()
-                    
-                    self.products_table.setCellWidget(row, 11, actions_widget)
-                    
-                except Exception as e:
-                    print(f"Error loading product row {row}: {e}")
-                    print(f"Product data: {product_dict}")
-                    continue
+            self.products_model.set_filter(category_id, search_text)
         except Exception as e:
             print(f"Error loading products: {e}")
             QMessageBox.warning(self, "Erreur", f"Erreur lors du chargement des produits: {str(e)}")
 
+    def refresh_products(self):
+        """Reload the list after a change, keeping the current search and category"""
+        self.filter_products()
+
+    def on_product_action(self, action, product):
+        """Dispatch a click on one of the buttons painted in the actions column"""
+        if action == 'stock':
+            self.manage_stock(product)
+        elif action == 'variants':
+            self.manage_variants(product)
+        elif action == 'edit':
+            self.edit_product(product)
+        elif action == 'delete':
+            self.delete_product(product.get('id'))
+
     def filter_products(self):
         """Filter products based on search text and category"""
-        search_text = self.search_input.text().lower()
+        search_text = self.search_input.text().strip()
         category_id = self.category_filter.currentData()
         
-        if category_id:
-            # Filter by category first, then by search text
-            self.load_products(category_id)
-            
-            # Then filter by search text
-            for row in range(self.products_table.rowCount()):
-                found = False
-                for col in [2, 3]:  # barcode and name columns
-                    item = self.products_table.item(row, col)
-                    if item and search_text in item.text().lower():
-                        found = True
-                        break
-                self.products_table.setRowHidden(row, not found)
-        else:
-            # Load all products and filter by search text
-            self.load_products()
-            
-            # Then filter by search text
-            for row in range(self.products_table.rowCount()):
-                found = False
-                for col in [2, 3]:  # barcode and name columns
-                    item = self.products_table.item(row, col)
-                    if item and search_text in item.text().lower():
-                        found = True
-                        break
-                self.products_table.setRowHidden(row, not found)
+        # The search runs against the full-text index in SQL rather than
+        # loading every product and hiding the table rows that don't match
+        self.load_products(category_id, search_text)
 
     def add_product(self):
         """Open add product dialog"""
@@ -297,12 +158,41 @@ class ProductManagementWindow(QWidget):
             dialog = AddProductDialog(self)
             
             if dialog.exec_():
-                self.load_products()
+                self.refresh_products()
                 QMessageBox.information(self, "Succès", "Produit ajouté avec succès!")
         except Exception as e:
             print(f"Error adding product: {e}")
             QMessageBox.warning(self, "Erreur", f"Erreur lors de l'ajout du produit: {str(e)}")
 
+    def import_products(self):
+        """Import products from a CSV or XLSX file, then reload the list"""
+        try:
+            from .catalog_import_dialog import CatalogImportDialog
+            dialog = CatalogImportDialog(self)
+            if dialog.exec_():
+                # The file may have created categories
+                category_id = self.category_filter.currentData()
+                self.category_filter.blockSignals(True)
+                self.load_categories()
+                self.category_filter.setCurrentIndex(max(self.category_filter.findData(category_id), 0))
+                self.category_filter.blockSignals(False)
+                self.refresh_products()
+        except Exception as e:
+            print(f"Error importing products: {e}")
+            QMessageBox.warning(self, "Erreur", f"Erreur lors de l'import des produits: {str(e)}")
+
+    def bulk_update(self):
+        """Bulk price and stock changes, then reload the list if anything changed"""
+        try:
+            from .bulk_update_dialog import BulkUpdateDialog
+            dialog = BulkUpdateDialog(self)
+            dialog.exec_()
+            if dialog.changed:
+                self.refresh_products()
+        except Exception as e:
+            print(f"Error in bulk update: {e}")
+            QMessageBox.warning(self, "Erreur", f"Erreur lors des modifications groupées: {str(e)}")
+
     def edit_product(self, product):
         """Open edit product dialog with enhanced error handling"""
         try:
@@ -326,7 +216,7 @@ class ProductManagementWindow(QWidget):
             
             if dialog.exec_():
                 debug_log(f"Product {product_id} successfully edited, reloading product list")
-                self.load_products()
+                self.refresh_products()
                 QMessageBox.information(self, "Succès", "Produit modifié avec succès!")
             else:
                 debug_log(f"Edit dialog cancelled for product {product_id}")
@@ -348,7 +238,7 @@ class ProductManagementWindow(QWidget):
         
         if reply == QMessageBox.Yes:
             if Product.delete_product(product_id):
-                self.load_products()
+                self.refresh_products()
                 QMessageBox.information(self, "Succès", "Produit supprimé avec succès!")
             else:
                 QMessageBox.warning(self, "Erreur", "Erreur lors de la suppression du produit.")
@@ -364,7 +254,7 @@ class ProductManagementWindow(QWidget):
             
             if dialog.exec_():
                 # Refresh the product list to show updated stock levels
-                self.load_products()
+                self.refresh_products()
         except Exception as e:
             print(f"Error opening stock management: {e}")
             QMessageBox.warning(
@@ -416,11 +306,11 @@ class ProductManagementWindow(QWidget):
                     # Update the variants
                     # Here we would need to add code to update/delete existing variants
                     # For now we'll just show a success message
-                    self.load_products()
+                    self.refresh_products()
                     QMessageBox.information(
                         self,
                         "Succès",
-                        f"{len(variants_data)} variantes configurées pour {product['name']}"
+                        f"{dialog.variant_count()} variantes configurées pour {product['name']}"
                     )
         except Exception as e:
             print(f"Error managing variants: {e}")
@@ -0,0 +1,239 @@
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QStyleOptionButton, QApplication, QToolTip
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QRect, QEvent, pyqtSignal
+from PyQt5.QtGui import QColor
+from models.product import Product
+from .thumbnails import ThumbnailService
+
+COLUMNS = [
+    "ID", "Image", "Code-barres", "Nom", "Prix vente", "Prix achat",
+    "Stock", "Stock min", "Catégorie", "Variantes", "Marge", "Actions"
+]
+IMAGE_COLUMN = 1
+STOCK_COLUMN = 6
+ACTIONS_COLUMN = 11
+
+THUMBNAIL_SIZE = 60
+
+ProductRole = Qt.UserRole
+
+
+class ProductTableModel(QAbstractTableModel):
+    """Products for ProductManagementWindow, fetched one page at a time as the view scrolls.
+
+    Only the pages scrolled into view are held, and a thumbnail is only
+    requested from the ThumbnailService when its row is painted, so opening
+    the window costs the same whatever the size of the catalogue.
+    """
+    PAGE_SIZE = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.products = []
+        self.category_id = None
+        self.search_text = ""
+        self.has_more = True
+        self.thumbnails = ThumbnailService.instance()
+        self.thumbnails.ready.connect(self.on_thumbnail_ready)
+        self.rows_by_image = {}
+
+    def set_filter(self, category_id=None, search_text=""):
+        """Restart from the first page with a new category and search text"""
+        self.beginResetModel()
+        self.category_id = category_id
+        self.search_text = search_text
+        self.products = []
+        self.rows_by_image = {}
+        self.has_more = True
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def refresh(self):
+        """Reload with the current filter, e.g. after an edit"""
+        self.set_filter(self.category_id, self.search_text)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.products)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.has_more:
+            return
+        # Product.search() with an empty query is a plain listing by name
+        page = Product.search(self.search_text, self.category_id,
+                              limit=self.PAGE_SIZE, offset=len(self.products))
+        self.has_more = len(page) == self.PAGE_SIZE
+        if not page:
+            return
+        first = len(self.products)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self.products.extend(page)
+        self.endInsertRows()
+
+    def product(self, row):
+        return self.products[row] if 0 <= row < len(self.products) else None
+
+    def on_thumbnail_ready(self, image_path, size):
+        """Repaint the rows that showed a placeholder for this image"""
+        if size != THUMBNAIL_SIZE:
+            return
+        for row in self.rows_by_image.pop(image_path, ()):
+            if row < len(self.products):
+                index = self.index(row, IMAGE_COLUMN)
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        product = self.products[index.row()]
+        column = index.column()
+
+        if role == ProductRole:
+            return product
+        if role == Qt.DecorationRole and column == IMAGE_COLUMN:
+            if product.get('image_path'):
+                self.rows_by_image.setdefault(product['image_path'], set()).add(index.row())
+                return self.thumbnails.get(product['image_path'], THUMBNAIL_SIZE)
+            return None
+        if role == Qt.TextAlignmentRole and column == IMAGE_COLUMN:
+            return Qt.AlignCenter
+
+        stock = int(product.get('stock') or 0)
+        min_stock = int(product.get('min_stock') or 0)
+        if column == STOCK_COLUMN and stock <= min_stock:
+            if role == Qt.BackgroundRole:
+                return QColor(Qt.red)
+            if role == Qt.ForegroundRole:
+                return QColor(Qt.white)
+
+        if role == Qt.DisplayRole:
+            return self.display_text(product, column)
+        return None
+
+    def display_text(self, product, column):
+        unit_price = float(product.get('unit_price') or 0)
+        purchase_price = float(product.get('purchase_price') or 0)
+
+        if column == 0:
+            return str(product.get('id', 0))
+        if column == 2:
+            return str(product.get('barcode') or '')
+        if column == 3:
+            return str(product.get('name') or '')
+        if column == 4:
+            return f"{unit_price:.2f} MAD"
+        if column == 5:
+            return f"{purchase_price:.2f} MAD"
+        if column == 6:
+            return str(int(product.get('stock') or 0))
+        if column == 7:
+            return str(int(product.get('min_stock') or 0))
+        if column == 8:
+            return str(product.get('category_name') or '')
+        if column == 9:
+            if not product.get('has_variants'):
+                return "Non"
+            variant_attrs = product.get('variant_attributes')
+            if not variant_attrs:
+                return "Oui"
+            if isinstance(variant_attrs, list):
+                return f"Oui\n({', '.join(str(attr) for attr in variant_attrs)})"
+            return "Oui\n(Format inconnu)"
+        if column == 10:
+            margin = 0
+            if purchase_price > 0:
+                margin = ((unit_price - purchase_price) / purchase_price) * 100
+            return f"{margin:.1f}%"
+        return None
+
+
+class ProductActionsDelegate(QStyledItemDelegate):
+    """Paints the stock/variants/edit/delete buttons of the actions column.
+
+    The buttons are drawn, not widgets, so rows cost nothing until painted.
+    A click on one emits actionTriggered(action, product).
+    """
+    actionTriggered = pyqtSignal(str, dict)
+
+    BUTTON_WIDTH = 40
+    BUTTON_HEIGHT = 30
+    SPACING = 4
+
+    ACTIONS = [
+        ('stock', "📦", "Gérer le stock"),
+        ('variants', "🔄", "Gérer les variantes"),
+        ('edit', "✏️", "Modifier le produit"),
+        ('delete', "🗑️", "Supprimer le produit"),
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pressed = None
+
+    def buttons(self, option, product):
+        """(action, label, tooltip, rect) for each button shown in this cell"""
+        result = []
+        x = option.rect.x() + self.SPACING
+        y = option.rect.y() + (option.rect.height() - self.BUTTON_HEIGHT) // 2
+        for action, label, tooltip in self.ACTIONS:
+            if action == 'variants' and not product.get('has_variants'):
+                continue
+            result.append((action, label, tooltip, QRect(x, y, self.BUTTON_WIDTH, self.BUTTON_HEIGHT)))
+            x += self.BUTTON_WIDTH + self.SPACING
+        return result
+
+    def paint(self, painter, option, index):
+        product = index.data(ProductRole)
+        if not product:
+            return super().paint(painter, option, index)
+        style = option.widget.style() if option.widget else QApplication.style()
+        for action, label, tooltip, rect in self.buttons(option, product):
+            button = QStyleOptionButton()
+            button.rect = rect
+            button.text = label
+            button.state = QStyle.State_Enabled
+            if self.pressed == (index.row(), action):
+                button.state |= QStyle.State_Sunken
+            else:
+                button.state |= QStyle.State_Raised
+            style.drawControl(QStyle.CE_PushButton, button, painter, option.widget)
+
+    def action_at(self, option, index, pos):
+        product = index.data(ProductRole)
+        if not product:
+            return None, None
+        for action, label, tooltip, rect in self.buttons(option, product):
+            if rect.contains(pos):
+                return action, tooltip
+        return None, None
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonPress and event.button() == Qt.LeftButton:
+            action, _ = self.action_at(option, index, event.pos())
+            self.pressed = (index.row(), action) if action else None
+            return action is not None
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            action, _ = self.action_at(option, index, event.pos())
+            pressed, self.pressed = self.pressed, None
+            if action and pressed == (index.row(), action):
+                self.actionTriggered.emit(action, index.data(ProductRole))
+                return True
+            return pressed is not None
+        return super().editorEvent(event, model, option, index)
+
+    def helpEvent(self, event, view, option, index):
+        if event.type() == QEvent.ToolTip:
+            _, tooltip = self.action_at(option, index, event.pos())
+            if tooltip:
+                QToolTip.showText(event.globalPos(), tooltip, view)
+                return True
+        return super().helpEvent(event, view, option, index)
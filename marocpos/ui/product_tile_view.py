@@ -0,0 +1,149 @@
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QListView
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize
+from PyQt5.QtGui import QColor, QFont, QPainter, QPainterPath
+from .thumbnails import ThumbnailService
+
+ProductRole = Qt.UserRole
+
+TILE_WIDTH = 180
+TILE_HEIGHT = 200
+IMAGE_SIZE = 100
+
+
+class ProductTileModel(QAbstractListModel):
+    """Products shown as tiles on the sales screen.
+
+    Holds references to the catalogue's product dicts; a thumbnail is only
+    requested from the ThumbnailService when its tile is painted.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.products = []
+        self.thumbnails = ThumbnailService.instance()
+        self.thumbnails.ready.connect(self.on_thumbnail_ready)
+        self.rows_by_image = {}
+
+    def set_products(self, products):
+        self.beginResetModel()
+        self.products = products
+        self.rows_by_image = {}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.products)
+
+    def on_thumbnail_ready(self, image_path, size):
+        """Repaint the rows that showed a placeholder for this image"""
+        if size != IMAGE_SIZE:
+            return
+        for row in self.rows_by_image.pop(image_path, ()):
+            if row < len(self.products):
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        product = self.products[index.row()]
+        if role == ProductRole:
+            return product
+        if role == Qt.DisplayRole:
+            return product['name']
+        if role == Qt.DecorationRole:
+            if product.get('image_path'):
+                self.rows_by_image.setdefault(product['image_path'], set()).add(index.row())
+                return self.thumbnails.get(product['image_path'], IMAGE_SIZE)
+            return None
+        return None
+
+
+class ProductTileDelegate(QStyledItemDelegate):
+    """Paints a product tile: image, variants hint, name, price and stock."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.name_font = QFont()
+        self.name_font.setBold(True)
+        self.name_font.setPixelSize(14)
+        self.price_font = QFont()
+        self.price_font.setBold(True)
+        self.small_font = QFont()
+        self.small_font.setPixelSize(12)
+        self.variant_font = QFont()
+        self.variant_font.setItalic(True)
+        self.variant_font.setPixelSize(11)
+
+    def sizeHint(self, option, index):
+        return QSize(TILE_WIDTH, TILE_HEIGHT)
+
+    def paint(self, painter, option, index):
+        product = index.data(ProductRole)
+        if not product:
+            return
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        # Card background
+        rect = option.rect.adjusted(2, 2, -2, -2)
+        path = QPainterPath()
+        path.addRoundedRect(rect.x(), rect.y(), rect.width(), rect.height(), 10, 10)
+        hovered = option.state & QStyle.State_MouseOver
+        painter.fillPath(path, QColor("#f8f9fa") if hovered else QColor("white"))
+
+        inner = rect.adjusted(10, 10, -10, -10)
+        y = inner.y()
+
+        # Product image
+        pixmap = index.data(Qt.DecorationRole)
+        if pixmap is not None:
+            x = inner.x() + (inner.width() - pixmap.width()) // 2
+            painter.drawPixmap(x, y, pixmap)
+            y += IMAGE_SIZE + 4
+
+        # Has variants label
+        if product.get('has_variants'):
+            painter.setFont(self.variant_font)
+            painter.setPen(QColor("#0066cc"))
+            painter.drawText(QRect(inner.x(), y, inner.width(), 16), Qt.AlignCenter, "(Avec variantes)")
+            y += 16
+
+        # Name, price and stock are anchored to the bottom so tiles line up
+        bottom = inner.bottom()
+        painter.setFont(self.small_font)
+        painter.setPen(QColor("#6c757d"))
+        painter.drawText(QRect(inner.x(), bottom - 16, inner.width(), 16),
+                         Qt.AlignCenter, f"Stock: {product['stock']}")
+
+        painter.setFont(self.price_font)
+        painter.setPen(QColor("#28a745"))
+        painter.drawText(QRect(inner.x(), bottom - 36, inner.width(), 18),
+                         Qt.AlignCenter, f"{product['unit_price']:.2f} MAD")
+
+        painter.setFont(self.name_font)
+        painter.setPen(QColor("black"))
+        name_rect = QRect(inner.x(), y, inner.width(), max(18, bottom - 38 - y))
+        painter.drawText(name_rect, Qt.AlignHCenter | Qt.AlignVCenter | Qt.TextWordWrap, product['name'])
+
+        painter.restore()
+
+
+def create_product_tile_view(parent=None):
+    """A QListView in icon mode that lays out and paints only the visible tiles"""
+    view = QListView(parent)
+    view.setViewMode(QListView.IconMode)
+    view.setResizeMode(QListView.Adjust)
+    view.setMovement(QListView.Static)
+    view.setUniformItemSizes(True)
+    view.setSpacing(10)
+    view.setMouseTracking(True)
+    view.setSelectionMode(QListView.NoSelection)
+    view.setCursor(Qt.PointingHandCursor)
+    view.setStyleSheet("""
+        QListView {
+            border: none;
+            background-color: transparent;
+        }
+    """)
+    view.setModel(ProductTileModel(view))
+    view.setItemDelegate(ProductTileDelegate(view))
+    return view
@@ -0,0 +1,90 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from models.sales import Sales
+
+COLUMNS = ["ID", "Date", "Caissier", "Paiement", "Total", "Remise", "TVA", "Total final"]
+AMOUNT_COLUMNS = {4: 'total_amount', 5: 'discount', 6: 'tax_amount', 7: 'final_total'}
+
+SaleRole = Qt.UserRole
+
+
+class SalesHistoryModel(QAbstractTableModel):
+    """Sales for SalesHistoryWindow, newest first, fetched a page at a time as the view scrolls.
+
+    Pages come from Sales.get_sales_page(), which continues after the last
+    sale already loaded, so scrolling far back costs no more than the first
+    page. Filters are applied in SQL.
+    """
+    PAGE_SIZE = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.sales = []
+        self.filters = {}
+        self.has_more = True
+
+    def set_filters(self, filters):
+        """Restart from the newest sale with new filters"""
+        self.beginResetModel()
+        self.filters = dict(filters)
+        self.sales = []
+        self.has_more = True
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def refresh(self):
+        self.set_filters(self.filters)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.sales)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.has_more:
+            return
+        after_id = self.sales[-1]['id'] if self.sales else None
+        page = Sales.get_sales_page(after_id, self.PAGE_SIZE, self.filters)
+        self.has_more = len(page) == self.PAGE_SIZE
+        if not page:
+            return
+        first = len(self.sales)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self.sales.extend(page)
+        self.endInsertRows()
+
+    def sale(self, row):
+        return self.sales[row] if 0 <= row < len(self.sales) else None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        sale = self.sales[index.row()]
+        column = index.column()
+
+        if role == SaleRole:
+            return sale
+        if role == Qt.TextAlignmentRole and column in AMOUNT_COLUMNS:
+            return Qt.AlignRight | Qt.AlignVCenter
+        if role != Qt.DisplayRole:
+            return None
+
+        if column == 0:
+            return str(sale['id'])
+        if column == 1:
+            return str(sale.get('created_at') or '')
+        if column == 2:
+            return sale.get('username') or f"#{sale.get('user_id')}"
+        if column == 3:
+            return str(sale.get('payment_method') or '')
+        if column in AMOUNT_COLUMNS:
+            return f"{float(sale.get(AMOUNT_COLUMNS[column]) or 0):.2f}"
+        return None
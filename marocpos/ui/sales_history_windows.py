@@ -1,5 +1,11 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QTableView, QHeaderView, QLabel,
+    QComboBox, QDateEdit, QCheckBox, QPushButton
+)
+from PyQt5.QtCore import QDate
 from models.sales import Sales
+from models.user import User
+from .sales_history_model import SalesHistoryModel
 
 class SalesHistoryWindow(QWidget):
     def __init__(self):
@@ -8,33 +14,93 @@ class SalesHistoryWindow(QWidget):
 
     def init_ui(self):
         # Set window properties
-        self.setWindowTitle("Sales History")
-        self.setGeometry(100, 100, 800, 600)
+        self.setWindowTitle("Historique des ventes")
+        self.setGeometry(100, 100, 900, 600)
 
         # Main layout
         layout = QVBoxLayout()
 
-        # Sales Table
-        self.sales_table = QTableWidget()
-        self.sales_table.setColumnCount(5)
-        self.sales_table.setHorizontalHeaderLabels(["ID", "Total", "Discount", "Tax", "Final Total", "Date"])
+        # Filters, applied in SQL by the model
+        filters_layout = QHBoxLayout()
+
+        self.date_filter = QCheckBox("Du")
+        filters_layout.addWidget(self.date_filter)
+        self.date_from = QDateEdit(QDate.currentDate().addDays(-30))
+        self.date_from.setCalendarPopup(True)
+        self.date_from.setDisplayFormat("yyyy-MM-dd")
+        filters_layout.addWidget(self.date_from)
+        filters_layout.addWidget(QLabel("au"))
+        self.date_to = QDateEdit(QDate.currentDate())
+        self.date_to.setCalendarPopup(True)
+        self.date_to.setDisplayFormat("yyyy-MM-dd")
+        filters_layout.addWidget(self.date_to)
+
+        filters_layout.addWidget(QLabel("Caissier:"))
+        self.cashier_filter = QComboBox()
+        self.cashier_filter.addItem("Tous", None)
+        for user in User.get_all_users() or []:
+            self.cashier_filter.addItem(user['username'], user['id'])
+        filters_layout.addWidget(self.cashier_filter)
+
+        filters_layout.addWidget(QLabel("Paiement:"))
+        self.payment_filter = QComboBox()
+        self.payment_filter.addItem("Tous", None)
+        for method in Sales.get_payment_methods():
+            self.payment_filter.addItem(method, method)
+        filters_layout.addWidget(self.payment_filter)
+
+        refresh_btn = QPushButton("🔄")
+        refresh_btn.setToolTip("Actualiser")
+        refresh_btn.clicked.connect(self.load_sales)
+        filters_layout.addWidget(refresh_btn)
+        filters_layout.addStretch()
+
+        # Full-period extracts (sales, sale lines, stock, catalogue) for accounting
+        export_btn = QPushButton("Exporter")
+        export_btn.setToolTip("Exporter les ventes, le stock ou le catalogue (CSV, Parquet)")
+        export_btn.clicked.connect(self.export_data)
+        filters_layout.addWidget(export_btn)
+        layout.addLayout(filters_layout)
+
+        # Sales table: a view over a model that loads a page at a time
+        self.sales_model = SalesHistoryModel(self)
+        self.sales_table = QTableView()
+        self.sales_table.setModel(self.sales_model)
+        self.sales_table.setSelectionBehavior(QTableView.SelectRows)
+        self.sales_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.sales_table.verticalHeader().setVisible(False)
+        self.sales_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(self.sales_table)
 
         # Set layout
         self.setLayout(layout)
 
+        for signal in [self.date_filter.toggled, self.date_from.dateChanged, self.date_to.dateChanged,
+                       self.cashier_filter.currentIndexChanged, self.payment_filter.currentIndexChanged]:
+            signal.connect(self.load_sales)
+
         # Load sales
         self.load_sales()
 
+    def current_filters(self):
+        filters = {
+            'user_id': self.cashier_filter.currentData(),
+            'payment_method': self.payment_filter.currentData(),
+        }
+        if self.date_filter.isChecked():
+            filters['date_from'] = self.date_from.date().toString("yyyy-MM-dd")
+            filters['date_to'] = self.date_to.date().toString("yyyy-MM-dd")
+        return filters
+
     def load_sales(self):
-        """Load sales from the database."""
-        sales = Sales.get_sales()
-        self.sales_table.setRowCount(len(sales))
-
-        for row, sale in enumerate(sales):
-            self.sales_table.setItem(row, 0, QTableWidgetItem(str(sale["id"])))
-            self.sales_table.setItem(row, 1, QTableWidgetItem(f"{sale['total']:.2f}"))
-            self.sales_table.setItem(row, 2, QTableWidgetItem(f"{sale['discount']:.2f}"))
-            self.sales_table.setItem(row, 3, QTableWidgetItem(f"{sale['tax']:.2f}"))
-            self.sales_table.setItem(row, 4, QTableWidgetItem(f"{sale['final_total']:.2f}"))
-            self.sales_table.setItem(row, 5, QTableWidgetItem(sale["created_at"]))
\ No newline at end of file
+        """Reload the sales from the newest, with the current filters."""
+        self.sales_model.set_filters(self.current_filters())
+
+    def export_data(self):
+        """Open the export dialog, on the period shown if one is selected"""
+        from .data_export_dialog import DataExportDialog
+        if self.date_filter.isChecked():
+            dialog = DataExportDialog(self, self.date_from.date(), self.date_to.date())
+        else:
+            dialog = DataExportDialog(self)
+        dialog.exec_()
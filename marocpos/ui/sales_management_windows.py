@@ -1,94 +1,36 @@
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QTableWidget, QTableWidgetItem,
-    QPushButton, QLabel, QFrame, QHeaderView, QScrollArea, QMessageBox, QComboBox
+    QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QTableView,
+    QPushButton, QLabel, QFrame, QHeaderView, QScrollArea, QMessageBox, QComboBox,
+    QLineEdit, QApplication
 )
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont, QCursor
-from models.category import Category
-from models.product import Product
-from database import get_connection
+from models.barcode import BarcodeIndex
+from models.catalog import Catalog
+from models.money import format_money
+from .product_tile_view import create_product_tile_view, ProductRole
+from .cart_table_model import CartTableModel, format_quantity, QUANTITY_COLUMN, ACTIONS_COLUMN
+from .checkout import CheckoutQueue, RECEIPT_THERMAL, RECEIPT_A4, RECEIPT_PDF
+from models.sale_journal import SaleJournal
 from datetime import datetime
 import pytz
-import os
-
-class ProductFrame(QFrame):
-    def __init__(self, product, parent=None):
-        super().__init__(parent)
-        self.product = product
-        self.init_ui()
-
-    def init_ui(self):
-        self.setStyleSheet("""
-            ProductFrame {
-                background-color: white;
-                border-radius: 10px;
-                padding: 10px;
-            }
-            ProductFrame:hover {
-                background-color: #f8f9fa;
-            }
-        """)
-        self.setCursor(Qt.PointingHandCursor)
-
-        layout = QVBoxLayout(self)
-        
-        # Product image
-        if self.product.get('image_path'):
-            from PyQt5.QtGui import QPixmap
-            import os
-            
-            image_path = self.product['image_path']
-            if os.path.exists(image_path):
-                image_label = QLabel()
-                pixmap = QPixmap(image_path)
-                if not pixmap.isNull():
-                    scaled_pixmap = pixmap.scaled(
-                        100, 100,
-                        Qt.KeepAspectRatio,
-                        Qt.SmoothTransformation
-                    )
-                    image_label.setPixmap(scaled_pixmap)
-                    image_label.setAlignment(Qt.AlignCenter)
-                    layout.addWidget(image_label)
-        
-        # Product name
-        name_label = QLabel(self.product['name'])
-        name_label.setAlignment(Qt.AlignCenter)
-        name_label.setStyleSheet("font-weight: bold; font-size: 14px;")
-        name_label.setWordWrap(True)
-        
-        # Product price
-        price_label = QLabel(f"{self.product['unit_price']:.2f} MAD")
-        price_label.setAlignment(Qt.AlignCenter)
-        price_label.setStyleSheet("color: #28a745; font-weight: bold;")
-        
-        # Stock info
-        stock_label = QLabel(f"Stock: {self.product['stock']}")
-        stock_label.setAlignment(Qt.AlignCenter)
-        stock_label.setStyleSheet("color: #6c757d; font-size: 12px;")
-        
-        # Has variants label
-        if self.product.get('has_variants'):
-            variant_label = QLabel("(Avec variantes)")
-            variant_label.setAlignment(Qt.AlignCenter)
-            variant_label.setStyleSheet("color: #0066cc; font-style: italic; font-size: 11px;")
-            layout.addWidget(variant_label)
-            
-        layout.addWidget(name_label)
-        layout.addWidget(price_label)
-        layout.addWidget(stock_label)
+import json
 
 class SalesManagementWindow(QWidget):
     def __init__(self, user=None):
         super().__init__()
         self.user_id = user['id'] if user else 1  # Default to user ID 1 if not provided
-        self.current_datetime = datetime.now()
         self.current_amount = 0.0
         self.selected_row = None
         self.selected_product = None
+        # Sales are committed and receipts rendered off the UI thread
+        self.checkout = CheckoutQueue(self)
+        self.checkout.saleCommitted.connect(self.on_sale_committed)
+        self.checkout.receiptReady.connect(self.on_receipt_ready)
         self.init_ui()
         self.setup_categories()
         self.load_products()
+        self.scan_input.setFocus()
 
     def init_ui(self):
         self.setWindowTitle("Gestion des ventes")
@@ -120,15 +62,29 @@ class SalesManagementWindow(QWidget):
         """)
         cart_layout = QVBoxLayout(cart_frame)
         
+        # Barcode scan input: keyboard-wedge scanners type the code and press Enter
+        self.scan_input = QLineEdit()
+        self.scan_input.setPlaceholderText("Scanner un code-barres...")
+        self.scan_input.setStyleSheet("padding: 8px; font-size: 14px;")
+        self.scan_input.returnPressed.connect(self.scan_barcode)
+        cart_layout.addWidget(self.scan_input)
+        
+        self.scan_status = QLabel("")
+        self.scan_status.setStyleSheet("color: #dc3545; font-size: 12px;")
+        cart_layout.addWidget(self.scan_status)
+        
         # Cart header
         cart_header = QLabel("Panier")
         cart_header.setStyleSheet("font-size: 18px; font-weight: bold;")
         cart_layout.addWidget(cart_header)
         
-        # Cart table
-        self.cart_table = QTableWidget()
-        self.cart_table.setColumnCount(4)  # Name, Quantity, Price, Remove
-        self.cart_table.setHorizontalHeaderLabels(["Produit", "Quantité", "Prix", "Actions"])
+        # Cart table, a view over the cart model
+        self.cart_model = CartTableModel(parent=self)
+        self.cart_table = QTableView()
+        self.cart_table.setModel(self.cart_model)
+        self.cart_table.setSelectionBehavior(QTableView.SelectRows)
+        self.cart_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.cart_table.verticalHeader().hide()
         
         # Set column widths
         self.cart_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
@@ -140,20 +96,20 @@ class SalesManagementWindow(QWidget):
         self.cart_table.setColumnWidth(3, 50)
         
         self.cart_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #f8f9fa;
                 padding: 8px;
                 border: none;
                 font-weight: bold;
                 color: #495057;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #e6f3ff;
                 color: #000;
             }
         """)
         # Connect to item selection event
-        self.cart_table.itemClicked.connect(self.on_cart_item_clicked)
+        self.cart_table.clicked.connect(self.on_cart_item_clicked)
         cart_layout.addWidget(self.cart_table)
 
         # Total section
@@ -283,22 +239,13 @@ class SalesManagementWindow(QWidget):
         self.setup_categories()
         right_layout.addWidget(categories_scroll)
 
-        # Products section
-        products_scroll = QScrollArea()
-        products_scroll.setWidgetResizable(True)
-        products_scroll.setStyleSheet("""
-            QScrollArea {
-                border: none;
-                background-color: transparent;
-            }
-        """)
-
-        products_widget = QWidget()
-        self.products_layout = QGridLayout(products_widget)
-        self.products_layout.setSpacing(10)
-        products_scroll.setWidget(products_widget)
+        # Products section: tiles are painted by a delegate, only when visible
+        self.products_view = create_product_tile_view()
+        self.products_view.clicked.connect(
+            lambda index: self.add_to_cart(index.data(ProductRole))
+        )
         
-        right_layout.addWidget(products_scroll)
+        right_layout.addWidget(self.products_view)
 
         # Add receipt options
         receipt_layout = QHBoxLayout()
@@ -318,44 +265,50 @@ class SalesManagementWindow(QWidget):
         receipt_settings_btn.clicked.connect(self.open_receipt_settings)
         receipt_layout.addWidget(receipt_settings_btn)
         
+        self.checkout_status = QLabel("")
+        self.checkout_status.setStyleSheet("color: #28a745; font-size: 12px;")
+        receipt_layout.addWidget(self.checkout_status, 1)
+        
         right_layout.addLayout(receipt_layout)
 
         return right_widget
 
-    def on_cart_item_clicked(self, item):
+    def on_cart_item_clicked(self, index):
         """Handle click on cart item"""
-        self.selected_row = item.row()
+        if index.column() == ACTIONS_COLUMN:
+            self.remove_from_cart(index.row())
+            return
+        
+        self.selected_row = index.row()
         
         # If clicking on quantity column, select product for keypad
-        if self.cart_table.currentColumn() == 1:
-            self.selected_product = item.row()
+        if index.column() == QUANTITY_COLUMN:
+            self.selected_product = index.row()
 
     def keypad_pressed(self, text):
         """Handle keypad button press"""
         try:
             if self.selected_product is None:
                 return
-                
-            # Get current quantity
-            current_qty = self.cart_table.item(self.selected_row, 1).text()
+            line = self.cart_model.cart.line_at(self.selected_row)
+            if line is None:
+                return
             
             # Handle different keypad buttons
             if text == 'C':
-                # Clear quantity
-                current_qty = ""
+                # Clear quantity: back to the default of 1
+                new_qty = ""
             elif text == '×':
-                # Remove last digit
-                current_qty = current_qty[:-1] if current_qty else ""
                 return
             else:
                 # Add the text to the current quantity
-                new_qty = current_qty + text
+                new_qty = format_quantity(line.quantity) + text
                 
             # Try to convert to float and update if valid
             try:
                 qty = float(new_qty) if new_qty else 1  # Default to 1 if empty
                 if qty > 0:
-                    self.cart_table.setItem(self.selected_row, 1, QTableWidgetItem(str(qty)))
+                    self.cart_model.set_quantity(self.selected_row, qty)
                     self.update_total()
             except ValueError:
                 # Invalid number, keep the current value
@@ -374,136 +327,103 @@ class SalesManagementWindow(QWidget):
             QMessageBox.warning(self, "Erreur", f"Impossible d'ouvrir les paramètres du reçu: {str(e)}")
     
     def process_sale(self):
-        """Process the sale and save to database"""
-        if self.cart_table.rowCount() == 0:
+        """Hand the basket to the checkout queue and start the next one"""
+        if len(self.cart_model.cart) == 0:
             QMessageBox.warning(self, "Erreur", "Le panier est vide!")
             return
 
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            # Start transaction
-            cursor.execute("BEGIN TRANSACTION")
-            
-            try:
-                # Create sale record
-                cursor.execute("""
-                    INSERT INTO Sales (
-                        created_at, 
-                        total_amount, 
-                        user_id,
-                        discount,
-                        tax_amount,
-                        final_total,
-                        payment_method
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    self.current_datetime.strftime("%Y-%m-%d %H:%M:%S"),
-                    self.current_amount,
-                    self.user_id,  # Use the user_id from instance
-                    0.0,  # discount (default to 0)
-                    0.0,  # tax_amount (default to 0)
-                    self.current_amount,  # final_total (same as total_amount without discounts/taxes)
-                    "CASH"  # payment_method (default to CASH)
-                ))
-                
-                sale_id = cursor.lastrowid
-                
-                # Add sale items
-                for row in range(self.cart_table.rowCount()):
-                    product_name = self.cart_table.item(row, 0).text()
-                    quantity = float(self.cart_table.item(row, 1).text())
-                    price = float(self.cart_table.item(row, 2).text())
-                    
-                    # Get product ID and variant ID from the item
-                    product_id = self.cart_table.item(row, 0).data(Qt.UserRole)
-                    variant_id = self.cart_table.item(row, 0).data(Qt.UserRole + 1)
-                    
-                    if not product_id:
-                        # Fallback to old method if ID not stored in item
-                        cursor.execute("SELECT id FROM Products WHERE name = ?", (product_name,))
-                        product_id = cursor.fetchone()[0]
-                    
-                    # Calculate subtotal
-                    subtotal = quantity * price
-                    
-                    # Add sale item
-                    cursor.execute("""
-                        INSERT INTO SaleItems (
-                            sale_id,
-                            product_id,
-                            variant_id,
-                            quantity,
-                            unit_price,
-                            subtotal
-                        ) VALUES (?, ?, ?, ?, ?, ?)
-                    """, (sale_id, product_id, variant_id, quantity, price, subtotal))
-                    
-                    # Update stock - different approach for variants vs regular products
-                    if variant_id:
-                        # Update variant stock
-                        cursor.execute("""
-                            UPDATE ProductVariants 
-                            SET stock = stock - ? 
-                            WHERE id = ?
-                        """, (quantity, variant_id))
-                    else:
-                        # Update product stock
-                        cursor.execute("""
-                            UPDATE Products 
-                            SET stock = stock - ? 
-                            WHERE id = ?
-                        """, (quantity, product_id))
-                
-                cursor.execute("COMMIT")
-                
-                # Show success message
-                QMessageBox.information(self, "Succès", f"Vente #{sale_id} enregistrée avec succès!")
-                
-                # Generate receipt based on selected option
-                receipt_option = self.receipt_options.currentIndex()
-                
-                # Only generate receipt if not "Ne pas imprimer" (index 3)
-                if receipt_option < 3:
-                    try:
-                        # Import the receipt generator
-                        from .receipt_generator import ReceiptGenerator
-                        
-                        # Create receipt generator for this sale
-                        receipt = ReceiptGenerator(sale_id, self)
-                        
-                        # Handle different receipt options
-                        if receipt_option == 0:  # Thermal
-                            receipt.print_thermal()
-                        elif receipt_option == 1:  # A4
-                            receipt.print_a4()
-                        elif receipt_option == 2:  # PDF
-                            receipt.generate_pdf()
-                        else:
-                            # Show the receipt preview dialog with all options
-                            receipt.show_receipt_dialog()
-                            
-                    except Exception as e:
-                        print(f"Error generating receipt: {e}")
-                        QMessageBox.warning(
-                            self, 
-                            "Erreur d'impression", 
-                            f"La vente a été enregistrée mais il y a eu une erreur lors de l'impression du reçu: {str(e)}"
-                        )
-                
-                # Clear the cart
-                self.clear_cart()
-                
-            except Exception as e:
-                cursor.execute("ROLLBACK")
-                QMessageBox.warning(self, "Erreur", f"Erreur lors de l'enregistrement de la vente: {str(e)}")
-                
-        except Exception as e:
-            QMessageBox.warning(self, "Erreur", f"Erreur de connexion à la base de données: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
+        # The sale is taken once it is in the journal; the database write follows
+        journal_id = self.checkout.submit(
+            self.user_id,  # Use the user_id from instance
+            self.cart_model.cart.sale_items(),
+            payment_method="CASH",  # payment_method (default to CASH)
+            created_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            receipt_option=self.receipt_options.currentIndex()
+        )
+        if journal_id is None:
+            QMessageBox.warning(self, "Erreur", "Impossible d'enregistrer la vente : le journal des ventes n'est pas accessible.")
+            return
+        self.checkout_status.setText("Enregistrement de la vente...")
+        
+        # Clear the cart
+        self.clear_cart()
+
+    def on_sale_committed(self, journal_id, sale_id, metrics):
+        """A journalled basket has been written to the database, or has to wait"""
+        if metrics.get('quarantined'):
+            self.checkout_status.setText("Vente mise de côté : voir le fichier de quarantaine du journal")
+            QMessageBox.warning(
+                self,
+                "Vente non enregistrée",
+                f"La base de données refuse une vente du journal ({metrics.get('error')}).\n"
+                f"Elle a été mise de côté dans {SaleJournal.quarantine_path()} "
+                "et les ventes suivantes continuent d'être enregistrées."
+            )
+            return
+        if sale_id is None:
+            # The sale is safe in the journal and is retried automatically
+            self.checkout_status.setText(
+                f"Vente en attente d'enregistrement, nouvel essai automatique ({metrics.get('error')})"
+            )
+            return
+        
+        self.checkout_status.setText(f"Vente #{sale_id} enregistrée avec succès!")
+
+    def on_receipt_ready(self, sale_id, option, receipt, result, error):
+        """A receipt has been rendered in the background"""
+        if error:
+            QMessageBox.warning(
+                self, 
+                "Erreur d'impression", 
+                f"La vente #{sale_id} a été enregistrée mais il y a eu une erreur lors de l'impression du reçu: {error}"
+            )
+            return
+        
+        if option == RECEIPT_THERMAL:
+            self.checkout_status.setText(f"Reçu #{sale_id} envoyé à l'imprimante thermique.")
+        elif option == RECEIPT_A4:
+            # Choosing the printer needs the UI thread; the PDF is already rendered
+            receipt.parent = self
+            receipt.print_a4(result)
+        elif option == RECEIPT_PDF:
+            self.checkout_status.setText(f"Reçu #{sale_id} enregistré : {result}")
+
+    def closeEvent(self, event):
+        # Let queued sales finish writing before the window goes away, but
+        # not forever: a locked database or a stuck printer must not freeze
+        # the close. Unwritten sales stay in the journal for the next start
+        if not self.checkout.wait(CheckoutQueue.CLOSE_WAIT_MS):
+            pending = self.checkout.pending_count()
+            if pending:
+                QMessageBox.warning(
+                    self,
+                    "Ventes en attente",
+                    f"{pending} vente(s) ne sont pas encore enregistrées dans la base de données.\n"
+                    "Elles restent dans le journal des ventes et seront enregistrées au prochain démarrage."
+                )
+        super().closeEvent(event)
+
+    def scan_barcode(self):
+        """Add the product or variant matching the scanned barcode to the cart"""
+        barcode = self.scan_input.text()
+        self.scan_input.clear()
+        if not barcode.strip():
+            return
+        
+        match = BarcodeIndex.resolve(barcode)
+        if match is None:
+            # No dialog: it would swallow the next scans
+            QApplication.beep()
+            self.scan_status.setText(f"Code-barres inconnu : {barcode.strip()}")
+            return
+        
+        self.scan_status.setText("")
+        product, variant = match
+        if variant is not None:
+            self.add_variant_to_cart(product, variant)
+        else:
+            self.add_to_cart(product)
+        self.scan_input.setFocus()
 
     def remove_from_cart(self, row):
         """Remove an item from the cart"""
@@ -515,35 +435,30 @@ class SalesManagementWindow(QWidget):
         )
 
         if reply == QMessageBox.Yes:
-            self.cart_table.removeRow(row)
+            self.cart_model.remove(row)
             self.update_total()
-            if row == getattr(self, 'selected_row', None):
-                self.selected_product = None
+            # Rows below the removed one have moved up
+            self.selected_product = None
+            self.selected_row = None
 
     def update_total(self):
         """Update the total amount in the cart"""
-        total = 0.0
-        for row in range(self.cart_table.rowCount()):
-            try:
-                qty = float(self.cart_table.item(row, 1).text())
-                price = float(self.cart_table.item(row, 2).text())
-                total += qty * price
-            except (ValueError, AttributeError):
-                continue
-        
-        self.total_amount.setText(f"{total:.2f} MAD")
-        self.current_amount = total
+        # The cart keeps its total up to date as lines change
+        cart = self.cart_model.cart
+        self.total_amount.setText(format_money(cart.total_cents))
+        self.current_amount = cart.total
 
     def clear_cart(self):
         """Clear all items from the cart"""
-        self.cart_table.setRowCount(0)
+        self.cart_model.clear()
         self.update_total()
         self.selected_product = None
         self.selected_row = None
+        self.scan_input.setFocus()
 
     def setup_categories(self):
         """Load categories into the UI"""
-        categories = Category.get_all_categories()
+        categories = Catalog.categories()
         
         # Add special "All" category
         categories.insert(0, (None, "Tous les produits", None))
@@ -582,28 +497,11 @@ class SalesManagementWindow(QWidget):
             col += 1
 
     def load_products(self, category_id=None):
-        # Clear existing products
-        while self.products_layout.count():
-            item = self.products_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-
-        # Get products
-        products = Product.get_products_by_category(category_id)
-
-        # Add products to grid
-        row = 0
-        col = 0
-        for product in products:
-            product_frame = ProductFrame(product)
-            product_frame.mousePressEvent = lambda e, p=product: self.add_to_cart(p)
-            
-            self.products_layout.addWidget(product_frame, row, col)
-            
-            col += 1
-            if col > 2:  # 3 products per row
-                col = 0
-                row += 1
+        # Get products: served from the in-memory catalogue, so switching
+        # category doesn't touch the database
+        products = Catalog.products(category_id)
+        self.products_view.model().set_products(products)
+        self.products_view.scrollToTop()
 
     def filter_by_category(self, category_id):
         self.load_products(category_id)
@@ -630,71 +528,13 @@ class SalesManagementWindow(QWidget):
                 QMessageBox.warning(self, "Erreur", f"Erreur lors de la sélection de la variante: {str(e)}")
             return
         
-        # Regular product (no variants)
-        # Check if product is already in cart
-        for row in range(self.cart_table.rowCount()):
-            product_id = self.cart_table.item(row, 0).data(Qt.UserRole)
-            variant_id = self.cart_table.item(row, 0).data(Qt.UserRole + 1)
-            
-            # Match if same product and no variant
-            if product_id == product['id'] and variant_id is None:
-                # Update quantity
-                current_qty = int(self.cart_table.item(row, 1).text())
-                self.cart_table.setItem(row, 1, QTableWidgetItem(str(current_qty + 1)))
-                self.update_total()
-                return
-
-        # Add new product to cart
-        row = self.cart_table.rowCount()
-        self.cart_table.insertRow(row)
-        
-        # Product name cell with product ID stored
-        name_item = QTableWidgetItem(product['name'])
-        name_item.setData(Qt.UserRole, product['id'])  # Store product ID
-        name_item.setData(Qt.UserRole + 1, None)      # No variant
-        self.cart_table.setItem(row, 0, name_item)
-        
-        # Quantity and price
-        self.cart_table.setItem(row, 1, QTableWidgetItem("1"))
-        self.cart_table.setItem(row, 2, QTableWidgetItem(f"{product['unit_price']:.2f}"))
-        
-        delete_btn = QPushButton("🗑")
-        delete_btn.setCursor(Qt.PointingHandCursor)
-        delete_btn.setStyleSheet("""
-            QPushButton {
-                border: none;
-                color: #6c757d;
-            }
-            QPushButton:hover {
-                color: #dc3545;
-            }
-        """)
-        delete_btn.clicked.connect(lambda checked, r=row: self.remove_from_cart(r))
-        
-        btn_cell = QWidget()
-        btn_layout = QHBoxLayout(btn_cell)
-        btn_layout.setContentsMargins(0, 0, 0, 0)
-        btn_layout.addWidget(delete_btn)
-        
-        self.cart_table.setCellWidget(row, 3, btn_cell)
+        # Regular product (no variants): a new line, or one more on its existing line
+        self.cart_model.add(product['id'], None, product['name'], product['unit_price'])
         self.update_total()
 
     def add_variant_to_cart(self, product, variant):
         """Add a product variant to the cart"""
         try:
-            # Check if the variant is already in the cart
-            for row in range(self.cart_table.rowCount()):
-                product_id = self.cart_table.item(row, 0).data(Qt.UserRole)
-                variant_id = self.cart_table.item(row, 0).data(Qt.UserRole + 1)
-                
-                # Match if same product and same variant
-                if product_id == product['id'] and variant_id == variant['id']:
-                    # Update quantity
-                    current_qty = int(self.cart_table.item(row, 1).text())
-                    self.cart_table.setItem(row, 1, QTableWidgetItem(str(current_qty + 1)))
-                    self.update_total()
-                    return
-            
             # Create variant name from product name + variant attributes
             attr_values = {}
             if variant.get('attribute_values'):
@@ -714,40 +554,8 @@ class SalesManagementWindow(QWidget):
             price_adj = float(variant.get('price_adjustment', 0))
             final_price = base_price + price_adj
             
-            # Add to cart
-            row = self.cart_table.rowCount()
-            self.cart_table.insertRow(row)
-            
-            # Product name cell with product and variant IDs stored
-            name_item = QTableWidgetItem(variant_name)
-            name_item.setData(Qt.UserRole, product['id'])   # Store product ID
-            name_item.setData(Qt.UserRole + 1, variant['id'])  # Store variant ID
-            self.cart_table.setItem(row, 0, name_item)
-            
-            # Quantity and price
-            self.cart_table.setItem(row, 1, QTableWidgetItem("1"))
-            self.cart_table.setItem(row, 2, QTableWidgetItem(f"{final_price:.2f}"))
-            
-            # Delete button
-            delete_btn = QPushButton("🗑")
-            delete_btn.setCursor(Qt.PointingHandCursor)
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    border: none;
-                    color: #6c757d;
-                }
-                QPushButton:hover {
-                    color: #dc3545;
-                }
-            """)
-            delete_btn.clicked.connect(lambda checked, r=row: self.remove_from_cart(r))
-            
-            btn_cell = QWidget()
-            btn_layout = QHBoxLayout(btn_cell)
-            btn_layout.setContentsMargins(0, 0, 0, 0)
-            btn_layout.addWidget(delete_btn)
-            
-            self.cart_table.setCellWidget(row, 3, btn_cell)
+            # Add to cart, or one more on the variant's existing line
+            self.cart_model.add(product['id'], variant['id'], variant_name, final_price)
             self.update_total()
             
         except Exception as e:
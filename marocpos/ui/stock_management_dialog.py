@@ -261,12 +261,8 @@ class StockManagementDialog(QDialog):
             )
             
             if result:
-                # Update the product stock cache
-                new_stock = int(self.product['stock']) + quantity
-                Product.update_product(self.product['id'], stock=new_stock)
-                
-                # Update local product data
-                self.product['stock'] = new_stock
+                # The movement already updated the stock; mirror it locally
+                self.product['stock'] = int(self.product['stock']) + quantity
                 
                 # Refresh UI
                 self.create_product_header(QVBoxLayout())  # Create a dummy layout to update header
@@ -308,16 +304,8 @@ class StockManagementDialog(QDialog):
         if reply == QMessageBox.Yes:
             # Delete the movement and revert stock changes
             if Product.delete_stock_movement(movement['id']):
-                # Update product stock by reverting the movement
-                quantity = movement['quantity']
-                # Reverse the quantity - add what was removed, remove what was added
-                new_stock = int(self.product['stock']) - quantity
-                
-                # Update product stock
-                Product.update_product(self.product['id'], stock=new_stock)
-                
-                # Update local product data
-                self.product['stock'] = new_stock
+                # The reversal already updated the stock; mirror it locally
+                self.product['stock'] = int(self.product['stock']) - movement['quantity']
                 
                 # Refresh UI
                 self.create_product_header(QVBoxLayout())  # Create a dummy layout to update header
@@ -0,0 +1,161 @@
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader, QPixmap, QColor
+from collections import OrderedDict
+import hashlib
+import os
+
+# On-disk cache, next to the images/ directory
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'thumbnail_cache')
+
+
+def cache_key(image_path, size):
+    """(path, mtime, file size, thumbnail size), or None if the file is missing.
+
+    A replaced image gets a new mtime/size, hence a new key: stale
+    thumbnails are never served and nothing needs invalidating.
+    """
+    try:
+        stat = os.stat(image_path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return (image_path, stat.st_mtime_ns, stat.st_size, size)
+
+
+def cache_file(key):
+    digest = hashlib.sha1("|".join(str(part) for part in key).encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, f"{digest}.png")
+
+
+def decode_thumbnail(image_path, size):
+    """Decode image_path scaled to fit size x size; a null QImage on failure"""
+    reader = QImageReader(image_path)
+    reader.setAutoTransform(True)
+    original = reader.size()
+    if original.isValid() and (original.width() > 2 * size or original.height() > 2 * size):
+        # Let the decoder downscale (JPEG can skip most of the work), then
+        # finish with a smooth scale from twice the target size
+        reader.setScaledSize(original.scaled(2 * size, 2 * size, Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        return image
+    return image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+class _ThumbnailSignals(QObject):
+    done = pyqtSignal(object, object)
+
+
+class _ThumbnailJob(QRunnable):
+    """Load a thumbnail from the disk cache, or decode and store it, off the UI thread"""
+
+    def __init__(self, key, signals):
+        super().__init__()
+        self.key = key
+        self.signals = signals
+
+    def run(self):
+        image_path, _, _, size = self.key
+        path = cache_file(self.key)
+        image = QImage(path) if os.path.exists(path) else QImage()
+        if image.isNull():
+            image = decode_thumbnail(image_path, size)
+            if not image.isNull():
+                try:
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    image.save(path, "PNG")
+                except Exception as e:
+                    print(f"Error saving thumbnail: {e}")
+        self.signals.done.emit(self.key, image)
+
+
+class ThumbnailService(QObject):
+    """Product thumbnails shared by every window.
+
+    get() answers from an in-memory LRU of pixmaps; on a miss it returns a
+    placeholder and queues the image on the global QThreadPool, which reads
+    it from the disk cache or decodes and caches it. ready(path, size) is
+    emitted once the real thumbnail can be fetched with get().
+    """
+    ready = pyqtSignal(str, int)
+
+    MEMORY_CACHE_SIZE = 500
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pixmaps = OrderedDict()
+        self.pending = set()
+        self.failed = set()
+        self.placeholders = {}
+        self.signals = _ThumbnailSignals()
+        self.signals.done.connect(self._on_done)
+
+    def placeholder(self, size):
+        if size not in self.placeholders:
+            pixmap = QPixmap(size, size)
+            pixmap.fill(QColor("#e9ecef"))
+            self.placeholders[size] = pixmap
+        return self.placeholders[size]
+
+    def get(self, image_path, size):
+        """Thumbnail for image_path, a placeholder while it loads, or None without an image"""
+        if not image_path:
+            return None
+        key = cache_key(image_path, size)
+        if key is None or key in self.failed:
+            return None
+
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+            return pixmap
+
+        if key not in self.pending:
+            self.pending.add(key)
+            QThreadPool.globalInstance().start(_ThumbnailJob(key, self.signals))
+        return self.placeholder(size)
+
+    def _on_done(self, key, image):
+        self.pending.discard(key)
+        if image.isNull():
+            # Not an image: get() returns None from now on instead of a placeholder
+            self.failed.add(key)
+        else:
+            # QPixmap may only be created on the UI thread, hence the QImage hand-off
+            self.pixmaps[key] = QPixmap.fromImage(image)
+            while len(self.pixmaps) > self.MEMORY_CACHE_SIZE:
+                self.pixmaps.popitem(last=False)
+        self.ready.emit(key[0], key[3])
+
+    def set_on_label(self, label, image_path, size):
+        """Show the thumbnail in a QLabel, swapping the placeholder once it is decoded.
+
+        Returns False when there is no usable image, so callers can hide the label.
+        """
+        pixmap = self.get(image_path, size)
+        if pixmap is None:
+            return False
+        label.setPixmap(pixmap)
+
+        if cache_key(image_path, size) in self.pending:
+            def update(path, ready_size):
+                if path != image_path or ready_size != size:
+                    return
+                self.ready.disconnect(update)
+                try:
+                    pixmap = self.get(image_path, size)
+                    if pixmap is None:
+                        label.hide()
+                    else:
+                        label.setPixmap(pixmap)
+                except RuntimeError:
+                    # The label was destroyed before the image arrived
+                    pass
+            self.ready.connect(update)
+        return True
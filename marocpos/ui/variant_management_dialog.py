@@ -8,15 +8,22 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt
 from models.product_attribute import ProductAttribute
 from models.product import Product
+from models.variant_generator import count_variant_combinations, variant_name, variant_sku
+import itertools
 import json
 
 class VariantManagementDialog(QDialog):
+    # Rows built in the variants table; the other combinations are only
+    # generated when the variants are saved
+    PREVIEW_LIMIT = 200
+
     def __init__(self, product_id=None, parent=None, variant_attributes=None):
         super().__init__(parent)
         self.product_id = product_id
         self.variant_attributes = variant_attributes or []  # List of attribute names
         self.attribute_values = {}  # Dict of attribute name -> list of values
-        self.variants = []  # List of variant dictionaries
+        self.variants = []  # Variant dictionaries of the previewed rows
+        self.total_variants = 0
         self.init_ui()
         self.load_attributes()
 
@@ -83,6 +90,10 @@ class VariantManagementDialog(QDialog):
         instruction.setStyleSheet("font-size: 14px; margin-bottom: 10px;")
         layout.addWidget(instruction)
         
+        self.variants_summary = QLabel("")
+        self.variants_summary.setStyleSheet("color: #666;")
+        layout.addWidget(self.variants_summary)
+        
         # Variants table
         self.variants_table = QTableWidget()
         self.variants_table.setColumnCount(6)
@@ -284,43 +295,37 @@ class VariantManagementDialog(QDialog):
             QMessageBox.warning(self, "Aucune variante", "Aucun attribut ou valeur sélectionné.")
             return
             
-        # Generate combinations
+        # Only the preview rows are built; the rest stay a lazy iterator
+        self.total_variants = count_variant_combinations(attr_values)
         combinations = ProductAttribute.generate_variant_combinations(attr_values)
-        
-        # Store as list of variant dictionaries
-        self.variants = []
-        for combo in combinations:
-            # Create variant name from combination (e.g., "Red / L")
-            name_parts = []
-            for attr, value in combo.items():
-                name_parts.append(f"{value}")
-            
-            variant_name = " / ".join(name_parts)
-            
-            # Generate default SKU
-            base_sku = "SKU"  # This would normally come from the product
-            sku_parts = []
-            for attr, value in combo.items():
-                sku_parts.append(value[0])  # First letter of each value
-            
-            sku = f"{base_sku}-{''.join(sku_parts)}"
-            
-            # Create variant dictionary
-            variant = {
-                'active': True,
-                'name': variant_name,
-                'sku': sku,
-                'price': 0.0,  # Default price from product
-                'stock': 0,
-                'barcode': '',
-                'attributes': combo
-            }
-            
-            self.variants.append(variant)
+        self.variants = [
+            self.new_variant(combo)
+            for combo in itertools.islice(combinations, self.PREVIEW_LIMIT)
+        ]
+        
+        if self.total_variants > len(self.variants):
+            self.variants_summary.setText(
+                f"{self.total_variants} variantes : aperçu des {len(self.variants)} premières. "
+                f"Les autres seront créées avec les valeurs par défaut."
+            )
+        else:
+            self.variants_summary.setText(f"{self.total_variants} variantes")
         
         # Populate the variants table
         self.populate_variants_table()
 
+    def new_variant(self, combo):
+        """Default variant for a combination; SKU and barcode are filled in when saved if blank"""
+        return {
+            'active': True,
+            'name': variant_name(combo),
+            'sku': variant_sku(self.product_id, combo) if self.product_id else '',
+            'price': 0.0,  # Default price from product
+            'stock': 0,
+            'barcode': '',
+            'attributes': combo
+        }
+
     def populate_variants_table(self):
         """Populate the variants table with generated variants"""
         self.variants_table.setRowCount(len(self.variants))
@@ -422,8 +427,18 @@ class VariantManagementDialog(QDialog):
                 f"Une erreur s'est produite lors de l'ouverture de la gestion des attributs: {str(e)}"
             )
 
+    def variant_count(self):
+        """Number of variants get_variants_data() yields"""
+        inactive = sum(1 for variant in self.variants if not variant['active'])
+        return self.total_variants - inactive
+
     def get_variants_data(self):
-        """Get the configured variants data"""
+        """Get the configured variants data.
+
+        A list when every combination was previewed; otherwise an iterator
+        that follows the previewed rows with the remaining combinations,
+        generated as they are consumed.
+        """
         result = []
         
         # Update SKUs and barcodes from the table
@@ -450,7 +465,13 @@ class VariantManagementDialog(QDialog):
                 }
                 result.append(variant_data)
         
-        return result
+        if self.total_variants <= len(self.variants):
+            return result
+        remaining = itertools.islice(
+            ProductAttribute.generate_variant_combinations(self.attribute_values),
+            len(self.variants), None
+        )
+        return itertools.chain(result, ({'attributes': combo} for combo in remaining))
 
     def get_attribute_names(self):
         """Get the names of attributes used"""
@@ -4,10 +4,9 @@ from PyQt5.QtWidgets import (
     QFrame, QDialogButtonBox
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap
-from models.product import Product
+from models.catalog import Catalog
+from .thumbnails import ThumbnailService
 import json
-import os
 
 class VariantSelectionDialog(QDialog):
     def __init__(self, product, parent=None):
@@ -65,18 +64,10 @@ class VariantSelectionDialog(QDialog):
         header_layout = QHBoxLayout(header_frame)
         
         # Product image if available
-        if self.product.get('image_path') and os.path.exists(self.product['image_path']):
-            image_label = QLabel()
-            pixmap = QPixmap(self.product['image_path'])
-            if not pixmap.isNull():
-                scaled_pixmap = pixmap.scaled(
-                    80, 80,
-                    Qt.KeepAspectRatio,
-                    Qt.SmoothTransformation
-                )
-                image_label.setPixmap(scaled_pixmap)
-                image_label.setAlignment(Qt.AlignCenter)
-                header_layout.addWidget(image_label)
+        image_label = QLabel()
+        if ThumbnailService.instance().set_on_label(image_label, self.product.get('image_path'), 80):
+            image_label.setAlignment(Qt.AlignCenter)
+            header_layout.addWidget(image_label)
                 
         # Product info
         info_layout = QVBoxLayout()
@@ -114,7 +105,7 @@ class VariantSelectionDialog(QDialog):
 
     def load_variants(self):
         """Load product variants into the list"""
-        variants = Product.get_variants(self.product['id'])
+        variants = Catalog.variants(self.product['id'])
         
         if not variants:
             QMessageBox.warning(